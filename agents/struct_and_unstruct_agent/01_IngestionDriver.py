@@ -23,43 +23,40 @@ spark.sql(
 # COMMAND ----------
 import os
 import json
-import pandas as pd
 
 from pathlib import Path
 
+from databricks.sdk import WorkspaceClient
+
+from src.ingestion.tables import csv_header, csv_schema, read_csv, register_tables
+
 data_dir = Path(os.getcwd()) / ".." / ".." /  "artifacts" / "data" / "structured"
+structured_volume_dir = f"/Volumes/{config['catalog_name']}/{config['schema_name']}/{config['volume_name']}/structured"
 
 with open(f"{data_dir}/metadata.json", "r") as f:
     metadata = json.load(f)
 
-all_tables = []
+w = WorkspaceClient()
+tables = []
 for csv_file in data_dir.glob("*.csv"):
     table_name = f"{config['catalog_name']}.{config['schema_name']}.{csv_file.stem}" 
 
     print(f"Processing {csv_file.name} -> table `{table_name}`")
-    df = pd.read_csv(csv_file)
-    (
-        spark.createDataFrame(df)
-        .write
-        .format("delta")
-        .mode("overwrite")
-        .saveAsTable(table_name)
-    )
-
-    all_tables.append(table_name)
-
-    # add metadata to the spark table column description and table description
-    spark.sql(f"""
-        ALTER TABLE {table_name}
-        SET TBLPROPERTIES (
-            'comment' = '{metadata[csv_file.stem]["description"]}'
-        )
-    """)
-    for column, description in metadata[csv_file.stem]["columns"].items():
-        spark.sql(f"""
-            ALTER TABLE {table_name}
-            ALTER COLUMN `{column}` COMMENT '{description}'
-        """)
+    # Stage the file in the volume, Spark tasks read it there with the schema declared in metadata.json
+    # instead of pandas parsing it and inferring types on the driver
+    with open(csv_file, "rb") as f:
+        w.files.upload(f"{structured_volume_dir}/{csv_file.name}", f, overwrite=True)
+    schema = csv_schema(csv_header(csv_file), metadata[csv_file.stem]["column_types"])
+    tables.append({
+        "df": read_csv(spark, f"{structured_volume_dir}/{csv_file.name}", schema),
+        "table_name": table_name,
+        "description": metadata[csv_file.stem]["description"],
+        "column_comments": metadata[csv_file.stem]["columns"],
+    })
+
+# Tables are written concurrently, the column descriptions go into the write itself and the table
+# description is one escaped COMMENT ON TABLE, instead of an ALTER TABLE per column
+all_tables = register_tables(tables, max_workers=config.get("table_load_concurrency", 4))
 
 # COMMAND ----------
 from databricks.sdk import WorkspaceClient
@@ -82,115 +79,133 @@ try:
 except Exception as e:
     print(f"Error creating data room: {e}")
 
+# COMMAND ----------
+try:
+# For IDE / VSCode users using serverless, ensure pdfplumber is installed in the Databricks cluster
+# https://docs.databricks.com/aws/en/dev-tools/databricks-connect/python/udf#udfs-with-dependencies
+    from databricks.connect import DatabricksSession, DatabricksEnv
+    env = DatabricksEnv().withDependencies("pdfplumber")
+    spark = DatabricksSession.builder.withEnvironment(env).getOrCreate()
+    print(f"Running in a local environment")
+except Exception as e:
+    print(f"Running in a Databricks environment")
+
 # COMMAND ----------
 import os
-import json
-import pandas as pd
 
 from pathlib import Path
 
+from databricks.sdk import WorkspaceClient
+from pyspark.sql.functions import col, element_at, sha2, split
+
 data_dir = Path(os.getcwd()) / ".." / ".." / "artifacts" / "data" / "unstructured"
+volume_dir = f"/Volumes/{config['catalog_name']}/{config['schema_name']}/{config['volume_name']}/unstructured"
 
-pdf_files = []
+# Stage the PDFs in the volume, Spark tasks read them from there by path instead of the driver shipping bytes
+w = WorkspaceClient()
 for pdf_file in data_dir.glob("*.pdf"):
     with open(pdf_file, "rb") as f:
-        pdf_content = f.read()
-    pdf_files.append(
-        {
-            "content": pdf_content,
-            "name": pdf_file.name,
-            "path": str(pdf_file),
-            "size": len(pdf_content),
-        }
-    )
+        w.files.upload(f"{volume_dir}/{pdf_file.name}", f, overwrite=True)
 
-# creaste a DataFrame from the list of dictionaries
-df = pd.DataFrame(pdf_files)
-display(df)
+# Content hashes are computed by the tasks reading the files, only the small metadata rows reach the driver
+docs_df = (
+    spark.read.format("binaryFile")
+    .option("pathGlobFilter", "*.pdf")
+    .load(volume_dir)
+    .select(
+        col("path").alias("doc_uri"),
+        element_at(split(col("path"), "/"), -1).alias("doc_name"),
+        col("length").alias("size"),
+        sha2(col("content"), 256).alias("doc_hash"),
+    )
+)
+docs_df = spark.createDataFrame(docs_df.collect(), schema=docs_df.schema)
+display(docs_df)
 
 # COMMAND ----------
-import io
-import uuid
-import pdfplumber
+from pyspark.sql.functions import col
+
+from src.ingestion.dedup import deduplicate_chunks, single_source
+from src.ingestion.incremental import (
+    can_merge,
+    changed_documents,
+    merge_chunks,
+    shared_document_uris,
+    stale_document_uris,
+)
+from src.ingestion.pipeline import chunk_documents, extract_pages, page_batches
+
+chunks_table_name = f"{config['catalog_name']}.{config['schema_name']}.{config['processed_chunks_table_name']}"
+staging_table_name = f"{chunks_table_name}_staging"
+pages_per_task = config.get("pdf_pages_per_task", 8)
+# Without the section the original fixed character windows are used, see get_chunker
+chunking = config.get("chunking") or {}
+# Near-duplicate removal is off without the section
+dedup = config.get("dedup") or {}
+
+# Incremental runs only chunk new / changed documents and MERGE them, so the Delta Sync index
+# only re-embeds what changed. Falls back to a full rebuild on the first run.
+# Configs without ingestion_mode rebuild the chunks table, as before incremental ingestion
+incremental = config.get("ingestion_mode", "full") == "incremental" and can_merge(spark, chunks_table_name)
+reference_chunks_df, stale_uris = None, []
+if incremental:
+    existing_chunks_df = spark.table(chunks_table_name)
+    stale_uris = stale_document_uris(docs_df, existing_chunks_df)
+    # Chunks of stale documents may stand for near-duplicates of other documents, re-chunk those too
+    stale_uris += shared_document_uris(existing_chunks_df, stale_uris)
+    # Indexed chunks of the other documents, new chunks that duplicate them are dropped
+    reference_chunks_df = existing_chunks_df.where(~col("doc_uri").isin(stale_uris))
+    docs_df = (
+        changed_documents(docs_df, existing_chunks_df)
+        .unionByName(docs_df.where(col("doc_uri").isin(stale_uris)))
+        .distinct()
+    )
 
-from pyspark.sql.functions import udf, explode, col
-from pyspark.sql.types import ArrayType, StringType, StructType, StructField
+# Pages are parsed by parallel tasks in batches of `pages_per_task` and chunked per document with the
+# configured strategy, all through Arrow batches (mapInPandas / pandas_udf) with natively computed ids.
+# Changing the chunking config changes the chunks of unchanged documents too, run with ingestion_mode: full then
+pages_df = extract_pages(page_batches(spark, docs_df, pages_per_task), pages_per_task, tables=chunking.get("tables", False))
+chunks_df = chunk_documents(pages_df, chunking)
 
-try:
-# For IDE / VSCode users using serverless, ensure pdfplumber is installed in the Databricks cluster
-# https://docs.databricks.com/aws/en/dev-tools/databricks-connect/python/udf#udfs-with-dependencies
-    from databricks.connect import DatabricksSession, DatabricksEnv
-    env = DatabricksEnv().withDependencies("pdfplumber")
-    spark = DatabricksSession.builder.withEnvironment(env).getOrCreate()
-    print(f"Running in a local environment")
-except Exception as e:
-    print(f"Running in a Databricks environment")
-
-def extract_chunks_from_pdf(pdf_bytes, chunk_size=1024):
-    if pdf_bytes is None:
-        return []
-    
-    try:
-        # Read PDF from bytes
-        with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
-            full_text = "\n".join(page.extract_text() or "" for page in pdf.pages)
-        
-        # Remove extra spaces/newlines
-        full_text = " ".join(full_text.split())
-
-        # Calculate step size for overlap (1/3 overlap means step = chunk_size - chunk_size/3)
-        overlap = chunk_size * 2 // 3
-        step = chunk_size - overlap
-
-        # Create overlapping chunks
-        chunks = []
-        for i, start in enumerate(range(0, len(full_text), step)):
-            chunk_text = full_text[start:start + chunk_size]
-            if chunk_text:
-                metadata = {
-                    "chunk_index": i,
-                    "source": "pdf_document"
-                }
-                chunks.append(
-                    {"content": chunk_text, "metadata": str(metadata)}
-                )
-        
-        return chunks
-    
-    except Exception as e:
-        # Optional: log or return empty if parsing fails
-        return ["Error parsing PDF: " + str(e)]
-
-# Schema for array of structs
-chunk_schema = ArrayType(
-    StructType([
-        StructField("content", StringType(), True),
-        StructField("metadata", StringType(), True)
-    ])
-)
-# Register UDF
-extract_chunks_udf = udf(extract_chunks_from_pdf, chunk_schema)
-generate_uuid = udf(lambda: str(uuid.uuid4()), StringType())
-
-(
-    spark.createDataFrame(pdf_files)
-    .withColumn("chunks", explode(extract_chunks_udf("content")))
-    .withColumn("id", generate_uuid())
-    .select(
-        col("id").alias("id"),
-        col("name").alias("doc_name"),
-        col("path").alias("doc_uri"),
-        col("size").alias("size"),
-        col("chunks.content").alias("content"),
-        col("chunks.metadata").alias("metadata")
+if dedup.get("enabled", False):
+    # Near-duplicate detection reads the chunks several times, stage them instead of parsing the PDFs again
+    (
+        chunks_df
+        .write
+        .format("delta")
+        .mode("overwrite")
+        .option("overwriteSchema", "true")
+        .saveAsTable(staging_table_name)
     )
-    .write
-    .format("delta")
-    .mode("overwrite")
-    .saveAsTable(
-        f"{config['catalog_name']}.{config['schema_name']}.{config['processed_chunks_table_name']}"
+    chunks_df, dedup_stats = deduplicate_chunks(
+        spark,
+        spark.table(staging_table_name),
+        reference=reference_chunks_df,
+        removed_uris=stale_uris,
+        threshold=dedup.get("threshold", 0.8),
+        num_perm=dedup.get("num_perm", 64),
+        bands=dedup.get("bands", 16),
     )
-)
+    print(
+        f"Dropped {dedup_stats['duplicates']} near-duplicate chunks of {dedup_stats['chunks']} "
+        f"(dedup ratio {dedup_stats['dedup_ratio']:.1%})"
+    )
+else:
+    chunks_df = single_source(chunks_df)
+
+if incremental:
+    print(f"Merging chunks of {docs_df.count()} new / changed documents, removing {len(stale_uris)} stale documents")
+    merge_chunks(spark, chunks_df, chunks_table_name, stale_uris)
+else:
+    (
+        chunks_df
+        .write
+        .format("delta")
+        .mode("overwrite")
+        .option("overwriteSchema", "true")
+        .saveAsTable(chunks_table_name)
+    )
+spark.sql(f"DROP TABLE IF EXISTS {staging_table_name}")
 
 # Enable Change Data Feed (CDF) if not already enabled
 cdf_check = spark.sql(f"""
@@ -272,3 +287,26 @@ except Exception as e:
     # Handle the error as needed, e.g., log it or raise an exception
 
 # COMMAND ----------
+# Export the chunks as an embedded index for vector_search_backend: local (dev runs, low latency tier)
+if config.get("vector_search_backend", "databricks") == "local":
+    from src.utils.local_index import build_local_index, get_embedder
+
+    local_index_config = config["local_vector_index"]
+    chunk_rows = [
+        row.asDict()
+        for row in spark.table(
+            f"{config['catalog_name']}.{config['schema_name']}.{config['processed_chunks_table_name']}"
+        ).select(
+            "id", "content", "doc_uri", "metadata",
+            "ticker", "doc_type", "period", "year", "doc_date", "page", "char_start", "char_end",
+        ).collect()
+    ]
+    embeddings = get_embedder(local_index_config["embedding"])([row["content"] for row in chunk_rows])
+    index_path = build_local_index(
+        local_index_config["path"],
+        chunk_rows,
+        embeddings,
+        index_type=local_index_config.get("index_type", "flat"),
+        nlist=local_index_config.get("nlist"),
+    )
+    print(f"Local vector index exported: {index_path} ({len(chunk_rows)} chunks)")
@@ -53,6 +53,21 @@ response = agent.predict_stream(input_example)
 for event in response:
     print(event)
 
+# COMMAND ----------
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from src.agent import agent
+
+# Async path: concurrent conversations multiplexed on a single event loop
+async def run_concurrently(n):
+    return await asyncio.gather(*[agent.apredict(input_example) for _ in range(n)])
+
+# The notebook already runs an event loop, so drive this one from a worker thread
+with ThreadPoolExecutor(max_workers=1) as executor:
+    responses = executor.submit(asyncio.run, run_concurrently(3)).result()
+for response in responses:
+    print(response.output[-1].content[-1]['text'])
+
 # COMMAND ----------
 import os
 import mlflow
@@ -0,0 +1,150 @@
+"""
+Offline end-to-end benchmark of the agent graphs.
+
+Replays a question corpus through `ToolCallingAgent.predict` and `predict_stream` with the Databricks
+services replaced by the stand-ins in `benchmarks.stubs` (scripted LLM, Genie, vector search and a local
+MCP server, all with configurable latency / token rates). Reports per request end-to-end latency,
+time-to-first-token, LLM calls, tokens, tool calls and the per-node latency reported by the agent
+itself, for the `langgraph` and / or `mcp` backend.
+
+    python -m benchmarks.bench_agent_e2e --backend both --repeat 3
+    python -m benchmarks.bench_agent_e2e --backend mcp --genie-latency 0.5 --json /tmp/e2e.json
+"""
+import json
+import time
+import logging
+import argparse
+
+from pathlib import Path
+
+import yaml
+
+from benchmarks import stubs
+from benchmarks.utils import AGENT_DIR, load_agent_module, summarize
+from benchmarks.bench_tool_selection import QUESTIONS
+
+
+def agent_config(backend: str, top_k: int) -> dict:
+    """The shipped example config with the placeholders filled in for the stand-ins"""
+    with open(AGENT_DIR / "configs" / "config.yaml.example") as f:
+        config = yaml.safe_load(f)
+
+    config.update(
+        catalog_name="main",
+        schema_name="finance",
+        vector_endpoint_name="stub",
+        agent_backend=backend,
+        agent_metrics_stream_event=True,
+    )
+    config["agents"]["structured_agent"]["genie_space_id"] = "stub"
+    config["agents"]["mcp_agent"].update(
+        managed_server_urls=["/mcp"],
+        custom_server_urls=[],
+        tool_schema_cache_path=None,
+        tool_selection_top_k=top_k,
+        tool_result_cache=None,
+    )
+    return config
+
+
+def replay(agent, question: str, stream: bool) -> dict:
+    request = {"input": [{"role": "user", "content": question}]}
+    stubs.COUNTERS.reset()
+    ttft, metrics = None, None
+    start = time.perf_counter()
+    if stream:
+        for event in agent.predict_stream(request):
+            if ttft is None and event.type == "response.output_text.delta" and event.delta:
+                ttft = time.perf_counter() - start
+            elif event.type == "response.agent_metrics":
+                metrics = event.custom_outputs["agent_metrics"]
+    else:
+        metrics = agent.predict(request).custom_outputs["agent_metrics"]
+    result = {"e2e": time.perf_counter() - start, "ttft": ttft, "metrics": metrics}
+    result.update(stubs.COUNTERS.snapshot())
+    return result
+
+
+def report(backend: str, mode: str, results: list) -> dict:
+    row = {"backend": backend, "mode": mode, "requests": len(results)}
+    row.update({f"e2e_{k}": v for k, v in summarize([r["e2e"] for r in results]).items()})
+    ttfts = [r["ttft"] for r in results if r["ttft"] is not None]
+    if ttfts:
+        row.update({f"ttft_{k}": v for k, v in summarize(ttfts).items()})
+    for name in stubs.StubCounters.NAMES:
+        row[f"{name}_per_request"] = sum(r[name] for r in results) / len(results)
+
+    print(f"[{backend} / {mode}] {len(results)} requests")
+    print(f"  e2e   mean {row['e2e_mean_ms']:8.1f} ms  p50 {row['e2e_p50_ms']:8.1f} ms  p95 {row['e2e_p95_ms']:8.1f} ms")
+    if ttfts:
+        print(f"  ttft  mean {row['ttft_mean_ms']:8.1f} ms  p50 {row['ttft_p50_ms']:8.1f} ms  p95 {row['ttft_p95_ms']:8.1f} ms")
+    print(
+        f"  per request: {row['llm_calls_per_request']:.1f} LLM calls, "
+        f"{row['input_tokens_per_request']:.0f} input / {row['output_tokens_per_request']:.0f} output tokens, "
+        f"{row['genie_calls_per_request']:.1f} Genie / {row['vector_search_calls_per_request']:.1f} vector search calls"
+    )
+
+    # Per-node breakdown from the agent's own metrics in custom_outputs / the final stream event
+    nodes = {}
+    for r in results:
+        for name, node in r["metrics"]["nodes"].items():
+            nodes.setdefault(name, []).append(node["latency_ms"])
+    row["node_latency_ms"] = {name: sum(latencies) / len(results) for name, latencies in nodes.items()}
+    for name, latency in sorted(row["node_latency_ms"].items(), key=lambda item: -item[1]):
+        print(f"  node {name:<26} {latency:8.1f} ms per request")
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backend", choices=["langgraph", "mcp", "both"], default="both")
+    parser.add_argument("--repeat", type=int, default=2, help="replays of the question corpus per mode")
+    parser.add_argument("--questions", type=Path, help="text file with one question per line")
+    parser.add_argument("--llm-ttft", type=float, default=0.25)
+    parser.add_argument("--llm-tps", type=float, default=80, help="LLM output tokens per second")
+    parser.add_argument("--llm-prefill-tps", type=float, default=20000, help="LLM prompt tokens per second")
+    parser.add_argument("--answer-tokens", type=int, default=120)
+    parser.add_argument("--genie-latency", type=float, default=2.0)
+    parser.add_argument("--vs-latency", type=float, default=0.3)
+    parser.add_argument("--top-k", type=int, default=8, help="tool_selection_top_k of the mcp backend")
+    parser.add_argument("--json", type=Path, help="write the summary rows to this file")
+    args = parser.parse_args()
+
+    # Per-request HTTP / MCP server logs drown the report
+    for logger in ("httpx", "mcp"):
+        logging.getLogger(logger).setLevel(logging.WARNING)
+
+    stubs.install_stubs(
+        llm_ttft_seconds=args.llm_ttft,
+        llm_tokens_per_second=args.llm_tps,
+        llm_prefill_tokens_per_second=args.llm_prefill_tps,
+        llm_answer_tokens=args.answer_tokens,
+        genie_latency_seconds=args.genie_latency,
+        vector_search_latency_seconds=args.vs_latency,
+    )
+    questions = QUESTIONS
+    if args.questions:
+        questions = [line.strip() for line in args.questions.read_text().splitlines() if line.strip()]
+
+    backends = ["langgraph", "mcp"] if args.backend == "both" else [args.backend]
+    server = stubs.start_stub_mcp_server() if "mcp" in backends else None
+    rows = []
+    try:
+        for backend in backends:
+            agent = load_agent_module(agent_config(backend, args.top_k)).agent
+            # First request pays one-off setup (trace store, sessions, lazy imports)
+            replay(agent, questions[0], stream=False)
+            for mode, stream in (("predict", False), ("predict_stream", True)):
+                results = [replay(agent, q, stream) for _ in range(args.repeat) for q in questions]
+                rows.append(report(backend, mode, results))
+    finally:
+        if server is not None:
+            server.stop()
+
+    if args.json:
+        args.json.write_text(json.dumps(rows, indent=2))
+        print(f"wrote {args.json}")
+
+
+if __name__ == "__main__":
+    main()
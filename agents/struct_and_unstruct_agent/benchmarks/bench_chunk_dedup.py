@@ -0,0 +1,130 @@
+"""
+Near-duplicate chunk elimination (`src.ingestion.dedup`) on a local Spark session.
+
+The corpus is the bundled PDFs plus synthetic press releases that share the usual boilerplate: a
+safe-harbor statement, an "About" paragraph with the company name swapped and a contacts footer, around
+filler text unique to each release. For both chunking strategies reports chunks and embedding tokens
+before / after dedup, the dedup ratio and run time, and the precision / recall of the MinHash LSH pairs
+against exact shingle Jaccard similarity computed over all pairs.
+
+Needs a local pyspark (not databricks-connect) and a Java 17 runtime.
+
+    python -m benchmarks.bench_chunk_dedup --releases 60 --threshold 0.8
+"""
+import time
+import random
+import argparse
+
+from itertools import combinations
+
+from benchmarks.pdf_fixtures import synthetic_lines
+from benchmarks.bench_ingestion_chunking import local_spark
+from benchmarks.bench_chunking_strategies import PDF_DIR
+
+from src.ingestion.chunking import count_tokens
+from src.ingestion.dedup import deduplicate_chunks
+from src.ingestion.minhash import shingles
+from src.ingestion.pdf import extract_page_texts, page_count
+from src.ingestion.pipeline import chunk_documents
+
+SAFE_HARBOR = (
+    "Forward-Looking Statements: This press release contains forward-looking statements within the meaning "
+    "of the Private Securities Litigation Reform Act of 1995, including statements regarding guidance, expected "
+    "revenue growth, operating margins and market opportunities. These statements are based on current "
+    "expectations and are subject to risks and uncertainties that could cause actual results to differ "
+    "materially, including macroeconomic conditions, competition, currency fluctuations and the timing of "
+    "customer purchases. The company undertakes no obligation to update any forward-looking statement, except "
+    "as required by law. Readers are cautioned not to place undue reliance on these statements."
+)
+ABOUT = (
+    "About {name}: {name} is a provider of cloud-based software for enterprises and governments, helping "
+    "customers modernize infrastructure, analyze data and secure their operations. {name} is headquartered "
+    "in {city} and serves customers in more than forty countries."
+)
+CONTACTS = "Investor Relations: ir@{domain}.example | Media: press@{domain}.example"
+COMPANIES = [("WWebServices", "San Francisco"), ("XBricks", "Austin"), ("YFlake", "Boston"), ("ZSoft", "Seattle")]
+
+STRATEGIES = {
+    "fixed 1024 / 2/3 (legacy)": {"strategy": "fixed", "fixed": {"chunk_size": 1024, "overlap_ratio": 2 / 3}},
+    "sentence 256 / 0.1": {"strategy": "sentence", "sentence": {"max_tokens": 256, "overlap_ratio": 0.1}},
+}
+
+
+def corpus_pages(n_releases: int, seed: int = 0):
+    rng = random.Random(seed)
+    rows = []
+    for path in sorted(PDF_DIR.glob("*.pdf")):
+        for page, text in enumerate(extract_page_texts(str(path), 0, page_count(str(path)))):
+            rows.append((f"file:{path}", path.name, path.stat().st_size, path.name, page, text))
+    for i in range(n_releases):
+        name, city = COMPANIES[i % len(COMPANIES)]
+        body = "\n".join(synthetic_lines(rng, 12))
+        text = "\n\n".join([
+            f"{name} reports results for period {i}.",
+            body,
+            SAFE_HARBOR,
+            ABOUT.format(name=name, city=city),
+            CONTACTS.format(domain=name.lower()),
+        ])
+        rows.append((f"file:/releases/release_{i:04d}.pdf", f"release_{i:04d}.pdf", 10_000, f"{i:064x}", 0, text))
+    return rows
+
+
+def exact_pairs(chunks, threshold: float):
+    """All pairs with exact shingle Jaccard >= threshold, the ground truth for the LSH pairs"""
+    shingled = [(row["id"], shingles(row["content"])) for row in chunks]
+    return {
+        tuple(sorted((left_id, right_id)))
+        for (left_id, left), (right_id, right) in combinations(shingled, 2)
+        if len(left & right) / len(left | right) >= threshold
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--releases", type=int, default=60, help="synthetic press releases next to the bundled PDFs")
+    parser.add_argument("--threshold", type=float, default=0.8)
+    parser.add_argument("--num-perm", type=int, default=64)
+    parser.add_argument("--bands", type=int, default=16)
+    parser.add_argument("--cores", type=int, default=2)
+    args = parser.parse_args()
+
+    spark = local_spark(args.cores)
+    pages = spark.createDataFrame(
+        corpus_pages(args.releases),
+        "doc_uri string, doc_name string, size long, doc_hash string, page_number int, text string",
+    )
+    print(f"{pages.select('doc_uri').distinct().count()} documents, threshold {args.threshold}, "
+          f"{args.num_perm} permutations / {args.bands} bands")
+
+    for name, chunking in STRATEGIES.items():
+        chunks = spark.createDataFrame(chunk_documents(pages, chunking).collect())
+        rows = chunks.collect()
+        start = time.perf_counter()
+        kept, stats = deduplicate_chunks(
+            spark, chunks, threshold=args.threshold, num_perm=args.num_perm, bands=args.bands
+        )
+        kept_rows = kept.collect()
+        elapsed = time.perf_counter() - start
+
+        tokens = sum(count_tokens(row["content"]) for row in rows)
+        kept_tokens = sum(count_tokens(row["content"]) for row in kept_rows)
+        truth = exact_pairs(rows, args.threshold)
+        dropped = {row["id"] for row in rows} - {row["id"] for row in kept_rows}
+        # A true pair is covered when at most one of its chunks survived
+        covered = sum(1 for left, right in truth if left in dropped or right in dropped)
+        wrongly_dropped = sum(1 for chunk_id in dropped if not any(chunk_id in pair for pair in truth))
+        multi_source = sum(1 for row in kept_rows if len(row["source_doc_uris"]) > 1)
+        print(
+            f"{name:<26} chunks {stats['chunks']:4d} -> {len(kept_rows):4d}  dedup ratio {stats['dedup_ratio']:5.1%}  "
+            f"tokens {tokens:6d} -> {kept_tokens:6d} ({1 - kept_tokens / tokens:5.1%} saved)  {elapsed * 1000:7.0f} ms"
+        )
+        print(
+            f"{'':<26} exact near-duplicate pairs {len(truth)}, covered {covered / len(truth) if truth else 1:.0%}, "
+            f"dropped without an exact near-duplicate {wrongly_dropped}, kept chunks with several sources {multi_source}"
+        )
+    spark.stop()
+
+
+if __name__ == "__main__":
+    main()
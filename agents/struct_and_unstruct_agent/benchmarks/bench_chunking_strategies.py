@@ -0,0 +1,120 @@
+"""
+Compares chunking strategies of `src.ingestion.chunking` on the bundled PDFs (artifacts/data/unstructured).
+
+For every strategy reports the number of chunks, the embedding tokens of the index (sum of the chunk
+token counts) and the retrieval hit-rate of a question set: a question is a hit when one of the top-k
+BM25-ranked chunks contains its answer. BM25 stands in for the keyword half of the HYBRID vector
+search query, no embedding endpoint is needed.
+
+    python -m benchmarks.bench_chunking_strategies --top-k 2
+"""
+import math
+import argparse
+
+from collections import Counter
+from typing import Dict, List
+
+from benchmarks.utils import AGENT_DIR
+
+from src.ingestion.chunking import count_tokens, get_chunker
+from src.ingestion.pdf import extract_page_texts, page_count
+from src.utils.tool_selection import tokenize
+
+PDF_DIR = AGENT_DIR.parents[1] / "artifacts" / "data" / "unstructured"
+
+# (question, text the retrieved chunk has to contain)
+QUESTIONS = [
+    ("What revenue did WWebServices report for Q2 2025?", "Revenue: $550 million"),
+    ("What is the WWS FY2025 EPS guidance?", "raised to $3.40 per share"),
+    ("Which new contract did WWebServices sign?", "contract signed with Orion Retail"),
+    ("What revenue growth does WWS expect for FY2025?", "revenue growth expected at 9–11%"),
+    ("Who is the CEO of WWebServices?", "Arjun Patel"),
+    ("What dividend is WWebServices initiating?", "quarterly dividend of $0.25 per share"),
+    ("What was XBricks revenue in Q3 2025?", "Revenue: $930 million"),
+    ("What full-year EPS outlook did XBricks give?", "EPS outlook raised to $7.60"),
+    ("What drove XBricks growth in Q3?", "Government adoption of our containerized infrastructure"),
+    ("What were XBricks record revenues in 2025?", "record revenues of $3.59 billion"),
+    ("What special dividend did XBricks announce?", "special dividend of $1.20 per share"),
+    ("When is the XBricks special dividend payable?", "payable January 20, 2026"),
+    ("What is the analyst rating and price target for YFlake?", "Price Target: $43.00"),
+    ("How was the YFK FY2025 EPS estimate revised?", "revised from $2.55 to $2.44"),
+    ("What are the key risks for YFlake?", "Macroeconomic slowdown in key European markets"),
+    ("What was YFlake revenue in Q2 2025?", "Q2 2025 | 420"),
+    ("What is the new rating for ZSoft?", "New Rating: Sell"),
+    ("What is the ZSoft price target?", "$22.00 (from $28.00)"),
+    ("Why is the ZSoft investment thesis negative?", "Declining license renewals"),
+    ("How was the ZSoft FY2025 EPS forecast changed?", "cut from $1.20 to $1.00"),
+]
+
+STRATEGIES = {
+    "fixed 1024 chars / 2/3 overlap (legacy)": {"strategy": "fixed", "fixed": {"chunk_size": 1024, "overlap_ratio": 2 / 3}},
+    "fixed 512 chars / 0.1 overlap": {"strategy": "fixed", "fixed": {"chunk_size": 512, "overlap_ratio": 0.1}},
+    "sentence 256 tokens / 0.1 overlap": {"strategy": "sentence", "sentence": {"max_tokens": 256, "overlap_ratio": 0.1}},
+    "sentence 128 tokens / 0.1 overlap": {"strategy": "sentence", "sentence": {"max_tokens": 128, "overlap_ratio": 0.1}},
+    "sentence 64 tokens / 0.15 overlap": {"strategy": "sentence", "sentence": {"max_tokens": 64, "overlap_ratio": 0.15}},
+}
+
+
+def bm25_top_k(query: str, chunks: List[str], k: int, k1: float = 1.5, b: float = 0.75) -> List[int]:
+    documents = [Counter(tokenize(chunk)) for chunk in chunks]
+    lengths = [sum(doc.values()) for doc in documents]
+    avg_length = sum(lengths) / len(lengths)
+    doc_freq = Counter(term for doc in documents for term in doc)
+    scores = []
+    for doc, length in zip(documents, lengths):
+        score = 0.0
+        for term in set(tokenize(query)):
+            tf = doc.get(term, 0)
+            if tf:
+                idf = math.log(1 + (len(documents) - doc_freq[term] + 0.5) / (doc_freq[term] + 0.5))
+                score += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / avg_length))
+        scores.append(score)
+    return sorted(range(len(chunks)), key=lambda i: scores[i], reverse=True)[:k]
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.split())
+
+
+def evaluate(pages: Dict[str, List[str]], chunking: dict, top_k: int) -> dict:
+    chunker = get_chunker(chunking)
+    chunks = [normalize(chunk["content"]) for texts in pages.values() for chunk in chunker(texts)]
+    hits = sum(
+        any(normalize(answer) in chunks[i] for i in bm25_top_k(question, chunks, top_k))
+        for question, answer in QUESTIONS
+    )
+    # Answers that no chunk contains in one piece, lost to a chunk boundary
+    split = sum(not any(normalize(answer) in chunk for chunk in chunks) for _, answer in QUESTIONS)
+    return {
+        "chunks": len(chunks),
+        "embedding_tokens": sum(count_tokens(chunk) for chunk in chunks),
+        "max_chunk_tokens": max(count_tokens(chunk) for chunk in chunks),
+        "hit_rate": hits / len(QUESTIONS),
+        "answers_split": split,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--top-k", type=int, default=2, help="num_results of the vector search tool")
+    parser.add_argument("--tables", action="store_true", help="extract tables as markdown")
+    args = parser.parse_args()
+
+    pages = {
+        path.name: extract_page_texts(str(path), 0, page_count(str(path)), tables=args.tables)
+        for path in sorted(PDF_DIR.glob("*.pdf"))
+    }
+    print(f"{len(pages)} PDFs, {len(QUESTIONS)} questions, hit@{args.top_k}")
+    baseline = None
+    for name, chunking in STRATEGIES.items():
+        row = evaluate(pages, chunking, args.top_k)
+        baseline = baseline or row
+        print(
+            f"{name:<42} {row['chunks']:4d} chunks  {row['embedding_tokens']:6d} tokens "
+            f"({row['embedding_tokens'] / baseline['embedding_tokens']:5.0%})  max {row['max_chunk_tokens']:4d}  "
+            f"hit@{args.top_k} {row['hit_rate']:5.0%}  answers split {row['answers_split']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
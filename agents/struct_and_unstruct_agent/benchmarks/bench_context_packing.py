@@ -0,0 +1,70 @@
+"""
+Tool output of the vector search tool before / after context packing (`src.utils.context`).
+
+The 20 questions of `bench_chunking_strategies` retrieve their top-k chunks of the bundled PDFs by BM25.
+The tool output is measured as the previous `json.dumps(..., indent=2)` of every chunk and as packed
+facts: overlapping chunks of a document merged, compact JSON, optionally a token budget. Reports the
+mean tool output tokens (fed to every later LLM call of the agent loop), how many answers the output
+still contains and the packing time.
+
+    python -m benchmarks.bench_context_packing --top-k 2 4 8
+"""
+import json
+import time
+import argparse
+
+from statistics import mean
+
+from benchmarks.bench_chunking_strategies import PDF_DIR, QUESTIONS, bm25_top_k, normalize
+
+from src.ingestion.chunking import count_tokens, get_chunker
+from src.ingestion.pdf import chunk_records, extract_page_texts, page_count
+from src.utils.context import facts_json, pack_facts
+
+STRATEGIES = {
+    "fixed 1024 / 2/3 (legacy)": {"strategy": "fixed", "fixed": {"chunk_size": 1024, "overlap_ratio": 2 / 3}},
+    "sentence 256 / 0.1": {"strategy": "sentence", "sentence": {"max_tokens": 256, "overlap_ratio": 0.1}},
+}
+
+
+def indented_json(chunks):
+    return json.dumps({f"fact_{i + 1}": chunk["content"] for i, chunk in enumerate(chunks)}, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--top-k", type=int, nargs="+", default=[2, 4, 8])
+    parser.add_argument("--max-tokens", type=int, default=0, help="token budget of the packed facts, 0 for none")
+    args = parser.parse_args()
+
+    pages = {
+        path.name: extract_page_texts(str(path), 0, page_count(str(path)))
+        for path in sorted(PDF_DIR.glob("*.pdf"))
+    }
+    for name, chunking in STRATEGIES.items():
+        chunks = [
+            {**record, "doc_uri": doc_uri}
+            for doc_uri, texts in pages.items()
+            for record in chunk_records(texts, get_chunker(chunking))
+        ]
+        for top_k in args.top_k:
+            before, after, kept_before, kept_after, timings = [], [], 0, 0, []
+            for question, answer in QUESTIONS:
+                hits = [chunks[i] for i in bm25_top_k(question, [chunk["content"] for chunk in chunks], top_k)]
+                output = indented_json(hits)
+                start = time.perf_counter()
+                packed = facts_json(pack_facts(hits, max_tokens=args.max_tokens))
+                timings.append(time.perf_counter() - start)
+                before.append(count_tokens(output))
+                after.append(count_tokens(packed))
+                kept_before += normalize(answer) in normalize(" ".join(json.loads(output).values()))
+                kept_after += normalize(answer) in normalize(" ".join(json.loads(packed).values()))
+            print(
+                f"{name:<26} top {top_k}: tool output {mean(before):6.0f} -> {mean(after):6.0f} tokens "
+                f"({1 - sum(after) / sum(before):5.1%} saved)  answers {kept_before}/{len(QUESTIONS)} -> "
+                f"{kept_after}/{len(QUESTIONS)}  pack {mean(timings) * 1000:5.2f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
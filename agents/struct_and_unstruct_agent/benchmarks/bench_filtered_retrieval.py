@@ -0,0 +1,108 @@
+"""
+Metadata-filtered retrieval: the filters a question names (ticker, quarter, document type, see
+`src.utils.vector_search.extract_query_filters`) pushed down into the search, relaxed the way the tool
+relaxes them when nothing matches, against searching the whole index.
+
+The index is a local one (`src.utils.local_index`, hashing embedder) over the bundled PDFs' chunks, with
+their metadata derived from the document names as the ingestion does, plus synthetic distractor chunks of
+other documents of the same companies. Reports hit@num_results of the question set of
+`bench_chunking_strategies`, the share of the index the filters leave and the search time.
+
+    python -m benchmarks.bench_filtered_retrieval --distractors 20000 --num-results 2
+"""
+import time
+import random
+import argparse
+import tempfile
+
+from pathlib import Path
+from statistics import mean
+
+# benchmarks.utils points MLflow at a temp store before src.utils.vector_search imports it
+from benchmarks import utils  # noqa: F401
+from benchmarks.pdf_fixtures import synthetic_lines
+from benchmarks.bench_chunking_strategies import PDF_DIR, QUESTIONS, normalize
+
+from src.ingestion.chunking import get_chunker
+from src.ingestion.metadata import document_metadata, period
+from src.ingestion.pdf import extract_page_texts, page_count
+from src.utils.local_index import HashingEmbedder, LocalVectorIndex, build_local_index
+from src.utils.vector_search import extract_query_filters, relaxed_filters
+
+TICKER_ALIASES = {"WWS": ["WWebServices"], "XBR": ["XBricks"], "YFK": ["YFlake"], "ZSF": ["ZSoft"]}
+FIELDS = ["ticker", "period", "doc_type"]
+DOC_TYPES = ["press_release", "shareholder_letter", "analyst_note", "earnings_call_transcript"]
+TOPICS = ["revenue", "EPS guidance", "dividend", "price target", "rating", "contract", "risks", "CEO", "growth"]
+COLUMNS = ["id", "content", "doc_uri", "metadata"]
+CHUNKING = {"strategy": "sentence", "sentence": {"max_tokens": 128, "overlap_ratio": 0.1}}
+
+
+def corpus(n_distractors: int, seed: int = 0):
+    chunker = get_chunker(CHUNKING)
+    rows = []
+    for path in sorted(PDF_DIR.glob("*.pdf")):
+        metadata = document_metadata(path.name)
+        for chunk in chunker(extract_page_texts(str(path), 0, page_count(str(path)))):
+            rows.append({"content": normalize(chunk["content"]), "doc_uri": path.name, **metadata})
+    rng = random.Random(seed)
+    for i in range(n_distractors):
+        ticker, (name,) = rng.choice(list(TICKER_ALIASES.items()))
+        topic = rng.choice(TOPICS)
+        year, quarter = rng.choice([2023, 2024, 2025]), rng.randint(1, 4)
+        rows.append({
+            "content": f"{name} ({ticker}) {topic} commentary for Q{quarter} {year}: " + " ".join(synthetic_lines(rng, 3)),
+            "doc_uri": f"distractor_{i // 10:05d}.pdf",
+            "ticker": ticker,
+            "doc_type": rng.choice(DOC_TYPES),
+            "period": period(year, quarter),
+            "year": year,
+            "doc_date": None,
+        })
+    return [{"id": str(i), "metadata": "{}", **row} for i, row in enumerate(rows)]
+
+
+def evaluate(index: LocalVectorIndex, query_type: str, num_results: int, filtered: bool):
+    hits, timings, fractions, relaxed = 0, [], [], 0
+    for question, answer in QUESTIONS:
+        filters = extract_query_filters(question, FIELDS, TICKER_ALIASES) if filtered else {}
+        start = time.perf_counter()
+        for attempt, applied_filters in enumerate(relaxed_filters(filters)):
+            results = index.similarity_search(question, COLUMNS, num_results, query_type, filters=applied_filters or None)
+            if results["result"]["row_count"] > 0:
+                break
+        timings.append((time.perf_counter() - start) * 1000)
+        relaxed += attempt > 0
+        fractions.append(index.filter_mask(applied_filters).mean() if applied_filters else 1.0)
+        hits += any(normalize(answer) in row[1] for row in results["result"]["data_array"])
+    return hits, mean(fractions), relaxed, mean(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--distractors", type=int, default=20_000)
+    parser.add_argument("--num-results", type=int, default=2)
+    args = parser.parse_args()
+
+    rows = corpus(args.distractors)
+    embedder = HashingEmbedder()
+    path = build_local_index(Path(tempfile.mkdtemp(prefix="filter_bench_")), rows, embedder([row["content"] for row in rows]))
+    index = LocalVectorIndex(str(path), embedder)
+    # Build BM25 and the filter columns up front, the first query would pay for them
+    index.bm25
+    index.filter_mask({"ticker": "WWS", "period": "2025-Q2", "doc_type": "press_release"})
+    print(f"{len(rows)} chunks, {len(QUESTIONS)} questions, num_results {args.num_results}")
+    for question, _ in QUESTIONS[:3]:
+        print(f"  {question!r} -> {extract_query_filters(question, FIELDS, TICKER_ALIASES)}")
+
+    for query_type in ("ANN", "HYBRID"):
+        for filtered in (False, True):
+            hits, fraction, relaxed, search_ms = evaluate(index, query_type, args.num_results, filtered)
+            name = f"{query_type} {'filtered' if filtered else 'unfiltered'}"
+            print(
+                f"{name:<18} hit@{args.num_results} {hits / len(QUESTIONS):5.0%}  misses {len(QUESTIONS) - hits:2d}  "
+                f"rows searched {fraction:6.1%}  relaxed {relaxed:2d}  search {search_ms:6.2f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
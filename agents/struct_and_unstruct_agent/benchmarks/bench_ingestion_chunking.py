@@ -0,0 +1,226 @@
+"""
+Compares PDF chunking throughput on a local Spark session with synthetic PDFs:
+
+- legacy: driver-read bytes in `createDataFrame`, whole-document Python UDF and a `uuid4` UDF per chunk
+- udf:    page-level pipeline with row-at-a-time Python UDFs (page count, page extraction, chunking)
+- arrow:  `src.ingestion.pipeline`, the same pipeline on Arrow batches (pandas_udf, mapInPandas,
+          pandas_udf over grouped pages) with natively computed chunk ids
+
+PDF parsing dominates the end-to-end numbers, so the chunking stage is also timed on its own over
+already extracted page texts of `--stage-docs` documents: grouped pages through a row-at-a-time UDF
+with a `uuid4` UDF per chunk vs the batched pandas_udf with native ids.
+
+Needs a local pyspark (not databricks-connect) and a Java 17 runtime.
+
+    python -m benchmarks.bench_ingestion_chunking --docs 40 --pages 20 --cores 4 --stage-docs 2000
+"""
+import io
+import uuid
+import random
+import argparse
+import tempfile
+
+from pathlib import Path
+
+from benchmarks.utils import summarize, timeit
+from benchmarks.pdf_fixtures import synthetic_lines, synthetic_pdfs
+
+import src.ingestion.pdf as pdf_ingestion
+from src.ingestion.incremental import chunk_id
+from src.ingestion.pipeline import chunk_documents, extract_pages, page_batches
+
+
+def local_spark(cores: int):
+    from pyspark.sql import SparkSession
+
+    spark = (
+        SparkSession.builder
+        .master(f"local[{cores}]")
+        .config("spark.ui.enabled", "false")
+        .config("spark.sql.shuffle.partitions", str(cores))
+        .getOrCreate()
+    )
+    spark.sparkContext.setLogLevel("ERROR")
+    return spark
+
+
+def list_documents(spark, directory: Path):
+    """Same document listing as 01_IngestionDriver: binaryFile metadata and content hash"""
+    from pyspark.sql.functions import col, element_at, sha2, split
+
+    docs = (
+        spark.read.format("binaryFile")
+        .option("pathGlobFilter", "*.pdf")
+        .load(str(directory))
+        .select(
+            col("path").alias("doc_uri"),
+            element_at(split(col("path"), "/"), -1).alias("doc_name"),
+            col("length").alias("size"),
+            sha2(col("content"), 256).alias("doc_hash"),
+        )
+    )
+    return spark.createDataFrame(docs.collect(), schema=docs.schema)
+
+
+def extract_chunks_from_pdf(pdf_bytes, chunk_size=1024):
+    """The chunker of 01_IngestionDriver before the page-level pipeline"""
+    import pdfplumber
+
+    if pdf_bytes is None:
+        return []
+    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+        full_text = "\n".join(page.extract_text() or "" for page in pdf.pages)
+    full_text = " ".join(full_text.split())
+    step = chunk_size - chunk_size * 2 // 3
+    chunks = []
+    for i, start in enumerate(range(0, len(full_text), step)):
+        chunk_text = full_text[start:start + chunk_size]
+        if chunk_text:
+            chunks.append({"content": chunk_text, "metadata": str({"chunk_index": i, "source": "pdf_document"})})
+    return chunks
+
+
+def legacy_chunks(spark, paths):
+    from pyspark.sql.functions import col, explode, udf
+    from pyspark.sql.types import ArrayType, StringType, StructField, StructType
+
+    chunk_schema = ArrayType(StructType([StructField("content", StringType()), StructField("metadata", StringType())]))
+    extract_chunks_udf = udf(extract_chunks_from_pdf, chunk_schema)
+    generate_uuid = udf(lambda: str(uuid.uuid4()), StringType())
+
+    pdf_files = []
+    for path in paths:
+        content = path.read_bytes()
+        pdf_files.append({"content": content, "name": path.name, "path": str(path), "size": len(content)})
+    return (
+        spark.createDataFrame(pdf_files)
+        .withColumn("chunks", explode(extract_chunks_udf("content")))
+        .withColumn("id", generate_uuid())
+        .select(
+            col("id"),
+            col("name").alias("doc_name"),
+            col("path").alias("doc_uri"),
+            col("size"),
+            col("chunks.content").alias("content"),
+            col("chunks.metadata").alias("metadata"),
+        )
+    )
+
+
+def udf_chunks(spark, docs, pages_per_task: int):
+    from pyspark.sql.functions import col, collect_list, explode, lit, posexplode, sequence, sort_array, struct, udf
+    from pyspark.sql.types import ArrayType, IntegerType, StringType, StructField, StructType
+
+    chunk_schema = ArrayType(StructType([StructField("content", StringType()), StructField("metadata", StringType())]))
+    page_count_udf = udf(pdf_ingestion.page_count, IntegerType())
+    extract_pages_udf = udf(pdf_ingestion.extract_page_texts, ArrayType(StringType()))
+    chunk_pages_udf = udf(lambda pages: pdf_ingestion.chunk_records([page["text"] for page in pages]), chunk_schema)
+
+    batches = (
+        docs
+        .withColumn("page_count", page_count_udf("doc_uri"))
+        .where(col("page_count") > 0)
+        .select("*", explode(sequence(lit(0), col("page_count") - 1, lit(pages_per_task))).alias("first_page"))
+    )
+    batches = spark.createDataFrame(batches.collect(), schema=batches.schema)
+    return (
+        batches
+        .repartition(max(1, batches.count()))
+        .select(
+            "doc_uri", "doc_name", "size", "doc_hash", "first_page",
+            posexplode(extract_pages_udf("doc_uri", "first_page", lit(pages_per_task))).alias("page_offset", "text"),
+        )
+        .withColumn("page_number", col("first_page") + col("page_offset"))
+        .groupBy("doc_uri", "doc_name", "size", "doc_hash")
+        .agg(sort_array(collect_list(struct("page_number", "text"))).alias("pages"))
+        .select("*", posexplode(chunk_pages_udf("pages")).alias("chunk_index", "chunks"))
+        .select(
+            chunk_id(col("doc_uri"), col("doc_hash"), col("chunk_index")).alias("id"),
+            "doc_name", "doc_uri", "doc_hash", "size",
+            col("chunks.content").alias("content"),
+            col("chunks.metadata").alias("metadata"),
+        )
+    )
+
+
+def arrow_chunks(spark, docs, pages_per_task: int):
+    return chunk_documents(extract_pages(page_batches(spark, docs, pages_per_task), pages_per_task))
+
+
+def synthetic_pages(spark, n_docs: int, n_pages: int, cores: int):
+    """Extracted page rows as produced by `extract_pages`, cached so only the chunking stage is timed"""
+    rng = random.Random(0)
+    rows = [
+        (f"file:/synthetic_{i:05d}.pdf", f"synthetic_{i:05d}.pdf", 100_000, f"{i:064x}", page, "\n".join(synthetic_lines(rng, 40)))
+        for i in range(n_docs)
+        for page in range(n_pages)
+    ]
+    pages = spark.createDataFrame(
+        rows, "doc_uri string, doc_name string, size long, doc_hash string, page_number int, text string"
+    ).repartition(cores).cache()
+    pages.count()
+    return pages
+
+
+def udf_chunk_stage(pages):
+    from pyspark.sql.functions import col, collect_list, posexplode, sort_array, struct, udf
+    from pyspark.sql.types import ArrayType, StringType, StructField, StructType
+
+    chunk_schema = ArrayType(StructType([StructField("content", StringType()), StructField("metadata", StringType())]))
+    chunk_pages_udf = udf(lambda pages: pdf_ingestion.chunk_records([page["text"] for page in pages]), chunk_schema)
+    generate_uuid = udf(lambda: str(uuid.uuid4()), StringType())
+    return (
+        pages
+        .groupBy("doc_uri", "doc_name", "size", "doc_hash")
+        .agg(sort_array(collect_list(struct("page_number", "text"))).alias("pages"))
+        .select("*", posexplode(chunk_pages_udf("pages")).alias("chunk_index", "chunks"))
+        .withColumn("id", generate_uuid())
+        .select("id", "doc_name", "doc_uri", "size", col("chunks.content").alias("content"), col("chunks.metadata").alias("metadata"))
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=40)
+    parser.add_argument("--pages", type=int, default=20, help="pages per synthetic PDF")
+    parser.add_argument("--cores", type=int, default=4)
+    parser.add_argument("--pages-per-task", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--stage-docs", type=int, default=2000, help="documents for the chunking stage only comparison")
+    args = parser.parse_args()
+
+    directory = Path(tempfile.mkdtemp(prefix="ingestion_bench_"))
+    paths = synthetic_pdfs(directory, args.docs, args.pages)
+    spark = local_spark(args.cores)
+    print(f"{args.docs} PDFs x {args.pages} pages, local[{args.cores}], {args.pages_per_task} pages per task")
+
+    pipelines = {
+        "legacy": lambda: legacy_chunks(spark, paths),
+        "udf": lambda: udf_chunks(spark, list_documents(spark, directory), args.pages_per_task),
+        "arrow": lambda: arrow_chunks(spark, list_documents(spark, directory), args.pages_per_task),
+    }
+    contents = {}
+    for name, build in pipelines.items():
+        chunks = build()
+        contents[name] = sorted(row["content"] for row in chunks.select("content").collect())
+        # Listing / page batching are part of each path, so the DataFrame is rebuilt per run
+        stats = summarize(timeit(lambda: build().write.format("noop").mode("overwrite").save(), repeat=args.repeat))
+        rows_per_second = len(contents[name]) / (stats["mean_ms"] / 1000)
+        pages_per_second = args.docs * args.pages / (stats["mean_ms"] / 1000)
+        print(
+            f"{name:<7} {len(contents[name])} chunks  mean {stats['mean_ms']:8.1f} ms  p95 {stats['p95_ms']:8.1f} ms  "
+            f"{rows_per_second:8.0f} chunk rows/s  {pages_per_second:6.0f} pages/s"
+        )
+    print("same chunks on all paths:", len({tuple(c) for c in contents.values()}) == 1)
+
+    pages = synthetic_pages(spark, args.stage_docs, args.pages, args.cores)
+    print(f"chunking stage only, {args.stage_docs} documents x {args.pages} extracted pages")
+    for name, build in (("udf", lambda: udf_chunk_stage(pages)), ("arrow", lambda: chunk_documents(pages))):
+        n_chunks = build().count()
+        stats = summarize(timeit(lambda: build().write.format("noop").mode("overwrite").save(), repeat=args.repeat))
+        print(f"{name:<7} {n_chunks} chunks  mean {stats['mean_ms']:8.1f} ms  {n_chunks / (stats['mean_ms'] / 1000):8.0f} chunk rows/s")
+    spark.stop()
+
+
+if __name__ == "__main__":
+    main()
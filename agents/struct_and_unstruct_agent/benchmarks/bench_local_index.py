@@ -0,0 +1,131 @@
+"""
+QPS and recall of the local vector index backend (`src.utils.local_index`) against index size.
+
+Dense sweep: clustered synthetic embeddings (unit vectors around random topic centers, the shape of
+chunk embeddings of a document corpus) indexed as `flat` and `ivf` and queried with the memory-mapped
+NumPy engine over a range of `nprobe`, plus the FAISS flat / IVF / HNSW engines when faiss-cpu is
+installed. Recall@k is measured against the exact top-k. Query embedding time is left out.
+
+Hybrid: `similarity_search` end to end (hashing embedder, BM25 and rank fusion included) on synthetic
+chunk texts, ANN vs HYBRID.
+
+    python -m benchmarks.bench_local_index --sizes 10000 100000 300000 --dim 384
+"""
+import time
+import random
+import argparse
+import tempfile
+
+import numpy as np
+
+from pathlib import Path
+from typing import Dict, List
+
+from benchmarks.utils import summarize
+from benchmarks.pdf_fixtures import synthetic_lines
+
+from src.utils.local_index import HashingEmbedder, LocalVectorIndex, build_local_index, faiss, normalize
+
+
+def clustered_vectors(rng: np.random.Generator, centers: np.ndarray, size: int, noise: float,
+                      block: int = 50_000) -> np.ndarray:
+    vectors = np.empty((size, centers.shape[1]), dtype=np.float32)
+    for start in range(0, size, block):
+        stop = min(size, start + block)
+        topics = rng.integers(0, len(centers), stop - start)
+        jitter = rng.standard_normal((stop - start, centers.shape[1]), dtype=np.float32) * noise / np.sqrt(centers.shape[1])
+        vectors[start:stop] = normalize(centers[topics] + jitter)
+    return vectors
+
+
+def exact_top_k(vectors: np.ndarray, queries: np.ndarray, k: int) -> List[set]:
+    scores = queries @ vectors.T
+    return [set(np.argpartition(-row, k - 1)[:k].tolist()) for row in scores]
+
+
+def measure(index: LocalVectorIndex, queries: np.ndarray, truth: List[set], k: int) -> Dict[str, float]:
+    index.dense_search(queries[0], k)
+    timings, hits = [], 0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        ids, _ = index.dense_search(query, k)
+        timings.append(time.perf_counter() - start)
+        hits += len(expected & set(ids.tolist()))
+    return {"qps": len(queries) / sum(timings), "recall": hits / (k * len(queries)), **summarize(timings)}
+
+
+def dense_sweep(sizes: List[int], dim: int, noise: float, n_queries: int, k: int, nprobes: List[int], work_dir: Path):
+    rng = np.random.default_rng(0)
+    print(f"{'rows':>8} {'index':<22} {'QPS':>9} {'p50 ms':>8} {'p95 ms':>8} {'recall@' + str(k):>9} {'open s':>7}")
+    for size in sizes:
+        centers = normalize(rng.standard_normal((max(16, size // 500), dim), dtype=np.float32))
+        vectors = clustered_vectors(rng, centers, size, noise)
+        queries = clustered_vectors(rng, centers, n_queries, noise)
+        truth = exact_top_k(vectors, queries, k)
+        rows = [{"id": str(i), "content": "", "doc_uri": "", "metadata": "{}"} for i in range(size)]
+
+        start = time.perf_counter()
+        flat_path = build_local_index(work_dir / f"flat_{size}", rows, vectors, "flat")
+        ivf_path = build_local_index(work_dir / f"ivf_{size}", rows, vectors, "ivf")
+        print(f"{size:>8} built flat + ivf directories in {time.perf_counter() - start:.1f} s")
+
+        variants = [("flat numpy", flat_path, {})]
+        variants += [(f"ivf numpy nprobe={n}", ivf_path, {"nprobe": n}) for n in nprobes]
+        if faiss is not None:
+            variants += [("flat faiss", flat_path, {"engine": "faiss"})]
+            variants += [(f"ivf faiss nprobe={n}", ivf_path, {"engine": "faiss", "nprobe": n}) for n in nprobes]
+            hnsw_path = build_local_index(work_dir / f"hnsw_{size}", rows, vectors, "hnsw")
+            variants += [("hnsw faiss", hnsw_path, {"engine": "faiss"})]
+        for name, path, options in variants:
+            start = time.perf_counter()
+            index = LocalVectorIndex(str(path), embedder=None, **options)
+            opened = time.perf_counter() - start
+            result = measure(index, queries, truth, k)
+            print(f"{size:>8} {name:<22} {result['qps']:9.0f} {result['p50_ms']:8.2f} {result['p95_ms']:8.2f} "
+                  f"{result['recall']:9.1%} {opened:7.2f}")
+    if faiss is None:
+        print("faiss-cpu not installed, FAISS engines skipped")
+
+
+def hybrid(size: int, n_queries: int, k: int, work_dir: Path):
+    rng = random.Random(0)
+    texts = [" ".join(synthetic_lines(rng, 4)) for _ in range(size)]
+    rows = [{"id": str(i), "content": text, "doc_uri": f"doc_{i // 20}.pdf", "metadata": "{}"} for i, text in enumerate(texts)]
+    embedder = HashingEmbedder()
+    path = build_local_index(work_dir / f"hybrid_{size}", rows, embedder(texts), "flat")
+    index = LocalVectorIndex(str(path), embedder)
+    queries = [" ".join(text.split()[5:15]) for text in rng.sample(texts, n_queries)]
+    columns = ["id", "content", "doc_uri", "metadata"]
+
+    start = time.perf_counter()
+    index.bm25
+    print(f"\n{size} chunk texts, BM25 built in {time.perf_counter() - start:.2f} s")
+    for query_type in ("ANN", "HYBRID"):
+        timings = []
+        for query in queries:
+            start = time.perf_counter()
+            index.similarity_search(query, columns, num_results=k, query_type=query_type)
+            timings.append(time.perf_counter() - start)
+        stats = summarize(timings)
+        print(f"similarity_search {query_type:<7} {len(queries) / sum(timings):7.0f} QPS  p50 {stats['p50_ms']:6.2f} ms  "
+              f"p95 {stats['p95_ms']:6.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 300_000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--noise", type=float, default=3.0, help="distance of the vectors from their topic center")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 16, 32])
+    parser.add_argument("--hybrid-size", type=int, default=20_000)
+    args = parser.parse_args()
+
+    work_dir = Path(tempfile.mkdtemp(prefix="local_index_bench_"))
+    dense_sweep(args.sizes, args.dim, args.noise, args.queries, args.k, args.nprobe, work_dir)
+    hybrid(args.hybrid_size, args.queries, args.k, work_dir)
+
+
+if __name__ == "__main__":
+    main()
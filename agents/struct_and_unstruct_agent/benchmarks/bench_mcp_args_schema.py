@@ -0,0 +1,83 @@
+"""
+Times building LangChain tools for a large synthetic MCP catalog (e.g. hundreds of UC functions).
+
+Compares generating every argument model from scratch (the previous behaviour) with the
+`get_args_schema` cache, for a first build and for a rebuild in the same process.
+
+    python -m benchmarks.bench_mcp_args_schema --tools 500
+"""
+import random
+import argparse
+
+from benchmarks.utils import summarize, timeit
+
+FIELD_SCHEMAS = [
+    {"type": "string", "description": "Free text"},
+    {"type": "integer", "description": "A count"},
+    {"type": "number"},
+    {"type": "boolean"},
+    {"type": "string", "enum": ["asc", "desc"]},
+    {"type": "array", "items": {"type": "string"}, "description": "A list of tickers"},
+    {"type": "object", "properties": {"start": {"type": "string"}, "end": {"type": "string"}}, "required": ["start"]},
+    {"type": ["string", "null"]},
+]
+
+
+def synthetic_catalog(n_tools: int, n_signatures: int, seed: int = 0):
+    """`n_tools` tools drawn from `n_signatures` distinct input schemas, as in UC function catalogs"""
+    from mcp import types
+
+    rng = random.Random(seed)
+    signatures = []
+    for i in range(n_signatures):
+        n_fields = rng.randint(1, 6)
+        properties = {f"arg_{i}_{j}": rng.choice(FIELD_SCHEMAS) for j in range(n_fields)}
+        required = [name for name in properties if rng.random() < 0.5]
+        signatures.append({"type": "object", "properties": properties, "required": required})
+    return [
+        types.Tool(
+            name=f"catalog__schema__function_{i}",
+            description=f"Synthetic UC function {i}",
+            inputSchema=signatures[i % n_signatures],
+        )
+        for i in range(n_tools)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tools", type=int, default=500)
+    parser.add_argument("--signatures", type=int, default=None, help="distinct input schemas, defaults to --tools")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    from src.utils import mcp as mcp_utils
+
+    catalog = synthetic_catalog(args.tools, args.signatures or args.tools)
+
+    def build():
+        return [mcp_utils.create_langchain_tool_from_mcp(tool, "http://localhost/mcp", None) for tool in catalog]
+
+    def build_uncached():
+        tools = []
+        for tool in catalog:
+            mcp_utils._ARGS_SCHEMA_CACHE.clear()
+            tools.append(mcp_utils.create_langchain_tool_from_mcp(tool, "http://localhost/mcp", None))
+        return tools
+
+    def build_cold():
+        mcp_utils._ARGS_SCHEMA_CACHE.clear()
+        return build()
+
+    print(f"{args.tools} tools, {args.signatures or args.tools} distinct input schemas")
+    for label, fn in [
+        ("no cache (previous)", build_uncached),
+        ("cache, first build", build_cold),
+        ("cache, rebuild", build),
+    ]:
+        stats = summarize(timeit(fn, repeat=args.repeat))
+        print(f"{label:<22} " + "  ".join(f"{k}={v:.1f}" for k, v in stats.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Measures MCP tool discovery (agent startup) against several slow local MCP servers.
+
+Each stub server delays `list_tools` by `--delay` seconds. Reports startup for the previous
+sequential discovery, concurrent discovery, and a cold start served from the tool-schema cache.
+
+    python -m benchmarks.bench_mcp_discovery --servers 6 --delay 1.0
+"""
+import os
+import time
+import asyncio
+import argparse
+import tempfile
+
+from benchmarks.mcp_fixtures import LocalMCPServer, LocalWorkspaceClient
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--servers", type=int, default=6)
+    parser.add_argument("--delay", type=float, default=1.0)
+    parser.add_argument("--tools-per-server", type=int, default=5)
+    args = parser.parse_args()
+
+    from src.utils.mcp import create_mcp_tools, create_langchain_tool_from_mcp, get_session_pool, list_mcp_tools
+
+    servers = []
+    for i in range(args.servers):
+        server = LocalMCPServer(f"slow-{i}", list_tools_delay=args.delay)
+        for j in range(args.tools_per_server):
+            server.mcp.add_tool(lambda query: query, name=f"server_{i}_tool_{j}", description=f"Stub tool {j} of server {i}")
+        servers.append(server.start())
+    urls = [server.url for server in servers]
+    ws = LocalWorkspaceClient()
+    cache_path = os.path.join(tempfile.mkdtemp(), "mcp_tool_schema_cache.json")
+
+    async def sequential_discovery():
+        tools = []
+        for server_url in urls:
+            for mcp_tool in await list_mcp_tools(ws, server_url):
+                tools.append(create_langchain_tool_from_mcp(mcp_tool, server_url, ws, is_custom=True))
+        return tools
+
+    def run(label, coro_factory):
+        # Fresh pool per run so every measurement includes connection setup, like a new replica
+        get_session_pool().close()
+        start = time.perf_counter()
+        tools = asyncio.run(coro_factory())
+        elapsed = time.perf_counter() - start
+        print(f"{label:<32} {elapsed * 1000:8.1f} ms  ({len(tools)} tools)")
+
+    print(f"{args.servers} servers, list_tools delay {args.delay}s")
+    run("sequential", sequential_discovery)
+    run("concurrent", lambda: create_mcp_tools(ws, custom_server_urls=urls))
+    run("concurrent, populate cache", lambda: create_mcp_tools(ws, custom_server_urls=urls, cache_path=cache_path))
+    run("cold start from cache", lambda: create_mcp_tools(ws, custom_server_urls=urls, cache_path=cache_path))
+
+    # Let the background refreshes land before shutting the servers down
+    time.sleep(args.delay + 1)
+    get_session_pool().close()
+    for server in servers:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Verifies and times the pooled MCP sessions against a local streamable HTTP MCP server.
+
+Compares the previous per-call pattern (new connection, new ClientSession and `initialize()` for
+every tool call) with `MCPTool` going through the shared `MCPSessionPool`, then restarts the server
+to check that the pool reconnects transparently.
+
+    python -m benchmarks.bench_mcp_session_pool --calls 200
+"""
+import asyncio
+import argparse
+
+from pydantic import create_model
+
+from benchmarks.utils import summarize, timeit
+from benchmarks.mcp_fixtures import LocalMCPServer, LocalWorkspaceClient
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200)
+    args = parser.parse_args()
+
+    from mcp import ClientSession
+    from mcp.client.streamable_http import streamablehttp_client as connect
+    from src.utils.mcp import MCPTool, get_session_pool
+
+    server = LocalMCPServer("session-pool-bench")
+
+    @server.mcp.tool()
+    def echo(text: str) -> str:
+        """Echo the input text"""
+        return text
+
+    server.start()
+
+    async def call_with_new_session(text):
+        async with connect(server.url) as (read_stream, write_stream, _):
+            async with ClientSession(read_stream, write_stream) as session:
+                await session.initialize()
+                response = await session.call_tool("echo", {"text": text})
+                return "".join([c.text for c in response.content])
+
+    tools = [
+        MCPTool(
+            name="echo",
+            description="Echo the input text",
+            args_schema=create_model("echoArgs", text=(str, ...)),
+            server_url=server.url,
+            ws=LocalWorkspaceClient(),
+        )
+        for _ in range(2)
+    ]
+    assert tools[0].invoke({"text": "warmup"}) == "warmup"
+    assert len(get_session_pool()._sessions) == 1, "tools of the same server must share one session"
+
+    results = {
+        "per-call connection": timeit(lambda: asyncio.run(call_with_new_session("ping")), repeat=args.calls),
+        "pooled session (sync)": timeit(lambda: tools[0].invoke({"text": "ping"}), repeat=args.calls),
+        "pooled session (async)": timeit(lambda: asyncio.run(tools[1].ainvoke({"text": "ping"})), repeat=args.calls),
+    }
+    for label, timings in results.items():
+        print(f"{label:<24} " + "  ".join(f"{k}={v:.2f}" for k, v in summarize(timings).items()))
+
+    # Restart the server on the same port: the pooled session is dead and must be re-established
+    server.stop()
+    server.start()
+    assert tools[0].invoke({"text": "after restart"}) == "after restart"
+    print("reconnect after server restart: ok")
+
+    get_session_pool().close()
+    server.stop()
+
+
+if __name__ == "__main__":
+    main()
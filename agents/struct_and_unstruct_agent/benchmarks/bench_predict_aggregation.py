@@ -0,0 +1,78 @@
+"""
+Microbenchmark for `ToolCallingAgent.predict` text aggregation on long answers.
+
+Compares the previous aggregation (consume `predict_stream` and `+=` every delta into the output
+item) against the buffered non-streaming path, using a stand-in backend that emits N single-token
+deltas. Only needs the agent requirements installed, no Databricks endpoints.
+
+    python -m benchmarks.bench_predict_aggregation --tokens 10000
+"""
+import argparse
+
+from uuid import uuid4
+
+from benchmarks.utils import load_agent_module, stub_backend_module, summarize, timeit
+
+
+class StubProgram():
+    def __init__(self, n_tokens: int):
+        self.n_tokens = n_tokens
+
+    def predict_stream(self, request):
+        yield ("updates", {"role": "assistant", "content": "<name>Structured Agent</name>\nfacts", "id": "msg-1"})
+        for _ in range(self.n_tokens):
+            yield ("messages", {"role": "assistant", "content": " token", "id": "msg-2"})
+
+
+def legacy_predict(agent, request):
+    """Aggregation as done before the non-streaming path existed"""
+    outputs = []
+    stream_encountered = False
+    for event in agent.predict_stream(request):
+        if event.type == "response.output_item.done":
+            outputs.append(event.item)
+            stream_encountered = False
+        elif event.type == "response.output_text.delta":
+            if not stream_encountered:
+                outputs.append(
+                    agent.create_text_output_item(text=event.delta, id=event.item_id or str(uuid4()))
+                )
+                stream_encountered = True
+            else:
+                outputs[-1]["content"][-1]["text"] += event.delta
+    return outputs
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tokens", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    from mlflow.types.responses import ResponsesAgentRequest
+
+    agent_module = load_agent_module(
+        {"agent_backend": "langgraph"},
+        backend_modules={
+            "src.agent_impl.langgraph": stub_backend_module(
+                "src.agent_impl.langgraph", lambda _: StubProgram(args.tokens)
+            )
+        },
+    )
+    agent = agent_module.agent
+    request = ResponsesAgentRequest(input=[{"role": "user", "content": "benchmark"}])
+
+    expected = legacy_predict(agent, request)[-1]["content"][-1]["text"]
+    assert agent.predict(request).output[-1].content[-1]["text"] == expected
+
+    print(f"{args.tokens} token answer, {args.repeat} runs")
+    for label, fn in [
+        ("predict_stream + concat", lambda: legacy_predict(agent, request)),
+        ("predict (buffered)", lambda: agent.predict(request)),
+    ]:
+        stats = summarize(timeit(fn, repeat=args.repeat))
+        print(f"{label:<26} " + "  ".join(f"{k}={v:.1f}" for k, v in stats.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Two-stage retrieval of the vector search tool: over-fetch `num_candidates` from the index, rerank them
+(`src.utils.rerank`) and keep `num_results`, against returning the index's top `num_results` directly.
+
+The index is a local one (`src.utils.local_index`, hashing embedder) over the bundled PDFs' chunks plus
+synthetic distractor chunks about the same companies, so the answers compete with lookalikes the way they
+do in a full corpus. Reports hit@num_results of the question set of `bench_chunking_strategies` and the
+time of every stage. A miss is a fact the LLM doesn't see, usually paid for with another supervisor ->
+unstructured_agent round trip of several LLM calls, seconds against the milliseconds of reranking.
+
+    python -m benchmarks.bench_rerank --distractors 2000 --num-results 2
+"""
+import time
+import random
+import argparse
+import tempfile
+
+from pathlib import Path
+from statistics import mean
+
+from benchmarks.pdf_fixtures import synthetic_lines
+from benchmarks.bench_chunking_strategies import PDF_DIR, QUESTIONS, normalize
+
+from src.ingestion.chunking import get_chunker
+from src.ingestion.pdf import extract_page_texts, page_count
+from src.utils.local_index import HashingEmbedder, LocalVectorIndex, build_local_index
+from src.utils.rerank import FusionReranker
+
+COMPANIES = [("WWebServices", "WWS"), ("XBricks", "XBR"), ("YFlake", "YFK"), ("ZSoft", "ZSFT")]
+TOPICS = ["revenue", "EPS guidance", "dividend", "price target", "rating", "contract", "risks", "CEO", "growth"]
+COLUMNS = ["id", "content", "doc_uri", "metadata"]
+CHUNKING = {"strategy": "sentence", "sentence": {"max_tokens": 128, "overlap_ratio": 0.1}}
+
+
+def corpus(n_distractors: int, seed: int = 0):
+    chunker = get_chunker(CHUNKING)
+    rows = []
+    for path in sorted(PDF_DIR.glob("*.pdf")):
+        for chunk in chunker(extract_page_texts(str(path), 0, page_count(str(path)))):
+            rows.append({"content": normalize(chunk["content"]), "doc_uri": path.name})
+    rng = random.Random(seed)
+    for i in range(n_distractors):
+        name, ticker = rng.choice(COMPANIES)
+        topic = rng.choice(TOPICS)
+        lines = synthetic_lines(rng, 3)
+        rows.append({
+            "content": f"{name} ({ticker}) {topic} commentary for period {i % 12}: " + " ".join(lines),
+            "doc_uri": f"distractor_{i // 10:04d}.pdf",
+        })
+    return [{"id": str(i), "metadata": "{}", **row} for i, row in enumerate(rows)]
+
+
+def parse(results):
+    columns = [column["name"] for column in results["manifest"]["columns"]]
+    return [dict(zip(columns, row)) for row in results["result"]["data_array"]]
+
+
+def evaluate(index: LocalVectorIndex, query_type: str, num_results: int, num_candidates: int,
+             lexical_weight: float = 1.0):
+    reranker = FusionReranker(lexical_weight)
+    hits, in_candidates, timings = 0, 0, {"search_ms": [], "rerank_ms": []}
+    for question, answer in QUESTIONS:
+        start = time.perf_counter()
+        docs = parse(index.similarity_search(question, COLUMNS, max(num_results, num_candidates), query_type))
+        timings["search_ms"].append((time.perf_counter() - start) * 1000)
+        in_candidates += any(normalize(answer) in doc["content"] for doc in docs)
+        start = time.perf_counter()
+        if num_candidates:
+            docs = reranker.rerank(question, docs, num_results)
+        timings["rerank_ms"].append((time.perf_counter() - start) * 1000)
+        hits += any(normalize(answer) in doc["content"] for doc in docs[:num_results])
+    return hits, in_candidates, {stage: mean(values) for stage, values in timings.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--distractors", type=int, default=2000)
+    parser.add_argument("--num-results", type=int, default=2)
+    parser.add_argument("--candidates", type=int, nargs="+", default=[5, 10, 20])
+    parser.add_argument("--lexical-weight", type=float, default=1.0)
+    args = parser.parse_args()
+
+    rows = corpus(args.distractors)
+    embedder = HashingEmbedder()
+    path = build_local_index(Path(tempfile.mkdtemp(prefix="rerank_bench_")), rows, embedder([row["content"] for row in rows]))
+    index = LocalVectorIndex(str(path), embedder)
+    # Build BM25 up front, HYBRID would pay for it on its first query
+    index.bm25
+    print(f"{len(rows)} chunks, {len(QUESTIONS)} questions, num_results {args.num_results}")
+
+    for query_type in ("ANN", "HYBRID"):
+        for num_candidates in [0] + args.candidates:
+            hits, in_candidates, timings = evaluate(
+                index, query_type, args.num_results, num_candidates, args.lexical_weight
+            )
+            name = f"{query_type} top {args.num_results}" if not num_candidates else f"{query_type} {num_candidates} -> rerank"
+            print(
+                f"{name:<22} hit@{args.num_results} {hits / len(QUESTIONS):5.0%}  misses {len(QUESTIONS) - hits:2d}  "
+                f"answer in candidates {in_candidates / len(QUESTIONS):5.0%}  "
+                f"search {timings['search_ms']:6.2f} ms  rerank {timings['rerank_ms']:5.2f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
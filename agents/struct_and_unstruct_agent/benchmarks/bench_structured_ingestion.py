@@ -0,0 +1,107 @@
+"""
+Structured ingestion of a synthetic multi-million-row `daily_prices` CSV on a local Spark session:
+
+- pandas: `spark.createDataFrame(pd.read_csv(path))`, the previous driver path (Arrow enabled, as on
+          Databricks), the whole file is parsed and typed by pandas in the driver process
+- spark:  `src.ingestion.tables.read_csv` with the schema of metadata.json, parsed by Spark tasks
+
+Both write the table as parquet (Delta needs its jars, not available offline). Reports wall time,
+rows/s, the growth of the driver's peak RSS and the resulting column types.
+
+Needs a local pyspark (not databricks-connect) and a Java 17 runtime.
+
+    python -m benchmarks.bench_structured_ingestion --rows 5000000 --cores 4
+"""
+import json
+import time
+import argparse
+import resource
+import tempfile
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.utils import AGENT_DIR
+from benchmarks.bench_ingestion_chunking import local_spark
+
+from src.ingestion.tables import csv_header, csv_schema, read_csv
+
+METADATA_PATH = AGENT_DIR.parents[1] / "artifacts" / "data" / "structured" / "metadata.json"
+
+
+def synthetic_daily_prices(path: Path, rows: int, seed: int = 0, batch_rows: int = 200_000):
+    """
+    `rows` daily prices in the layout of artifacts/data/structured/daily_prices.csv, written in batches
+    so generating the file doesn't raise the process's peak RSS
+    """
+    rng = np.random.default_rng(seed)
+    tickers = np.array([f"T{i:04d}" for i in range(max(1, rows // 2500))])
+    for first in range(0, rows, batch_rows):
+        index = np.arange(first, min(rows, first + batch_rows))
+        open_ = rng.uniform(10, 500, len(index)).round(2)
+        close = (open_ * rng.uniform(0.95, 1.05, len(index))).round(2)
+        pd.DataFrame({
+            "id": index + 1,
+            "ticker": tickers[index % len(tickers)],
+            "date": (np.datetime64("2015-01-01") + (index // len(tickers))).astype(str),
+            "open": open_,
+            "high": (np.maximum(open_, close) * rng.uniform(1.0, 1.02, len(index))).round(2),
+            "low": (np.minimum(open_, close) * rng.uniform(0.98, 1.0, len(index))).round(2),
+            "close": close,
+            "volume": rng.integers(10_000, 5_000_000, len(index)),
+        }).to_csv(path, mode="a" if first else "w", header=not first, index=False)
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run(name: str, build, output: Path) -> dict:
+    rss_before = peak_rss_mb()
+    start = time.perf_counter()
+    df = build()
+    df.write.mode("overwrite").parquet(str(output))
+    elapsed = time.perf_counter() - start
+    return {"path": name, "seconds": elapsed, "peak_rss_growth_mb": peak_rss_mb() - rss_before, "dtypes": df.dtypes}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=3_000_000)
+    parser.add_argument("--cores", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=2)
+    args = parser.parse_args()
+
+    work_dir = Path(tempfile.mkdtemp(prefix="structured_bench_"))
+    csv_path = work_dir / "daily_prices.csv"
+    start = time.perf_counter()
+    synthetic_daily_prices(csv_path, args.rows)
+    print(f"{args.rows} rows, {csv_path.stat().st_size / 1e6:.0f} MB CSV generated in {time.perf_counter() - start:.1f} s")
+
+    spark = local_spark(args.cores)
+    spark.conf.set("spark.sql.execution.arrow.pyspark.enabled", "true")
+    with open(METADATA_PATH) as f:
+        column_types = json.load(f)["daily_prices"]["column_types"]
+    schema = csv_schema(csv_header(csv_path), column_types)
+
+    # Spark first: the driver's peak RSS only grows, the pandas path would mask it
+    paths = {
+        "spark": lambda: read_csv(spark, str(csv_path), schema),
+        "pandas": lambda: spark.createDataFrame(pd.read_csv(csv_path)),
+    }
+    for name, build in paths.items():
+        results = [run(name, build, work_dir / f"out_{name}") for _ in range(args.repeat)]
+        seconds = min(r["seconds"] for r in results)
+        print(
+            f"{name:<7} best of {args.repeat}: {seconds:6.1f} s  {args.rows / seconds:10.0f} rows/s  "
+            f"driver peak RSS +{max(r['peak_rss_growth_mb'] for r in results):6.0f} MB"
+        )
+        print(f"        types: {', '.join(f'{column} {dtype}' for column, dtype in results[0]['dtypes'])}")
+        assert spark.read.parquet(str(work_dir / f"out_{name}")).count() == args.rows
+    spark.stop()
+
+
+if __name__ == "__main__":
+    main()
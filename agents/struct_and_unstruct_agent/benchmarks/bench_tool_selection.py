@@ -0,0 +1,63 @@
+"""
+Reports the tool-schema prompt tokens saved per request by binding only the top-k relevant MCP tools.
+
+Builds a catalog of the two demo tools (Genie space, vector search index) plus N synthetic UC functions
+and ranks it against the agent's target questions.
+
+    python -m benchmarks.bench_tool_selection --tools 200 --top-k 8
+"""
+import argparse
+
+from benchmarks.utils import summarize, timeit
+from benchmarks.bench_mcp_args_schema import synthetic_catalog
+
+QUESTIONS = [
+    "What was the one-day price change and percent change due to the XBR press release in Q3 2025 and what were the reason behind it?",
+    "Which company had the highest quarter-over-quarter revenue growth in Q3 2025 and what was its stock closing price on the announcement date?",
+    "After WWebServices announced its Q2 2025 earnings on June 30, 2025, by how much did its stock price change compared to the previous trading day?",
+]
+
+
+def demo_tools():
+    from mcp import types
+
+    return [
+        types.Tool(
+            name="query_space_01f0genie",
+            description="Query the Genie space with data about listed companies' ticker, name, financials, and daily stock prices.",
+            inputSchema={"type": "object", "properties": {"query": {"type": "string"}}, "required": ["query"]},
+        ),
+        types.Tool(
+            name="main__finance__doc_chunks_index",
+            description="Retrieve facts from press releases, shareholder letters and analyst notes on various companies.",
+            inputSchema={"type": "object", "properties": {"query": {"type": "string"}}, "required": ["query"]},
+        ),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tools", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=8)
+    args = parser.parse_args()
+
+    from src.utils.mcp import create_langchain_tool_from_mcp
+    from src.utils.tool_selection import ToolSelector
+
+    catalog = demo_tools() + synthetic_catalog(args.tools, args.tools)
+    tools = [create_langchain_tool_from_mcp(tool, "http://localhost/mcp", None) for tool in catalog]
+    selector = ToolSelector(tools, top_k=args.top_k)
+
+    print(f"{len(tools)} tools, {selector.all_schema_tokens} schema tokens when all are bound, top_k={args.top_k}")
+    for question in QUESTIONS:
+        selected = selector.select(question)
+        bound = sum(selector.schema_tokens[tool.name] for tool in selected)
+        print(f"- {question[:60]}...")
+        print(f"  bound {len(selected)} tools, {bound} tokens, saved {selector.all_schema_tokens - bound} tokens")
+        print(f"  selected: {[tool.name for tool in selected][:4]}")
+    stats = summarize(timeit(lambda: [selector.select(q) for q in QUESTIONS], repeat=20))
+    print(f"selection latency per request: {stats['mean_ms'] / len(QUESTIONS):.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import time
+import socket
+import asyncio
+import threading
+
+import uvicorn
+
+from typing import Dict
+from mcp.server.fastmcp import FastMCP
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class _LocalWorkspaceConfig():
+    def authenticate(self) -> Dict[str, str]:
+        return {"Authorization": "Bearer local-token"}
+
+
+class LocalWorkspaceClient():
+    """Workspace client handing out a dummy bearer token, the local servers don't check it"""
+
+    def __init__(self, *args, **kwargs):
+        self.config = _LocalWorkspaceConfig()
+
+
+class SlowFastMCP(FastMCP):
+    """FastMCP whose list_tools takes `list_tools_delay` seconds, like a cold remote server"""
+
+    def __init__(self, *args, list_tools_delay: float = 0, **kwargs):
+        self.list_tools_delay = list_tools_delay
+        super().__init__(*args, **kwargs)
+
+    async def list_tools(self):
+        await asyncio.sleep(self.list_tools_delay)
+        return await super().list_tools()
+
+
+class LocalMCPServer():
+    """
+    Streamable HTTP MCP server running in a background thread, used as a stand-in for
+    managed / custom Databricks MCP servers. Tools are registered with `server.mcp.tool()`.
+    """
+
+    def __init__(self, name: str = "local", port: int = None, list_tools_delay: float = 0):
+        self.port = port or free_port()
+        self.mcp = SlowFastMCP(name, host="127.0.0.1", port=self.port, list_tools_delay=list_tools_delay)
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/mcp"
+
+    def start(self):
+        # A session manager only runs once, restarting the server (reconnect checks) needs a fresh one
+        self.mcp._session_manager = None
+        # Short graceful shutdown: pooled clients keep their session streams open until the server drops them
+        config = uvicorn.Config(
+            self.mcp.streamable_http_app(),
+            host="127.0.0.1",
+            port=self.port,
+            log_level="critical",
+            timeout_graceful_shutdown=1,
+        )
+        self._server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+        return self
+
+    def stop(self):
+        self._server.should_exit = True
+        self._thread.join()
@@ -0,0 +1,68 @@
+import random
+
+from pathlib import Path
+from typing import List
+
+WORDS = (
+    "revenue growth quarter margin guidance shares price analyst cloud segment operating income "
+    "outlook demand customers earnings dividend capital expenditure currency headwinds renewals "
+    "press release shareholders letter announced fiscal year basis points free cash flow"
+).split()
+
+
+def synthetic_lines(rng: random.Random, n_lines: int, width: int = 90) -> List[str]:
+    lines = []
+    for _ in range(n_lines):
+        words, length = [], 0
+        while length < width:
+            word = rng.choice(WORDS)
+            words.append(word)
+            length += len(word) + 1
+        lines.append(" ".join(words).capitalize() + ".")
+    return lines
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_text_pdf(path: Path, pages: List[List[str]]):
+    """Minimal PDF with one Helvetica text line per entry of every page, parseable by pdfplumber"""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, once the page object numbers are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_ids = []
+    for lines in pages:
+        stream = "BT /F1 9 Tf 11 TL 40 800 Td " + " ".join(f"({_escape(line)}) Tj T*" for line in lines) + " ET"
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream.encode("latin-1")))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] /Resources << /Font << /F1 3 0 R >> >> "
+            b"/Contents %d 0 R >>" % len(objects)
+        )
+        page_ids.append(len(objects))
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids)
+    objects[1] = f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>".encode()
+
+    out, offsets = bytearray(b"%PDF-1.4\n"), []
+    for i, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (i, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    Path(path).write_bytes(bytes(out))
+
+
+def synthetic_pdfs(directory: Path, n_docs: int, n_pages: int, lines_per_page: int = 60, seed: int = 0) -> List[Path]:
+    """`n_docs` PDFs of `n_pages` pages of filler financial text"""
+    rng = random.Random(seed)
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for i in range(n_docs):
+        path = directory / f"synthetic_{i:04d}.pdf"
+        write_text_pdf(path, [synthetic_lines(rng, lines_per_page) for _ in range(n_pages)])
+        paths.append(path)
+    return paths
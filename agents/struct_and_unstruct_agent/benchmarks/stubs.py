@@ -0,0 +1,353 @@
+"""
+Local stand-ins for the Databricks services used by the agent graphs.
+
+`install_stubs` swaps `ChatDatabricks`, `GenieAgent`, `VectorSearchClient` and `WorkspaceClient` for
+the classes below before `src.agent` is imported, and `start_stub_mcp_server` serves the Genie and
+vector search tools of the MCP backend from a local MCP server. Every stand-in sleeps according to
+the shared `StubProfile` and counts its calls / tokens in `COUNTERS`.
+
+The stub LLM follows a fixed script so both graphs take their usual path: the supervisor routes to
+unstructured_agent, structured_agent then response_agent, tool-calling agents call their tools once
+and then answer.
+"""
+import json
+import math
+import time
+import asyncio
+import threading
+
+from uuid import uuid4
+from dataclasses import dataclass, fields
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence
+
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableLambda
+from langchain_core.language_models.chat_models import (
+    BaseChatModel,
+    agenerate_from_stream,
+    generate_from_stream,
+)
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from benchmarks.mcp_fixtures import LocalMCPServer
+
+GENIE_TOOL_NAME = "query_space_stub"
+VECTOR_SEARCH_TOOL_NAME = "main__finance__doc_chunks_index"
+
+FACTS = [
+    "XBR shares rose 4.2% on the day of its Q3 2025 press release after revenue beat guidance.",
+    "Management attributed the margin expansion to lower logistics costs and a richer product mix.",
+    "WWebServices reported Q2 2025 earnings on June 30, 2025 with cloud revenue up 18% year over year.",
+    "Analysts flagged currency headwinds and slower enterprise renewals as the main risks for next quarter.",
+]
+
+GENIE_TABLE = (
+    "| ticker | date | close | prev_close | change | pct_change |\n"
+    "|---|---|---|---|---|---|\n"
+    "| XBR | 2025-10-21 | 52.10 | 50.00 | 2.10 | 4.20 |"
+)
+
+
+@dataclass
+class StubProfile:
+    """Latency and token model of the stand-ins, times in seconds"""
+    llm_ttft_seconds: float = 0.25
+    llm_prefill_tokens_per_second: float = 20000
+    llm_tokens_per_second: float = 80
+    llm_answer_tokens: int = 120
+    genie_latency_seconds: float = 2.0
+    vector_search_latency_seconds: float = 0.3
+    mcp_list_tools_delay: float = 0.0
+
+
+class StubCounters():
+    """Thread-safe call and token counters, reset per replayed request"""
+
+    NAMES = ("llm_calls", "input_tokens", "output_tokens", "genie_calls", "vector_search_calls")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._values = {name: 0 for name in self.NAMES}
+
+    def add(self, **values: int):
+        with self._lock:
+            for name, value in values.items():
+                self._values[name] += value
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._values)
+
+
+PROFILE = StubProfile()
+COUNTERS = StubCounters()
+WORKSPACE_HOST = "http://127.0.0.1"
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text or "") / 4)
+
+
+def _content_text(message: BaseMessage) -> str:
+    return message.content if isinstance(message.content, str) else json.dumps(message.content)
+
+
+def _last_user_index(messages: Sequence[BaseMessage]) -> int:
+    for i in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[i], HumanMessage):
+            return i
+    return 0
+
+
+class StubChatDatabricks(BaseChatModel):
+    """
+    Scripted chat model with the `ChatDatabricks` constructor. The reply depends on the bound tools:
+    a `Router` tool is the supervisor, other tools are called once per user turn, no tools is an answer.
+    """
+
+    endpoint: str = "stub"
+    extra_params: Optional[Dict[str, Any]] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub-chat-databricks"
+
+    def bind_tools(self, tools, tool_choice=None, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], tool_choice=tool_choice, **kwargs)
+
+    def _reply(self, messages: List[BaseMessage], tools: Optional[List[Dict[str, Any]]]) -> AIMessage:
+        tool_names = [tool["function"]["name"] for tool in tools or []]
+        user_index = _last_user_index(messages)
+        question = _content_text(messages[user_index])
+        turn = messages[user_index + 1:]
+
+        if "Router" in tool_names:
+            transcript = "\n".join(_content_text(message) for message in turn)
+            if "<name>Unstructured Agent</name>" not in transcript:
+                next_agent = "unstructured_agent"
+            elif "<name>Structured Agent</name>" not in transcript:
+                next_agent = "structured_agent"
+            else:
+                next_agent = "response_agent"
+            arguments = {"observation": f"Facts needed for: {question}", "action": "route", "next": next_agent}
+            return AIMessage(content="", tool_calls=[{"name": "Router", "args": arguments, "id": f"call_{uuid4().hex}"}])
+
+        if tool_names and not any(isinstance(message, ToolMessage) for message in turn):
+            return AIMessage(
+                content="",
+                tool_calls=[
+                    {"name": name, "args": {"query": question}, "id": f"call_{uuid4().hex}"}
+                    for name in tool_names
+                ],
+            )
+
+        words = [f"token{i}" for i in range(PROFILE.llm_answer_tokens)]
+        return AIMessage(content=" ".join(words))
+
+    def _prompt_tokens(self, messages: List[BaseMessage], tools: Optional[List[Dict[str, Any]]]) -> int:
+        return sum(estimate_tokens(_content_text(message)) for message in messages) + estimate_tokens(
+            json.dumps(tools) if tools else ""
+        )
+
+    def _chunks(self, reply: AIMessage, input_tokens: int) -> Iterator[AIMessageChunk]:
+        """Yields the reply as it would stream from the endpoint, the last chunk carries usage"""
+        if reply.tool_calls:
+            output_tokens = estimate_tokens(json.dumps([tool_call["args"] for tool_call in reply.tool_calls]))
+            parts = [
+                AIMessageChunk(
+                    content="",
+                    tool_call_chunks=[
+                        {
+                            "name": tool_call["name"],
+                            "args": json.dumps(tool_call["args"]),
+                            "id": tool_call["id"],
+                            "index": i,
+                        }
+                        for i, tool_call in enumerate(reply.tool_calls)
+                    ],
+                )
+            ]
+        else:
+            tokens = reply.content.split(" ")
+            output_tokens = len(tokens)
+            parts = [AIMessageChunk(content=(" " if i else "") + token) for i, token in enumerate(tokens)]
+
+        COUNTERS.add(llm_calls=1, input_tokens=input_tokens, output_tokens=output_tokens)
+        parts.append(
+            AIMessageChunk(
+                content="",
+                usage_metadata={
+                    "input_tokens": input_tokens,
+                    "output_tokens": output_tokens,
+                    "total_tokens": input_tokens + output_tokens,
+                },
+                response_metadata={"finish_reason": "tool_calls" if reply.tool_calls else "stop"},
+            )
+        )
+        return iter(parts)
+
+    def _first_token_delay(self, input_tokens: int) -> float:
+        return PROFILE.llm_ttft_seconds + input_tokens / PROFILE.llm_prefill_tokens_per_second
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        tools = kwargs.get("tools")
+        input_tokens = self._prompt_tokens(messages, tools)
+        time.sleep(self._first_token_delay(input_tokens))
+        for i, chunk in enumerate(self._chunks(self._reply(messages, tools), input_tokens)):
+            if i:
+                time.sleep(1 / PROFILE.llm_tokens_per_second)
+            generation = ChatGenerationChunk(message=chunk)
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.content, chunk=generation)
+            yield generation
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        tools = kwargs.get("tools")
+        input_tokens = self._prompt_tokens(messages, tools)
+        await asyncio.sleep(self._first_token_delay(input_tokens))
+        for i, chunk in enumerate(self._chunks(self._reply(messages, tools), input_tokens)):
+            if i:
+                await asyncio.sleep(1 / PROFILE.llm_tokens_per_second)
+            generation = ChatGenerationChunk(message=chunk)
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.content, chunk=generation)
+            yield generation
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        return generate_from_stream(self._stream(messages, stop, run_manager, **kwargs))
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        return await agenerate_from_stream(self._astream(messages, stop, run_manager, **kwargs))
+
+
+def _genie_messages() -> Dict[str, List[AIMessage]]:
+    return {
+        "messages": [
+            AIMessage(content="Joined daily prices with the press release dates.", name="query_reasoning"),
+            AIMessage(content="SELECT ticker, date, close FROM daily_prices", name="query_sql"),
+            AIMessage(content=GENIE_TABLE, name="query_result"),
+        ]
+    }
+
+
+def StubGenieAgent(genie_space_id, genie_agent_name: str = "Genie", description: str = "", **kwargs):
+    """Same signature as `databricks_langchain.genie.GenieAgent`, answers with a fixed result table"""
+
+    def query(input):
+        COUNTERS.add(genie_calls=1)
+        time.sleep(PROFILE.genie_latency_seconds)
+        return _genie_messages()
+
+    async def aquery(input):
+        COUNTERS.add(genie_calls=1)
+        await asyncio.sleep(PROFILE.genie_latency_seconds)
+        return _genie_messages()
+
+    return RunnableLambda(query, afunc=aquery, name=genie_agent_name)
+
+
+def _vector_search_rows(query_text: str, num_results: int,
+                        columns: Sequence[str] = ("id", "content", "doc_uri", "metadata")) -> List[List[Any]]:
+    rows = []
+    for i in range(num_results):
+        fact = FACTS[(len(query_text) + i) % len(FACTS)]
+        values = {
+            "id": f"chunk-{i}",
+            "content": fact,
+            "doc_uri": f"/Volumes/main/finance/docs/doc_{i}.pdf",
+            "metadata": "{}",
+            "char_start": i * 1000,
+            "char_end": i * 1000 + len(fact),
+        }
+        rows.append([values.get(column) for column in columns] + [0.9 - i * 0.1])
+    return rows
+
+
+class StubVectorSearchIndex():
+    def __init__(self, index_name: str):
+        self.index_name = index_name
+
+    def similarity_search(self, query_text: str, columns: Sequence[str], num_results: int = 5, **kwargs):
+        COUNTERS.add(vector_search_calls=1)
+        time.sleep(PROFILE.vector_search_latency_seconds)
+        rows = _vector_search_rows(query_text, num_results, columns)
+        return {
+            "manifest": {"columns": [{"name": name} for name in list(columns) + ["score"]]},
+            "result": {"row_count": len(rows), "data_array": rows},
+        }
+
+
+class StubVectorSearchClient():
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def get_index(self, endpoint_name: str = None, index_name: str = None):
+        return StubVectorSearchIndex(index_name)
+
+
+class _StubWorkspaceConfig():
+    @property
+    def host(self) -> str:
+        return WORKSPACE_HOST
+
+    def authenticate(self) -> Dict[str, str]:
+        return {"Authorization": "Bearer stub-token"}
+
+
+class StubWorkspaceClient():
+    """Points MCP server URLs at the local stub server and hands out a dummy bearer token"""
+
+    def __init__(self, *args, **kwargs):
+        self.config = _StubWorkspaceConfig()
+
+
+def start_stub_mcp_server() -> LocalMCPServer:
+    """Serves the Genie and vector search MCP tools on one local server, returns it started"""
+    global WORKSPACE_HOST
+
+    server = LocalMCPServer("stub-databricks", list_tools_delay=PROFILE.mcp_list_tools_delay)
+
+    @server.mcp.tool(name=GENIE_TOOL_NAME)
+    async def query_space(query: str) -> str:
+        """Query the Genie space with data about listed companies' ticker, name, financials, and daily stock prices."""
+        COUNTERS.add(genie_calls=1)
+        await asyncio.sleep(PROFILE.genie_latency_seconds)
+        return GENIE_TABLE
+
+    @server.mcp.tool(name=VECTOR_SEARCH_TOOL_NAME)
+    async def doc_chunks_index(query: str) -> str:
+        """Retrieve facts from press releases, shareholder letters and analyst notes on various companies."""
+        COUNTERS.add(vector_search_calls=1)
+        await asyncio.sleep(PROFILE.vector_search_latency_seconds)
+        return json.dumps([{"content": row[1], "doc_uri": row[2]} for row in _vector_search_rows(query, 2)])
+
+    server.start()
+    WORKSPACE_HOST = f"http://127.0.0.1:{server.port}"
+    return server
+
+
+def install_stubs(**profile: Any):
+    """
+    Patch the Databricks clients with the stand-ins, must run before `src.agent` is imported.
+    Keyword arguments override `StubProfile` fields.
+    """
+    import databricks.sdk
+    import databricks_langchain
+    import databricks_langchain.genie
+    import databricks.vector_search.client
+
+    valid = {field.name for field in fields(StubProfile)}
+    for name, value in profile.items():
+        if name not in valid:
+            raise ValueError(f"Unknown stub profile field {name}")
+        setattr(PROFILE, name, value)
+
+    databricks_langchain.ChatDatabricks = StubChatDatabricks
+    databricks_langchain.genie.GenieAgent = StubGenieAgent
+    databricks.vector_search.client.VectorSearchClient = StubVectorSearchClient
+    databricks.sdk.WorkspaceClient = StubWorkspaceClient
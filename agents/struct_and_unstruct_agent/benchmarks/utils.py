@@ -0,0 +1,70 @@
+import os
+import sys
+import time
+import types
+import tempfile
+import importlib
+
+import yaml
+
+from pathlib import Path
+from statistics import mean, quantiles
+from typing import Any, Callable, Dict, List, Optional
+
+AGENT_DIR = Path(__file__).resolve().parents[1]
+if str(AGENT_DIR) not in sys.path:
+    sys.path.insert(0, str(AGENT_DIR))
+
+# Keep the MLflow traces of local benchmark runs out of the working tree
+os.environ.setdefault(
+    "MLFLOW_TRACKING_URI", f"sqlite:///{tempfile.mkdtemp(prefix='agent_bench_mlflow_')}/mlflow.db"
+)
+
+
+def load_agent_module(config: Dict[str, Any], backend_modules: Optional[Dict[str, Any]] = None):
+    """
+    Import `src.agent` against a throwaway config directory.
+
+    `src.agent` builds its agent at import time from `<cwd>/configs/config.yaml`, so the config is
+    written to a temp dir which is used as cwd while importing. `backend_modules` maps module names
+    (e.g. `src.agent_impl.langgraph`) to objects installed in `sys.modules` before the import.
+    """
+    config_dir = Path(tempfile.mkdtemp(prefix="agent_bench_")) / "configs"
+    config_dir.mkdir(parents=True)
+    with open(config_dir / "config.yaml", "w") as f:
+        yaml.safe_dump(config, f)
+
+    for name, module in (backend_modules or {}).items():
+        sys.modules[name] = module
+    sys.modules.pop("src.agent", None)
+
+    cwd = os.getcwd()
+    os.chdir(config_dir.parent)
+    try:
+        return importlib.import_module("src.agent")
+    finally:
+        os.chdir(cwd)
+
+
+def stub_backend_module(name: str, program_factory: Callable[[Any], Any]) -> types.ModuleType:
+    """Module exposing `LangGraphAgent` so that `ToolCallingAgent` picks up a stand-in program"""
+    module = types.ModuleType(name)
+    module.LangGraphAgent = program_factory
+    return module
+
+
+def timeit(fn: Callable[[], Any], repeat: int = 5) -> List[float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def summarize(timings: List[float]) -> Dict[str, float]:
+    return {
+        "mean_ms": mean(timings) * 1000,
+        "p50_ms": sorted(timings)[len(timings) // 2] * 1000,
+        "p95_ms": (quantiles(timings, n=20)[-1] if len(timings) > 1 else timings[0]) * 1000,
+    }
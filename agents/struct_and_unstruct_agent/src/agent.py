@@ -3,7 +3,7 @@ import json
 import mlflow
 
 from uuid import uuid4
-from typing import Any, Callable, Generator, Optional, Dict
+from typing import Any, AsyncGenerator, Callable, Generator, Optional, Dict
 
 from databricks.sdk import WorkspaceClient
 from mlflow.entities import SpanType
@@ -23,6 +23,8 @@ class ToolCallingAgent(ResponsesAgent):
     """
 
     def __init__(self, model_config: mlflow.models.ModelConfig):
+        # Optional key, ModelConfig.get has no default
+        self.metrics_stream_event = model_config.to_dict().get("agent_metrics_stream_event", False)
         if model_config.get("agent_backend") == "langgraph":
             from src.agent_impl.langgraph import LangGraphAgent
             self.program = LangGraphAgent(model_config)
@@ -125,16 +127,20 @@ class ToolCallingAgent(ResponsesAgent):
             self, inputs: Dict[str, Any]
     ) -> Generator[ResponsesAgentStreamEvent, None, None]:
         for event_type, event in self.program.predict_stream(inputs):
-            if event_type == "updates":
-                for item in self._langchain_to_responses(event):
-                    yield ResponsesAgentStreamEvent(
-                        type="response.output_item.done",
-                        item=item
-                    )
-            elif event_type == "messages":
-                yield ResponsesAgentStreamEvent(
-                    **self.create_text_delta(delta=event["content"], item_id=event["id"]),
-                )
+            yield from self._stream_events(event_type, event)
+
+    def _stream_events(self, event_type: str, event: dict[str, Any]) -> list[ResponsesAgentStreamEvent]:
+        """Stream events of a backend event, shared by predict_stream and apredict_stream"""
+        if event_type == "updates":
+            return [
+                ResponsesAgentStreamEvent(type="response.output_item.done", item=item)
+                for item in self._langchain_to_responses(event)
+            ]
+        elif event_type == "messages":
+            return [ResponsesAgentStreamEvent(**self.create_text_delta(delta=event["content"], item_id=event["id"]))]
+        elif event_type == "metrics" and self.metrics_stream_event:
+            return [self._metrics_event(event)]
+        return []
 
     @mlflow.trace(span_type=SpanType.AGENT)
     def predict_stream(
@@ -146,27 +152,96 @@ class ToolCallingAgent(ResponsesAgent):
         for event in self._langchain_predict_stream(inputs):
             yield event
     
+    def _metrics_event(self, metrics: dict[str, Any]) -> ResponsesAgentStreamEvent:
+        """Final stream event carrying the per-node latency / token metrics of the request"""
+        return ResponsesAgentStreamEvent(type="response.agent_metrics", custom_outputs={"agent_metrics": metrics})
+
+    def _custom_outputs(self, request: ResponsesAgentRequest, metrics: Optional[dict[str, Any]]) -> dict[str, Any]:
+        custom_outputs = dict(request.custom_inputs or {})
+        if metrics is not None:
+            custom_outputs["agent_metrics"] = metrics
+        return custom_outputs
+
+    def _collect_output(self, outputs: list, text_buffer: dict, event_type: str, event: dict[str, Any]):
+        """Aggregate an output event into `outputs`, buffering text deltas until their item completes"""
+        if event_type == "updates":
+            self._flush_text(outputs, text_buffer)
+            outputs.extend(self._langchain_to_responses(event))
+        elif event_type == "messages":
+            if not text_buffer["deltas"]:
+                text_buffer["id"] = event["id"]
+            text_buffer["deltas"].append(event["content"])
+
+    def _flush_text(self, outputs: list, text_buffer: dict):
+        if text_buffer["deltas"]:
+            outputs.append(
+                self.create_text_output_item(
+                    text="".join(text_buffer["deltas"]),
+                    id=text_buffer["id"] or str(uuid4()),
+                )
+            )
+            text_buffer["deltas"] = []
+
+    @mlflow.trace(span_type=SpanType.AGENT)
+    def _langchain_predict(self, inputs: Dict[str, Any]) -> tuple[list[dict[str, Any]], Optional[dict[str, Any]]]:
+        """
+        Non-streaming execution: consumes the backend events directly, buffers text deltas and
+        joins them once per output item instead of building a stream event and a new string per token.
+        Returns the output items and the run metrics.
+        """
+        outputs, text_buffer, metrics = [], {"id": None, "deltas": []}, None
+        for event_type, event in self.program.predict_stream(inputs):
+            if event_type == "metrics":
+                metrics = event
+            else:
+                self._collect_output(outputs, text_buffer, event_type, event)
+        self._flush_text(outputs, text_buffer)
+        return outputs, metrics
+
+    @mlflow.trace(span_type=SpanType.AGENT)
+    async def _alangchain_predict(self, inputs: Dict[str, Any]) -> tuple[list[dict[str, Any]], Optional[dict[str, Any]]]:
+        outputs, text_buffer, metrics = [], {"id": None, "deltas": []}, None
+        async for event_type, event in self.program.apredict_stream(inputs):
+            if event_type == "metrics":
+                metrics = event
+            else:
+                self._collect_output(outputs, text_buffer, event_type, event)
+        self._flush_text(outputs, text_buffer)
+        return outputs, metrics
+
     @mlflow.trace(span_type=SpanType.AGENT)
     def predict(self, request: ResponsesAgentRequest) -> ResponsesAgentResponse:
-        outputs = []
-        stream_encountered = False
-        # TODO Combine stream
-        for event in self.predict_stream(request):
-            if event.type == "response.output_item.done":
-                outputs.append(event.item)
-                stream_encountered = False
-            elif event.type == "response.output_text.delta":
-                if not stream_encountered:
-                    outputs.append(
-                        self.create_text_output_item(
-                            text=event.delta,
-                            id=event.item_id or str(uuid4()),
-                        )
-                    )
-                    stream_encountered = True
-                else:
-                    outputs[-1]["content"][-1]["text"] += event.delta
-        return ResponsesAgentResponse(output=outputs, custom_outputs=request.custom_inputs)
+        inputs = {
+            "messages": self.prepare_messages_for_llm([i.model_dump() for i in request.input]),
+        }
+        outputs, metrics = self._langchain_predict(inputs)
+        return ResponsesAgentResponse(output=outputs, custom_outputs=self._custom_outputs(request, metrics))
+
+    @mlflow.trace(span_type=SpanType.AGENT)
+    async def apredict_stream(
+        self, request: ResponsesAgentRequest
+    ) -> AsyncGenerator[ResponsesAgentStreamEvent, None]:
+        """Async counterpart of predict_stream, runs the graph with astream on the caller's event loop"""
+        if isinstance(request, dict):
+            # predict/predict_stream get this conversion from ResponsesAgent, the async methods do not
+            request = ResponsesAgentRequest(**request)
+        inputs = {
+            "messages": self.prepare_messages_for_llm([i.model_dump() for i in request.input]),
+        }
+        async for event_type, event in self.program.apredict_stream(inputs):
+            for stream_event in self._stream_events(event_type, event):
+                yield stream_event
+
+    @mlflow.trace(span_type=SpanType.AGENT)
+    async def apredict(self, request: ResponsesAgentRequest) -> ResponsesAgentResponse:
+        """Async counterpart of predict, lets one replica multiplex many concurrent conversations"""
+        if isinstance(request, dict):
+            request = ResponsesAgentRequest(**request)
+        inputs = {
+            "messages": self.prepare_messages_for_llm([i.model_dump() for i in request.input]),
+        }
+        outputs, metrics = await self._alangchain_predict(inputs)
+        return ResponsesAgentResponse(output=outputs, custom_outputs=self._custom_outputs(request, metrics))
         
 
 # specify config path
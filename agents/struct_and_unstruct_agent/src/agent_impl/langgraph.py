@@ -6,7 +6,7 @@ from enum import Enum
 from typing import (
     Any, Generator, Optional, Sequence, Union, Annotated, List, TypedDict
 )
-from mlflow.langchain.chat_agent_langgraph import ChatAgentState, ChatAgentToolNode
+from mlflow.langchain.chat_agent_langgraph import ChatAgentState
 
 from langchain_core.messages import (
     AIMessage,
@@ -14,6 +14,7 @@ from langchain_core.messages import (
     HumanMessage,
     SystemMessage,
 )
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import END, StateGraph
 from langgraph.graph.state import CompiledStateGraph
 
@@ -21,6 +22,8 @@ from databricks.sdk import WorkspaceClient
 from databricks_langchain import ChatDatabricks
 
 from src.utils.genie import get_genie_agent
+from src.utils.metrics import AgentMetricsHandler
+from src.utils.tool_node import AgentToolNode
 from src.utils.vector_search import create_vector_search_tool
 
 MAX_ITERATION_MESSAGE = "<name>Response Agent</name> Agent stopped due to max iterations. Please try again with more specific query!"
@@ -45,7 +48,7 @@ def create_agent_workflow(
     workers = [
         worker
         for worker in model_config.get("agents").keys()
-        if (worker not in ("supervisor",))
+        if (worker not in ("supervisor", "mcp_agent")) # mcp_agent config belongs to the mcp backend
     ]
     WorkerOptions = Enum("WorkerOptions", {opt: opt for opt in workers})
 
@@ -56,46 +59,62 @@ def create_agent_workflow(
         next: WorkerOptions = pydantic.Field(description="worker to route to next") # type: ignore
 
 
-    def supervisor_agent_node(state: AgentState):
-        if state.get("iterations", 0) > model_config.get("agents_max_iterations"):
-            return {"next": "RECURSION_LIMIT"}
+    supervisor_llm = llm.with_structured_output(Router, include_raw=True)
 
-        messages = [
+    def supervisor_messages(state: AgentState):
+        return [
             {
                 "role": "system",
                 "content": model_config.get("agents").get("supervisor").get("system_prompt"),
             },
         ] + state["messages"]
 
-        response = llm.with_structured_output(Router, include_raw=True).invoke(messages)
-
+    def supervisor_update(state: AgentState, response):
         return {
             "next": response.get("parsed").get("next"),
             "iterations": state.get("iterations", 0) + 1,
         }
 
-    def unstructured_agent_node(state: AgentState):
-        messages = [
+    def supervisor_agent_node(state: AgentState):
+        if state.get("iterations", 0) > model_config.get("agents_max_iterations"):
+            return {"next": "RECURSION_LIMIT"}
+
+        response = supervisor_llm.invoke(supervisor_messages(state))
+        return supervisor_update(state, response)
+
+    async def asupervisor_agent_node(state: AgentState):
+        if state.get("iterations", 0) > model_config.get("agents_max_iterations"):
+            return {"next": "RECURSION_LIMIT"}
+
+        response = await supervisor_llm.ainvoke(supervisor_messages(state))
+        return supervisor_update(state, response)
+
+    def unstructured_agent_messages(state: AgentState):
+        return [
             {
                 "role": "system",
                 "content": model_config.get("agents").get("unstructured_agent").get("system_prompt")
             },
         ] + state["messages"]
 
-        response = llm_with_tools.invoke(messages)
-
+    def unstructured_agent_update(state: AgentState, response):
         if response.content:
             response.content = f"<name>Unstructured Agent</name>\n{response.content}"
 
-
         return {
             "iterations": state.get("iterations", 0) + 1,
             "messages": [response]
         }
-    
-    def structured_agent_node(state: AgentState):
-        response = get_genie_agent(model_config).invoke({"messages": state["messages"]}).get("messages")
 
+    def unstructured_agent_node(state: AgentState):
+        response = llm_with_tools.invoke(unstructured_agent_messages(state))
+        return unstructured_agent_update(state, response)
+
+    async def aunstructured_agent_node(state: AgentState):
+        response = await llm_with_tools.ainvoke(unstructured_agent_messages(state))
+        return unstructured_agent_update(state, response)
+
+    def structured_agent_update(state: AgentState, response):
         return {
             "iterations": state.get("iterations", 0) + 1,
             "messages": [
@@ -106,17 +125,24 @@ def create_agent_workflow(
                 }
             ]
         }
-    
-    def response_agent_node(state: AgentState):
-        messages = [
+
+    def structured_agent_node(state: AgentState):
+        response = get_genie_agent(model_config).invoke({"messages": state["messages"]}).get("messages")
+        return structured_agent_update(state, response)
+
+    async def astructured_agent_node(state: AgentState):
+        response = (await get_genie_agent(model_config).ainvoke({"messages": state["messages"]})).get("messages")
+        return structured_agent_update(state, response)
+
+    def response_agent_messages(state: AgentState):
+        return [
             {
                 "role": "system",
                 "content": model_config.get("agents").get("response_agent").get("system_prompt"),
             },
         ] + state["messages"]
 
-        response = llm.invoke(messages)
-
+    def response_agent_update(state: AgentState, response):
         return {
             "iterations": state.get("iterations", 0) + 1,
             "messages": [
@@ -128,6 +154,14 @@ def create_agent_workflow(
             ]
         }
 
+    def response_agent_node(state: AgentState):
+        response = llm.invoke(response_agent_messages(state))
+        return response_agent_update(state, response)
+
+    async def aresponse_agent_node(state: AgentState):
+        response = await llm.ainvoke(response_agent_messages(state))
+        return response_agent_update(state, response)
+
     def iteration_limit_node(state: AgentState):
         return {
             "messages": [
@@ -150,11 +184,19 @@ def create_agent_workflow(
 
     workflow = StateGraph(AgentState)
 
-    workflow.add_node("supervisor", supervisor_agent_node)
-    workflow.add_node("structured_agent", structured_agent_node)
-    workflow.add_node("unstructured_agent", unstructured_agent_node)
-    workflow.add_node("unstructured_agent_tools", ChatAgentToolNode(tools))
-    workflow.add_node("response_agent", response_agent_node)
+    # Each node carries a sync and an async implementation so the same graph serves invoke/stream and ainvoke/astream
+    workflow.add_node("supervisor", RunnableLambda(supervisor_agent_node, afunc=asupervisor_agent_node))
+    workflow.add_node("structured_agent", RunnableLambda(structured_agent_node, afunc=astructured_agent_node))
+    workflow.add_node("unstructured_agent", RunnableLambda(unstructured_agent_node, afunc=aunstructured_agent_node))
+    workflow.add_node(
+        "unstructured_agent_tools",
+        AgentToolNode(
+            tools,
+            max_concurrency=model_config.to_dict().get("agent_tool_max_concurrency"),
+            timeout_seconds=model_config.to_dict().get("agent_tool_timeout_seconds"),
+        ),
+    )
+    workflow.add_node("response_agent", RunnableLambda(response_agent_node, afunc=aresponse_agent_node))
     workflow.add_node("iteration_limit", iteration_limit_node)
 
     workflow.set_entry_point("supervisor")
@@ -187,35 +229,51 @@ class LangGraphAgent():
     def __init__(self, model_config):
         self.workflow = create_agent_workflow(model_config)
 
+    def _parse_event(self, event):
+        # print("event", event)
+        if event[0] == "updates":
+            # Stream response_agent response, send other as updates
+            if "response_agent" in event[1]:
+                return
+            for node_data in event[1].values():
+                for message in node_data.get("messages", []):
+                    if isinstance(message, dict):
+                        yield ("updates", message)
+                    else:
+                        yield ("updates", message.dict())
+        if event[0] == "messages":
+            message, metadata = event[1][0], event[1][1]
+            if (
+                isinstance(message, AIMessageChunk)
+                and not message.tool_call_chunks
+                and not message.tool_calls
+                and metadata.get("langgraph_node") == "response_agent" # search internally calls llm so skip those
+                # and message.content
+            ):
+                # Skip stream stop messages until last message.
+                # if not message.content:
+                #     if message.response_metadata.get("finish_reason") == "tool_calls":
+                #         continue
+                #     if message.response_metadata.get("finish_reason", None) is None:
+                #         continue
+                #     message.content = "\n"
+                message = message.dict()
+                message["role"] = "assistant"
+                yield ("messages", message)
+
     def predict_stream(self, request):
-        for event in self.workflow.stream(request, stream_mode=["updates", "messages"]):
-            # print("event", event)
-            if event[0] == "updates":
-                # Stream response_agent response, send other as updates
-                if "response_agent" in event[1]:
-                    continue
-                for node_data in event[1].values():
-                    for message in node_data.get("messages", []):
-                        if isinstance(message, dict):
-                            yield ("updates", message)
-                        else:
-                            yield ("updates", message.dict())
-            if event[0] == "messages":
-                message, metadata = event[1][0], event[1][1]
-                if (
-                    isinstance(message, AIMessageChunk)
-                    and not message.tool_call_chunks
-                    and not message.tool_calls
-                    and metadata.get("langgraph_node") == "response_agent" # search internally calls llm so skip those
-                    # and message.content
-                ):
-                    # Skip stream stop messages until last message.
-                    # if not message.content:
-                    #     if message.response_metadata.get("finish_reason") == "tool_calls":
-                    #         continue
-                    #     if message.response_metadata.get("finish_reason", None) is None:
-                    #         continue
-                    #     message.content = "\n"
-                    message = message.dict()
-                    message["role"] = "assistant"
-                    yield ("messages", message)
\ No newline at end of file
+        metrics = AgentMetricsHandler()
+        for event in self.workflow.stream(
+            request, config={"callbacks": [metrics]}, stream_mode=["updates", "messages"]
+        ):
+            yield from self._parse_event(event)
+        yield ("metrics", metrics.summary())
+
+    async def apredict_stream(self, request):
+        metrics = AgentMetricsHandler()
+        async for event in self.workflow.astream(
+            request, config={"callbacks": [metrics]}, stream_mode=["updates", "messages"]
+        ):
+            for parsed_event in self._parse_event(event):
+                yield parsed_event
+        yield ("metrics", metrics.summary())
@@ -1,15 +1,12 @@
 import os
 import mlflow
-import asyncio
-import nest_asyncio
-
-nest_asyncio.apply()
+import functools
 
 from enum import Enum
 from typing import (
     Any, Generator, Optional, Sequence, Union, Annotated, List, TypedDict
 )
-from mlflow.langchain.chat_agent_langgraph import ChatAgentState, ChatAgentToolNode
+from mlflow.langchain.chat_agent_langgraph import ChatAgentState
 
 from langchain_core.messages import (
     AIMessage,
@@ -24,9 +21,14 @@ from langgraph.graph.state import CompiledStateGraph
 from databricks.sdk import WorkspaceClient
 from databricks_langchain import ChatDatabricks
 
-from src.utils.mcp import create_mcp_tools
+from src.utils.mcp import create_mcp_tools, create_tool_result_cache, get_session_pool
+from src.utils.metrics import AgentMetricsHandler
+from src.utils.tool_node import AgentToolNode
+from src.utils.tool_selection import ToolSelector
 
 MAX_ITERATION_MESSAGE = "Agent stopped due to max iterations. Please try again with more specific query!"
+# Distinct tool subsets kept bound to the LLM, least recently used ones are bound again
+BOUND_LLM_CACHE_SIZE = 128
 
 class AgentState(ChatAgentState):
     iterations: int
@@ -37,21 +39,39 @@ def create_agent_workflow(
     workspace_client = WorkspaceClient()
 
     host = workspace_client.config.host
-    tools = asyncio.run(create_mcp_tools(
+    mcp_agent_config = model_config.get("agents").get("mcp_agent")
+    # Discovery runs on the session pool's loop, the workflow may be built inside a notebook's event loop
+    tools = get_session_pool().run(create_mcp_tools(
         ws=workspace_client,
         managed_server_urls=[
-            f"{host}{url_suffix}" for url_suffix in model_config.get("agents").get("mcp_agent").get("managed_server_urls")
+            f"{host}{url_suffix}" for url_suffix in mcp_agent_config.get("managed_server_urls")
         ],
         custom_server_urls=[
-            f"{host}{url_suffix}" for url_suffix in model_config.get("agents").get("mcp_agent").get("custom_server_urls")
-        ]
+            f"{host}{url_suffix}" for url_suffix in mcp_agent_config.get("custom_server_urls")
+        ],
+        discovery_timeout_seconds=mcp_agent_config.get("discovery_timeout_seconds", 30),
+        cache_path=mcp_agent_config.get("tool_schema_cache_path"),
+        result_cache=create_tool_result_cache(mcp_agent_config.get("tool_result_cache")),
     ))
     
     llm = ChatDatabricks(
         endpoint=model_config.get("llm_endpoint_name"),
         extra_params=model_config.get("llm_parameters"),
     )
-    llm_with_tools = llm.bind_tools(tools)  # Bind tools to the model
+    tools_by_name = {tool.name: tool for tool in tools}
+
+    # With large MCP catalogs only bind the tools relevant to the current user message
+    tool_selector = ToolSelector(tools, top_k=mcp_agent_config.get("tool_selection_top_k", 0))
+
+    @functools.lru_cache(maxsize=BOUND_LLM_CACHE_SIZE)
+    def bind_tools(tool_names: tuple):
+        # The whole catalog is bound here too, on the first call that selects all of it
+        return llm.bind_tools([tools_by_name[name] for name in tool_names])
+
+    def get_model_runnable(state: AgentState):
+        selected_tools = tool_selector.select_for_messages(state["messages"])
+        llm_with_tools = bind_tools(tuple(tool.name for tool in selected_tools))
+        return preprocessor | llm_with_tools  # Chain the preprocessor and the model
 
     system_prompt = model_config.get("agents").get("mcp_agent").get("system_prompt")
 
@@ -75,20 +95,29 @@ def create_agent_workflow(
     else:
         preprocessor = RunnableLambda(lambda state: state["messages"])
 
-    model_runnable = preprocessor | llm_with_tools  # Chain the preprocessor and the model
-
     # The function to invoke the model within the workflow
     def call_model(
         state: AgentState,
         config: RunnableConfig,
     ):
-        response = model_runnable.invoke(state, config)
+        response = get_model_runnable(state).invoke(state, config)
+        return {"messages": [response]}
+
+    async def acall_model(
+        state: AgentState,
+        config: RunnableConfig,
+    ):
+        response = await get_model_runnable(state).ainvoke(state, config)
         return {"messages": [response]}
 
     workflow = StateGraph(AgentState)  # Create the agent's state machine
 
-    workflow.add_node("mcp_agent", RunnableLambda(call_model))  # Agent node (LLM)
-    workflow.add_node("tools", ChatAgentToolNode(tools))             # Tools node
+    workflow.add_node("mcp_agent", RunnableLambda(call_model, afunc=acall_model))  # Agent node (LLM)
+    workflow.add_node("tools", AgentToolNode(                                       # Tools node, runs a turn's tool calls concurrently
+        tools,
+        max_concurrency=model_config.to_dict().get("agent_tool_max_concurrency"),
+        timeout_seconds=model_config.to_dict().get("agent_tool_timeout_seconds"),
+    ))
 
     workflow.set_entry_point("mcp_agent")  # Start at agent node
     workflow.add_conditional_edges(
@@ -109,28 +138,44 @@ class LangGraphAgent():
     def __init__(self, model_config):
         self.workflow = create_agent_workflow(model_config)
 
+    def _parse_event(self, event):
+        # print("event", event)
+        if event[0] == "updates":
+            # Stream mcp_agent response, send other as updates
+            if "mcp_agent" in event[1]:
+                return
+            for node_data in event[1].values():
+                for message in node_data.get("messages", []):
+                    if isinstance(message, dict):
+                        yield ("updates", message)
+                    else:
+                        yield ("updates", message.dict())
+        if event[0] == "messages":
+            message, metadata = event[1][0], event[1][1]
+            if (
+                isinstance(message, AIMessageChunk)
+                and not message.tool_call_chunks
+                and not message.tool_calls
+                and metadata.get("langgraph_node") == "mcp_agent" # search internally calls llm so skip those
+                # and message.content
+            ):
+                message = message.dict()
+                message["role"] = "assistant"
+                yield ("messages", message)
+
     def predict_stream(self, request):
-        for event in self.workflow.stream(request, stream_mode=["updates", "messages"]):
-            # print("event", event)
-            if event[0] == "updates":
-                # Stream mcp_agent response, send other as updates
-                if "mcp_agent" in event[1]:
-                    continue
-                for node_data in event[1].values():
-                    for message in node_data.get("messages", []):
-                        if isinstance(message, dict):
-                            yield ("updates", message)
-                        else:
-                            yield ("updates", message.dict())
-            if event[0] == "messages":
-                message, metadata = event[1][0], event[1][1]
-                if (
-                    isinstance(message, AIMessageChunk)
-                    and not message.tool_call_chunks
-                    and not message.tool_calls
-                    and metadata.get("langgraph_node") == "mcp_agent" # search internally calls llm so skip those
-                    # and message.content
-                ):
-                    message = message.dict()
-                    message["role"] = "assistant"
-                    yield ("messages", message)
\ No newline at end of file
+        metrics = AgentMetricsHandler()
+        for event in self.workflow.stream(
+            request, config={"callbacks": [metrics]}, stream_mode=["updates", "messages"]
+        ):
+            yield from self._parse_event(event)
+        yield ("metrics", metrics.summary())
+
+    async def apredict_stream(self, request):
+        metrics = AgentMetricsHandler()
+        async for event in self.workflow.astream(
+            request, config={"callbacks": [metrics]}, stream_mode=["updates", "messages"]
+        ):
+            for parsed_event in self._parse_event(event):
+                yield parsed_event
+        yield ("metrics", metrics.summary())
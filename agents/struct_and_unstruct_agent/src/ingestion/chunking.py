@@ -0,0 +1,224 @@
+import re
+import functools
+
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+CHUNK_SIZE = 1024
+
+# Word pieces and punctuation, close to (slightly under) the WordPiece / BPE token counts of the
+# embedding models, without shipping a tokenizer to the executors
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+# Sentence ends and inline list bullets (" - item")
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[\"“(\[A-Z0-9-])|\s+(?=[-•]\s)")
+PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+# Lines opening a section, e.g. "Highlights: - Revenue ..." or "Investment Thesis:"
+SECTION_START = re.compile(r"^[A-Z][\w&'’ ]{0,40}:(\s|$)")
+TABLE_SEPARATOR = re.compile(r"^\|[\s\-:|]+\|$")
+
+Chunker = Callable[[Iterable[str]], Iterator[Dict[str, Any]]]
+
+
+def count_tokens(text: str) -> int:
+    return len(TOKEN_PATTERN.findall(text))
+
+
+def fixed_chunks(page_texts: Iterable[str], chunk_size: int = CHUNK_SIZE,
+                 overlap_ratio: float = 2 / 3) -> Iterator[Dict[str, Any]]:
+    """
+    Fixed-size overlapping character chunks over a stream of page texts.
+
+    Whitespace is collapsed and pages are joined by a single space, the windows start every
+    `chunk_size - overlap` characters and run across page boundaries. Only the text not yet fully
+    chunked is buffered, so memory is bounded by a page plus a chunk rather than the whole document.
+    Yields `chunk_index`, `content`, the 1-based `page` the chunk starts on and its `char_start` /
+    `char_end` in the whitespace-collapsed document text.
+    """
+    step = chunk_size - int(chunk_size * overlap_ratio)
+
+    buffer, buffer_start = "", 0  # buffer holds the document text from offset buffer_start on
+    page_starts = []  # (offset, page number) of the pages overlapping the buffer
+    chunk_index, has_text = 0, False
+
+    def emit():
+        nonlocal buffer, buffer_start, chunk_index
+        while len(page_starts) > 1 and page_starts[1][0] <= buffer_start:
+            page_starts.pop(0)
+        content = buffer[:chunk_size]
+        chunk = {
+            "chunk_index": chunk_index,
+            "content": content,
+            "page": page_starts[0][1],
+            "char_start": buffer_start,
+            "char_end": buffer_start + len(content),
+        }
+        buffer, buffer_start, chunk_index = buffer[step:], buffer_start + step, chunk_index + 1
+        return chunk
+
+    for page_number, text in enumerate(page_texts, start=1):
+        text = " ".join(text.split())
+        if not text:
+            continue
+        if has_text:
+            buffer += " "
+        has_text = True
+        page_starts.append((buffer_start + len(buffer), page_number))
+        buffer += text
+        while len(buffer) >= chunk_size:
+            yield emit()
+
+    # Trailing windows, shorter than chunk_size
+    while buffer:
+        yield emit()
+
+
+def _split_long(text: str, max_tokens: int) -> List[str]:
+    """A sentence longer than a chunk, cut on word boundaries into pieces of at most max_tokens"""
+    pieces, words, tokens = [], [], 0
+    for word in text.split():
+        word_tokens = count_tokens(word)
+        if words and tokens + word_tokens > max_tokens:
+            pieces.append(" ".join(words))
+            words, tokens = [], 0
+        words.append(word)
+        tokens += word_tokens
+    if words:
+        pieces.append(" ".join(words))
+    return pieces
+
+
+def _table_units(lines: List[str], max_tokens: int) -> List[str]:
+    """
+    A markdown table as one unit when it fits a chunk, otherwise split by rows with the header (and
+    its separator row) repeated, so every piece can be read on its own
+    """
+    header_size = 2 if len(lines) > 1 and TABLE_SEPARATOR.match(lines[1]) else 1
+    header, rows = lines[:header_size], lines[header_size:]
+    if count_tokens("\n".join(lines)) <= max_tokens or not rows:
+        return ["\n".join(lines)]
+
+    units, group = [], []
+    budget = max_tokens - count_tokens("\n".join(header))
+    for row in rows:
+        if group and count_tokens("\n".join(group + [row])) > budget:
+            units.append("\n".join(header + group))
+            group = []
+        group.append(row)
+    units.append("\n".join(header + group))
+    return units
+
+
+def _paragraphs(text: str) -> Iterator[List[str]]:
+    """Lines of the paragraphs of a page: blocks separated by blank lines, split again at section labels"""
+    for block in PARAGRAPH_BREAK.split(text):
+        paragraph = []
+        for line in block.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            if paragraph and SECTION_START.match(line) and not line.startswith("|"):
+                yield paragraph
+                paragraph = []
+            paragraph.append(line)
+        if paragraph:
+            yield paragraph
+
+
+def _units(page_texts: Iterable[str], max_tokens: int) -> Iterator[Tuple[str, int, bool, bool]]:
+    """
+    Splits pages into (text, page, starts_paragraph, is_table) units: paragraphs made of `|` rows are
+    tables, everything else is cut into sentences / list items
+    """
+    for page_number, text in enumerate(page_texts, start=1):
+        for lines in _paragraphs(text):
+            if all(line.startswith("|") for line in lines):
+                pieces = [(unit, True) for unit in _table_units(lines, max_tokens)]
+            else:
+                sentences = SENTENCE_END.split(" ".join(" ".join(lines).split()))
+                pieces = [
+                    (piece, False)
+                    for sentence in sentences
+                    for piece in (_split_long(sentence, max_tokens) if count_tokens(sentence) > max_tokens else [sentence])
+                ]
+            for i, (piece, is_table) in enumerate(pieces):
+                yield piece, page_number, i == 0, is_table
+
+
+def sentence_chunks(page_texts: Iterable[str], max_tokens: int = 256,
+                    overlap_ratio: float = 0.1) -> Iterator[Dict[str, Any]]:
+    """
+    Token-counted chunks packed from whole sentences and tables.
+
+    Sentences (and list items) are added to a chunk until the next one would exceed `max_tokens`. A
+    new paragraph or section starts a new chunk once the current one is half full. The sentences at the end of a chunk worth
+    up to `overlap_ratio * max_tokens` tokens are repeated at the start of the next one, except after
+    a paragraph or table boundary. Tables are never cut mid-row and are not used as overlap.
+    Yields `chunk_index`, `content`, the 1-based `page` the chunk starts on, its `tokens` and its
+    `char_start` / `char_end` in the document's units joined the way chunks join them, so every chunk
+    is an exact slice of that text.
+    """
+    overlap_tokens = int(max_tokens * overlap_ratio)
+    chunk: List[Tuple[str, int, int, bool, int]] = []  # (text, page, tokens, is_table, char_start)
+    chunk_index = 0
+    position = None  # end offset of the last unit, None before the first
+
+    def emit(overlap: bool):
+        nonlocal chunk, chunk_index
+        content = chunk[0][0]
+        for previous, unit in zip(chunk, chunk[1:]):
+            # Table rows stay on their own lines
+            content += ("\n" if previous[3] or unit[3] else " ") + unit[0]
+        yielded = {
+            "chunk_index": chunk_index,
+            "content": content,
+            "page": chunk[0][1],
+            "tokens": sum(unit[2] for unit in chunk),
+            "char_start": chunk[0][4],
+            "char_end": chunk[-1][4] + len(chunk[-1][0]),
+        }
+        carried, carried_tokens = [], 0
+        if overlap:
+            for unit in reversed(chunk):
+                if unit[3] or carried_tokens + unit[2] > overlap_tokens or len(carried) + 1 == len(chunk):
+                    break
+                carried.insert(0, unit)
+                carried_tokens += unit[2]
+        chunk, chunk_index = carried, chunk_index + 1
+        return yielded
+
+    for text, page, starts_paragraph, is_table in _units(page_texts, max_tokens):
+        tokens = count_tokens(text)
+        used = sum(unit[2] for unit in chunk)
+        if chunk and (starts_paragraph or is_table) and used >= max_tokens // 2:
+            yield emit(overlap=False)
+        elif chunk and used + tokens > max_tokens:
+            yield emit(overlap=not (starts_paragraph or is_table))
+            # The carried overlap must leave room for the unit
+            while chunk and sum(unit[2] for unit in chunk) + tokens > max_tokens:
+                chunk.pop(0)
+        # Units are joined by one character, a newline around tables and a space otherwise
+        start = 0 if position is None else position + 1
+        position = start + len(text)
+        chunk.append((text, page, tokens, is_table, start))
+
+    if chunk:
+        yield emit(overlap=False)
+
+
+CHUNKERS: Dict[str, Callable[..., Iterator[Dict[str, Any]]]] = {
+    "fixed": fixed_chunks,
+    "sentence": sentence_chunks,
+}
+
+
+def get_chunker(chunking: Optional[Dict[str, Any]] = None) -> Chunker:
+    """
+    Chunker selected by the `chunking` section of config.yaml, e.g.
+    `{"strategy": "sentence", "sentence": {"max_tokens": 256, "overlap_ratio": 0.1}}`. Without a config
+    the original 1024 character / 2/3 overlap windows are used.
+    """
+    if not chunking:
+        return fixed_chunks
+    strategy = chunking["strategy"]
+    if strategy not in CHUNKERS:
+        raise NotImplementedError(f"Unsupported chunking strategy: {strategy}")
+    return functools.partial(CHUNKERS[strategy], **(chunking.get(strategy) or {}))
@@ -0,0 +1,136 @@
+import pandas as pd
+import pyspark.cloudpickle
+
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from pyspark.sql import DataFrame, SparkSession
+from pyspark.sql import functions as F
+from pyspark.sql.types import ArrayType, LongType, StringType, StructField, StructType
+
+import src.ingestion.minhash as minhash
+
+# Executors don't have this repo on their path, ship the module with the UDFs
+pyspark.cloudpickle.register_pickle_by_value(minhash)
+
+SOURCES_COLUMN = "source_doc_uris"
+
+
+def single_source(chunks: DataFrame) -> DataFrame:
+    """Chunks that stand for their own document only, the layout of deduplicated chunks"""
+    return chunks.withColumn(SOURCES_COLUMN, F.array(F.col("doc_uri")))
+
+
+def near_duplicate_pairs(candidates: DataFrame, threshold: float, num_perm: int, bands: int,
+                         shingle_size: int) -> DataFrame:
+    """
+    Pairs of candidate chunks (`id`, `doc_uri`, `content`, `reference`) whose estimated Jaccard
+    similarity of word shingles is at least `threshold`.
+
+    MinHash signatures are cut into `bands` bands, chunks sharing a band hash are compared (a native
+    self-join on the band hashes instead of all pairs) and the pair is kept when the share of equal
+    signature values reaches the threshold. Pairs of two reference chunks are left out.
+    """
+    @F.pandas_udf(ArrayType(LongType()))
+    def signatures(texts: pd.Series) -> pd.Series:
+        return minhash.signatures(texts, num_perm, shingle_size)
+
+    rows = num_perm // bands
+    signed = candidates.withColumn("signature", signatures("content"))
+    band_keys = signed.select(
+        "id",
+        F.explode(F.array(*[
+            F.struct(F.lit(band).alias("band"), F.xxhash64(F.slice("signature", band * rows + 1, rows)).alias("key"))
+            for band in range(bands)
+        ])).alias("band"),
+    ).select("id", "band.band", "band.key")
+
+    pairs = (
+        band_keys.alias("l")
+        .join(band_keys.alias("r"), on=["band", "key"])
+        .where(F.col("l.id") < F.col("r.id"))
+        .select(F.col("l.id").alias("left_id"), F.col("r.id").alias("right_id"))
+        .distinct()
+    )
+    left, right = signed.alias("left"), signed.alias("right")
+    equal_values = F.aggregate(
+        F.zip_with("left.signature", "right.signature", lambda x, y: (x == y).cast("int")), F.lit(0), lambda acc, x: acc + x
+    )
+    return (
+        pairs
+        .join(left, F.col("left_id") == F.col("left.id"))
+        .join(right, F.col("right_id") == F.col("right.id"))
+        .where(~(F.col("left.reference") & F.col("right.reference")))
+        .where(equal_values >= F.lit(threshold * num_perm))
+        .select(
+            "left_id", F.col("left.doc_uri").alias("left_doc_uri"), F.col("left.reference").alias("left_reference"),
+            "right_id", F.col("right.doc_uri").alias("right_doc_uri"), F.col("right.reference").alias("right_reference"),
+        )
+    )
+
+
+def deduplicate_chunks(spark: SparkSession, chunks: DataFrame, reference: Optional[DataFrame] = None,
+                       removed_uris: Sequence[str] = (), threshold: float = 0.8, num_perm: int = minhash.NUM_PERM,
+                       bands: int = 16, shingle_size: int = minhash.SHINGLE_SIZE) -> Tuple[DataFrame, Dict[str, Any]]:
+    """
+    Drops near-duplicate chunks, each group of near-duplicates is kept once and records the documents
+    it stands for in `source_doc_uris`.
+
+    `reference` are already indexed chunks (with `source_doc_uris`) of documents that are not
+    re-ingested. New chunks are compared against them too, and a reference chunk is preferred as the
+    one to keep, so the index doesn't churn. The result holds the surviving new chunks plus the
+    reference chunks whose `source_doc_uris` changed: grown by new near-duplicates, or shrunk by the
+    `removed_uris` of re-ingested / deleted documents. Also returns the chunk / duplicate counts and
+    the dedup ratio of the new chunks.
+
+    The near-duplicate pairs are collected to link groups transitively, they are few compared to the chunks.
+    """
+    columns = chunks.columns
+    candidates = chunks.select("id", "doc_uri", "content", F.lit(False).alias("reference"))
+    if reference is not None:
+        candidates = candidates.unionByName(reference.select("id", "doc_uri", "content", F.lit(True).alias("reference")))
+
+    pairs = near_duplicate_pairs(candidates, threshold, num_perm, bands, shingle_size).collect()
+    members = {}
+    for pair in pairs:
+        members[pair["left_id"]] = (not pair["left_reference"], pair["left_doc_uri"], pair["left_id"])
+        members[pair["right_id"]] = (not pair["right_reference"], pair["right_doc_uri"], pair["right_id"])
+
+    # Keep a reference chunk if there is one, otherwise the first by document and id
+    groups = []
+    for group in minhash.clusters((pair["left_id"], pair["right_id"]) for pair in pairs).values():
+        keep = min(group, key=lambda chunk_id: members[chunk_id])
+        sources = sorted({members[chunk_id][1] for chunk_id in group})
+        groups.extend((chunk_id, keep, sources) for chunk_id in group)
+    group_schema = StructType([
+        StructField("id", StringType()),
+        StructField("keep_id", StringType()),
+        StructField("group_doc_uris", ArrayType(StringType())),
+    ])
+    groups_df = spark.createDataFrame(groups, schema=group_schema)
+
+    kept = (
+        chunks
+        .join(groups_df, on="id", how="left")
+        .where(F.col("keep_id").isNull() | (F.col("keep_id") == F.col("id")))
+        .withColumn(SOURCES_COLUMN, F.coalesce(F.col("group_doc_uris"), F.array(F.col("doc_uri"))))
+        .select(*columns, SOURCES_COLUMN)
+    )
+    if reference is not None:
+        sources = F.col(SOURCES_COLUMN)
+        if removed_uris:
+            sources = F.array_except(sources, F.array(*[F.lit(uri) for uri in removed_uris]))
+        updated = F.array_sort(F.array_union(sources, F.coalesce(F.col("group_doc_uris"), F.array(F.col("doc_uri")))))
+        changed = (
+            reference
+            .join(groups_df.where(F.col("keep_id") == F.col("id")).select("id", "group_doc_uris"), on="id", how="left")
+            .withColumn("updated_doc_uris", updated)
+            .where(F.col("updated_doc_uris") != F.col(SOURCES_COLUMN))
+            .withColumn(SOURCES_COLUMN, F.col("updated_doc_uris"))
+            .select(*columns, SOURCES_COLUMN)
+        )
+        kept = kept.unionByName(changed)
+
+    # members[id][0] is True for new chunks
+    duplicates = sum(1 for chunk_id, keep, _ in groups if chunk_id != keep and members[chunk_id][0])
+    total = chunks.count()
+    return kept, {"chunks": total, "duplicates": duplicates, "dedup_ratio": duplicates / total if total else 0.0}
@@ -0,0 +1,73 @@
+from typing import List
+
+from pyspark.sql import Column, DataFrame, SparkSession
+from pyspark.sql import functions as F
+
+DOC_KEY_COLUMNS = ["doc_uri", "doc_hash"]
+
+
+def chunk_id(doc_uri: Column, doc_hash: Column, chunk_index: Column) -> Column:
+    """
+    Deterministic chunk primary key `<hash>-<chunk_index>`, stable across ingestion runs. The URI is
+    hashed in with the content so that copies of one file at two paths don't share ids.
+    """
+    return F.concat_ws("-", F.sha2(F.concat_ws(":", doc_uri, doc_hash), 256), chunk_index.cast("string"))
+
+
+def can_merge(spark: SparkSession, table_name: str) -> bool:
+    """
+    Incremental runs need an existing chunks table written with document hashes, chunk sources and the
+    filterable metadata columns, older tables are rebuilt once
+    """
+    required = {"doc_hash", "source_doc_uris", "ticker", "period", "char_start"}
+    return spark.catalog.tableExists(table_name) and required <= set(spark.table(table_name).columns)
+
+
+def changed_documents(docs: DataFrame, chunks: DataFrame) -> DataFrame:
+    """Documents that are new or whose content changed since they were chunked into `chunks`"""
+    return docs.join(chunks.select(*DOC_KEY_COLUMNS).distinct(), on=DOC_KEY_COLUMNS, how="left_anti")
+
+
+def stale_document_uris(docs: DataFrame, chunks: DataFrame) -> List[str]:
+    """URIs of documents in `chunks` that were changed or removed, their old chunks have to go"""
+    stale = chunks.select(*DOC_KEY_COLUMNS).distinct().join(docs.select(*DOC_KEY_COLUMNS), on=DOC_KEY_COLUMNS, how="left_anti")
+    return [row["doc_uri"] for row in stale.select("doc_uri").distinct().collect()]
+
+
+def shared_document_uris(chunks: DataFrame, uris: List[str]) -> List[str]:
+    """
+    Other documents whose near-duplicate chunks were dropped in favour of chunks of `uris`. Those
+    chunks go away with the documents of `uris`, so these documents have to be re-chunked as well.
+    """
+    if not uris:
+        return []
+    shared = (
+        chunks
+        .where(F.col("doc_uri").isin(uris))
+        .select(F.explode("source_doc_uris").alias("doc_uri"))
+        .where(~F.col("doc_uri").isin(uris))
+        .distinct()
+    )
+    return [row["doc_uri"] for row in shared.collect()]
+
+
+def merge_chunks(spark: SparkSession, chunks: DataFrame, table_name: str, stale_uris: List[str]):
+    """
+    Insert the chunks of new / changed documents and delete the chunks of stale documents in one MERGE,
+    so the table's change data feed (and the Delta Sync vector index) only carries what changed.
+    Existing chunks only get updated when the documents they stand for changed.
+    """
+    from delta.tables import DeltaTable
+
+    merge = (
+        DeltaTable.forName(spark, table_name).alias("target")
+        .merge(chunks.alias("source"), "target.id = source.id")
+        .whenMatchedUpdate(
+            condition="NOT (target.source_doc_uris <=> source.source_doc_uris)",
+            set={"source_doc_uris": "source.source_doc_uris"},
+        )
+        .whenNotMatchedInsertAll()
+    )
+    if stale_uris:
+        merge = merge.whenNotMatchedBySourceDelete(condition=F.col("target.doc_uri").isin(stale_uris))
+    merge.execute()
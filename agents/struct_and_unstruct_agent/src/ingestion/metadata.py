@@ -0,0 +1,66 @@
+import re
+
+import pandas as pd
+
+from typing import Any, Dict, Optional
+
+# <TICKER>_<parts>.pdf, the parts hold the document type and either `Q<n>_<year>` or a `<yyyy-mm-dd>` date,
+# e.g. XBR_Q3_2025_Press_Release.pdf or WWS_Shareholder_Letter_2025-09-30.pdf
+DOC_NAME_PATTERN = re.compile(r"^(?P<ticker>[A-Z]{1,6})_(?P<parts>.+?)(?:\.[A-Za-z]+)?$")
+QUARTER_PATTERN = re.compile(r"(?:^|_)Q(?P<quarter>[1-4])_(?P<year>\d{4})(?=_|$)")
+DATE_PATTERN = re.compile(r"(?:^|_)(?P<date>(?P<year>\d{4})-(?P<month>\d{2})-\d{2})(?=_|$)")
+
+# Filterable chunk columns derived from the document name
+DOC_METADATA_COLUMNS = ["ticker", "doc_type", "period", "year", "doc_date"]
+
+
+def period(year: int, quarter: int) -> str:
+    """Calendar quarter in the `period` column format, e.g. `2025-Q3`"""
+    return f"{year}-Q{quarter}"
+
+
+def document_metadata(doc_name: str) -> Dict[str, Any]:
+    """
+    Ticker, document type (`press_release`, `shareholder_letter`, ...), period and date encoded in a
+    document name. A dated document belongs to the quarter of its date. Unknown parts are None.
+    """
+    metadata = dict.fromkeys(DOC_METADATA_COLUMNS)
+    match = DOC_NAME_PATTERN.match(doc_name or "")
+    if not match:
+        return metadata
+    parts = match.group("parts")
+    metadata["ticker"] = match.group("ticker")
+
+    quarter = QUARTER_PATTERN.search(parts)
+    date = DATE_PATTERN.search(parts)
+    if quarter:
+        metadata["year"] = int(quarter.group("year"))
+        metadata["period"] = period(metadata["year"], int(quarter.group("quarter")))
+        parts = QUARTER_PATTERN.sub("_", parts)
+    elif date:
+        metadata["year"] = int(date.group("year"))
+        metadata["period"] = period(metadata["year"], (int(date.group("month")) - 1) // 3 + 1)
+        metadata["doc_date"] = date.group("date")
+        parts = DATE_PATTERN.sub("_", parts)
+
+    doc_type = "_".join(part.lower() for part in parts.split("_") if part)
+    metadata["doc_type"] = doc_type or None
+    return metadata
+
+
+def documents_metadata(doc_names: pd.Series) -> pd.DataFrame:
+    """pandas_udf body: `document_metadata` of a batch of document names"""
+    return pd.DataFrame([document_metadata(name) for name in doc_names], columns=DOC_METADATA_COLUMNS).astype(
+        {"year": "Int32"}
+    )
+
+
+def parse_quarter(text: str) -> Optional[str]:
+    """`period` of a quarter written in free text: `Q3 2025`, `Q3 FY2025`, `2025 Q3`"""
+    match = re.search(r"\bQ([1-4])\s*(?:FY\s*)?'?(\d{4})\b", text, re.IGNORECASE)
+    if match:
+        return period(int(match.group(2)), int(match.group(1)))
+    match = re.search(r"\b(\d{4})\s*Q([1-4])\b", text, re.IGNORECASE)
+    if match:
+        return period(int(match.group(1)), int(match.group(2)))
+    return None
@@ -0,0 +1,66 @@
+import re
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from typing import Dict, Hashable, Iterable, List, Set, Tuple
+
+SHINGLE_SIZE = 5
+NUM_PERM = 64
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> Set[str]:
+    """Lowercase word `size`-grams, texts shorter than a shingle are a single shingle"""
+    words = WORD_PATTERN.findall((text or "").lower())
+    if len(words) <= size:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def permutations(num_perm: int = NUM_PERM, seed: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+    """Fixed hash permutations `(a * h + b) mod p`, the same on every executor"""
+    rng = np.random.RandomState(seed)
+    # a < 2^31 and 32 bit shingle hashes keep a * h + b below 2^64
+    a = rng.randint(1, 1 << 31, size=num_perm, dtype=np.uint64)
+    b = rng.randint(0, 1 << 31, size=num_perm, dtype=np.uint64)
+    return a, b
+
+
+def signature(text: str, a: np.ndarray, b: np.ndarray, shingle_size: int = SHINGLE_SIZE) -> np.ndarray:
+    """MinHash signature of the text's shingles, one 32 bit minimum per permutation"""
+    hashes = np.fromiter(
+        (zlib.crc32(shingle.encode("utf-8")) for shingle in shingles(text, shingle_size)), dtype=np.uint64
+    )
+    return (((np.outer(hashes, a) + b) % MERSENNE_PRIME) & MAX_HASH).min(axis=0).astype(np.int64)
+
+
+def signatures(texts: pd.Series, num_perm: int = NUM_PERM, shingle_size: int = SHINGLE_SIZE) -> pd.Series:
+    """pandas_udf body: MinHash signatures of a batch of chunk texts"""
+    a, b = permutations(num_perm)
+    return texts.map(lambda text: signature(text, a, b, shingle_size).tolist())
+
+
+def clusters(edges: Iterable[Tuple[Hashable, Hashable]]) -> Dict[Hashable, List[Hashable]]:
+    """Connected components of the near-duplicate pairs (union-find), keyed by an arbitrary root"""
+    parent: Dict[Hashable, Hashable] = {}
+
+    def find(node):
+        parent.setdefault(node, node)
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for left, right in edges:
+        left_root, right_root = find(left), find(right)
+        if left_root != right_root:
+            parent[right_root] = left_root
+
+    components: Dict[Hashable, List[Hashable]] = {}
+    for node in parent:
+        components.setdefault(find(node), []).append(node)
+    return components
@@ -0,0 +1,116 @@
+import pdfplumber
+import pandas as pd
+
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from src.ingestion.chunking import Chunker, fixed_chunks
+
+
+def local_path(path: str) -> str:
+    """binaryFile paths are URIs (`dbfs:/Volumes/...`, `file:/...`), pdfplumber needs the local / FUSE path"""
+    for scheme in ("dbfs:", "file:"):
+        if path.startswith(scheme):
+            return path[len(scheme):]
+    return path
+
+
+def page_count(path: str) -> int:
+    """Number of pages of a PDF, 0 when it can't be parsed so the document is skipped"""
+    try:
+        with pdfplumber.open(local_path(path)) as pdf:
+            return len(pdf.pages)
+    except Exception as e:
+        print(f"Error parsing PDF {path}: {e}")
+        return 0
+
+
+def markdown_table(rows: List[List[Optional[str]]]) -> str:
+    """pdfplumber table rows as a markdown table, the first row is the header"""
+    cells = [["" if cell is None else " ".join(str(cell).split()).replace("|", "/") for cell in row] for row in rows]
+    lines = ["| " + " | ".join(row) + " |" for row in cells]
+    lines.insert(1, "|" + "---|" * len(cells[0]))
+    return "\n".join(lines)
+
+
+def page_text(page, tables: bool = False) -> str:
+    """
+    Text of a pdfplumber page. With `tables`, detected tables are cut out of the running text and
+    appended as markdown tables in their own paragraphs, so chunkers can keep their rows together.
+    """
+    found = page.find_tables() if tables else []
+    if not found:
+        return page.extract_text() or ""
+
+    def outside_tables(obj):
+        x, top = (obj["x0"] + obj["x1"]) / 2, (obj["top"] + obj["bottom"]) / 2
+        return not any(x0 <= x <= x1 and t <= top <= b for x0, t, x1, b in (table.bbox for table in found))
+
+    text = page.filter(outside_tables).extract_text() or ""
+    rendered = [markdown_table(rows) for rows in (table.extract() for table in found) if rows]
+    return "\n\n".join([text] + rendered)
+
+
+def extract_page_texts(path: str, first_page: int, num_pages: int, tables: bool = False) -> List[str]:
+    """
+    Text of pages `[first_page, first_page + num_pages)` of a PDF read from its path, one string per
+    page. Only this page range is parsed, so a document's pages can be extracted by parallel tasks.
+    """
+    texts = []
+    with pdfplumber.open(local_path(path)) as pdf:
+        for page in pdf.pages[first_page:first_page + num_pages]:
+            try:
+                texts.append(page_text(page, tables))
+            except Exception as e:
+                print(f"Error parsing page {page.page_number} of PDF {path}: {e}")
+                texts.append("")
+            # Drop the parsed layout objects of finished pages
+            page.close()
+    return texts
+
+
+# Chunk level columns of the doc_chunks table
+CHUNK_FIELDS = ["content", "metadata", "page", "char_start", "char_end"]
+
+
+def chunk_records(page_texts: Iterable[str], chunker: Chunker = fixed_chunks) -> List[Dict[str, Any]]:
+    """Chunks in the layout of the doc_chunks table: `content`, `metadata`, `page` and character offsets"""
+    return [
+        {
+            "content": chunk["content"],
+            "metadata": str({"chunk_index": chunk["chunk_index"], "source": "pdf_document", "page": chunk["page"]}),
+            "page": chunk["page"],
+            "char_start": chunk["char_start"],
+            "char_end": chunk["char_end"],
+        }
+        for chunk in chunker(page_texts)
+    ]
+
+
+# Arrow (pandas) implementations used by src.ingestion.pipeline, they process a batch of rows per call
+# instead of crossing the JVM / Python boundary row by row
+
+def page_counts(paths: pd.Series) -> pd.Series:
+    return paths.map(page_count).astype("int32")
+
+
+def extract_pages(batches: Iterator[pd.DataFrame], pages_per_task: int, tables: bool = False) -> Iterator[pd.DataFrame]:
+    """mapInPandas: page batches (`doc_uri`, ..., `first_page`) to one row per page with `page_number` and `text`"""
+    for batch in batches:
+        rows = []
+        for row in batch.to_dict("records"):
+            for offset, text in enumerate(extract_page_texts(row["doc_uri"], row["first_page"], pages_per_task, tables)):
+                rows.append({**row, "page_number": row["first_page"] + offset, "text": text})
+        yield pd.DataFrame(rows, columns=list(batch.columns) + ["page_number", "text"])
+
+
+def chunk_pages(pages: pd.Series, chunker: Chunker = fixed_chunks) -> pd.DataFrame:
+    """
+    pandas_udf body: a batch of documents, each an array of page texts in page order, to an array per
+    chunk field (`CHUNK_FIELDS`). One call chunks every document of an Arrow batch.
+    """
+    columns = {field: [] for field in CHUNK_FIELDS}
+    for page_texts in pages:
+        records = chunk_records(page_texts, chunker)
+        for field, values in columns.items():
+            values.append([record[field] for record in records])
+    return pd.DataFrame(columns)
@@ -0,0 +1,118 @@
+import functools
+
+import pandas as pd
+import pyspark.cloudpickle
+
+from typing import Any, Dict, Optional
+
+from pyspark.sql import DataFrame, SparkSession
+from pyspark.sql.functions import (
+    arrays_zip,
+    col,
+    collect_list,
+    explode,
+    lit,
+    pandas_udf,
+    posexplode,
+    sequence,
+    sort_array,
+    struct,
+)
+from pyspark.sql.types import ArrayType, IntegerType, StringType, StructField, StructType
+
+import src.ingestion.pdf as pdf_ingestion
+import src.ingestion.chunking as chunking_strategies
+import src.ingestion.metadata as doc_metadata
+from src.ingestion.incremental import chunk_id
+
+# Executors don't have this repo on their path, ship the modules with the UDFs
+pyspark.cloudpickle.register_pickle_by_value(pdf_ingestion)
+pyspark.cloudpickle.register_pickle_by_value(chunking_strategies)
+pyspark.cloudpickle.register_pickle_by_value(doc_metadata)
+
+DOC_COLUMNS = ["doc_uri", "doc_name", "size", "doc_hash"]
+
+
+def page_batches(spark: SparkSession, docs: DataFrame, pages_per_task: int) -> DataFrame:
+    """One row per batch of `pages_per_task` pages of every document, one partition per batch"""
+    page_counts = pandas_udf(pdf_ingestion.page_counts, IntegerType())
+    batches = (
+        docs
+        .select(*DOC_COLUMNS)
+        .withColumn("page_count", page_counts("doc_uri"))
+        .where(col("page_count") > 0)
+        .select("*", explode(sequence(lit(0), col("page_count") - 1, lit(pages_per_task))).alias("first_page"))
+    )
+    # Small metadata rows, collected so every batch gets its own task (AQE would coalesce tiny partitions)
+    batches = spark.createDataFrame(batches.collect(), schema=batches.schema)
+    return batches.repartition(max(1, batches.count()))
+
+
+def extract_pages(page_batches: DataFrame, pages_per_task: int, tables: bool = False) -> DataFrame:
+    """
+    Every page batch is parsed by its own task straight from the file, one row per page. With
+    `tables`, detected tables are rendered as markdown tables in the page text.
+    """
+    schema = StructType(
+        page_batches.schema.fields + [StructField("page_number", IntegerType()), StructField("text", StringType())]
+    )
+    return page_batches.mapInPandas(
+        functools.partial(pdf_ingestion.extract_pages, pages_per_task=pages_per_task, tables=tables), schema
+    )
+
+
+def chunk_documents(pages: DataFrame, chunking: Optional[Dict[str, Any]] = None) -> DataFrame:
+    """
+    Page texts of a document back in page order, chunked in one pass across pages with the strategy
+    of the `chunking` config section (see `src.ingestion.chunking`), in the layout of the doc_chunks
+    table with deterministic ids. Chunks carry filterable columns: the ticker, document type, period
+    and date parsed from the document name (`src.ingestion.metadata`), their page and character offsets.
+
+    Pages are grouped on the JVM side and a whole Arrow batch of documents is chunked per Python
+    call, `applyInPandas` would build a pandas frame per document.
+    """
+    chunker = chunking_strategies.get_chunker(chunking)
+    chunk_schema = StructType([
+        StructField("content", ArrayType(StringType())),
+        StructField("metadata", ArrayType(StringType())),
+        StructField("page", ArrayType(IntegerType())),
+        StructField("char_start", ArrayType(IntegerType())),
+        StructField("char_end", ArrayType(IntegerType())),
+    ])
+    metadata_schema = StructType([
+        StructField("ticker", StringType()),
+        StructField("doc_type", StringType()),
+        StructField("period", StringType()),
+        StructField("year", IntegerType()),
+        StructField("doc_date", StringType()),
+    ])
+
+    @pandas_udf(chunk_schema)
+    def chunk_pages(pages: pd.Series) -> pd.DataFrame:
+        return pdf_ingestion.chunk_pages(pages, chunker)
+
+    documents_metadata = pandas_udf(doc_metadata.documents_metadata, metadata_schema)
+
+    return (
+        pages
+        .groupBy(*DOC_COLUMNS)
+        .agg(sort_array(collect_list(struct("page_number", "text"))).alias("pages"))
+        .withColumn("chunks", chunk_pages(col("pages.text")))
+        .withColumn("doc", documents_metadata("doc_name"))
+        .select(
+            *DOC_COLUMNS,
+            "doc",
+            posexplode(arrays_zip(*[f"chunks.{field}" for field in pdf_ingestion.CHUNK_FIELDS])).alias("chunk_index", "chunk"),
+        )
+        .select(
+            chunk_id(col("doc_uri"), col("doc_hash"), col("chunk_index")).alias("id"),
+            "doc_name",
+            "doc_uri",
+            "doc_hash",
+            "size",
+            col("chunk.content").alias("content"),
+            col("chunk.metadata").alias("metadata"),
+            *[col(f"doc.{column}").alias(column) for column in doc_metadata.DOC_METADATA_COLUMNS],
+            *[col(f"chunk.{field}").alias(field) for field in ("page", "char_start", "char_end")],
+        )
+    )
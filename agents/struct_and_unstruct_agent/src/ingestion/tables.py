@@ -0,0 +1,136 @@
+import re
+import csv
+
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+from pyspark.sql import DataFrame, SparkSession
+from pyspark.sql.functions import col
+from pyspark.sql.types import (
+    BooleanType,
+    DataType,
+    DateType,
+    DecimalType,
+    DoubleType,
+    IntegerType,
+    LongType,
+    StringType,
+    StructField,
+    StructType,
+    TimestampType,
+)
+
+# Column types of metadata.json, in Spark SQL names
+SPARK_TYPES = {
+    "string": StringType(),
+    "int": IntegerType(),
+    "bigint": LongType(),
+    "double": DoubleType(),
+    "boolean": BooleanType(),
+    "date": DateType(),
+    "timestamp": TimestampType(),
+}
+DECIMAL_TYPE = re.compile(r"decimal\((\d+),\s*(\d+)\)")
+
+
+def quote_part(name: str) -> str:
+    return "`" + name.replace("`", "``") + "`"
+
+
+def quote_identifier(name: str) -> str:
+    """`catalog.schema.table` with every part backtick-quoted"""
+    return ".".join(quote_part(part) for part in name.split("."))
+
+
+def sql_string(text: str) -> str:
+    """Single-quoted SQL string literal, backslashes and quotes escaped"""
+    return "'" + text.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+def with_column_comments(df: DataFrame, column_comments: Dict[str, str]) -> DataFrame:
+    """
+    Column descriptions as `comment` field metadata, written by Delta as the column comments of the
+    table. One projection, and the descriptions never end up inside SQL text, so quotes need no escaping.
+    """
+    unknown = set(column_comments) - set(df.columns)
+    if unknown:
+        print(f"Skipping comments of unknown columns: {sorted(unknown)}")
+    return df.select(*[
+        col(quote_part(field.name)).alias(field.name, metadata={**field.metadata, "comment": column_comments[field.name]})
+        if field.name in column_comments else col(quote_part(field.name))
+        for field in df.schema.fields
+    ])
+
+
+def spark_type(name: str) -> DataType:
+    name = name.strip().lower()
+    decimal = DECIMAL_TYPE.fullmatch(name)
+    if decimal:
+        return DecimalType(int(decimal.group(1)), int(decimal.group(2)))
+    if name not in SPARK_TYPES:
+        raise NotImplementedError(f"Unsupported column type: {name}")
+    return SPARK_TYPES[name]
+
+
+def csv_header(path: Path) -> List[str]:
+    with open(path, newline="") as f:
+        return next(csv.reader(f))
+
+
+def csv_schema(header: Sequence[str], column_types: Dict[str, str]) -> StructType:
+    """
+    Schema of a CSV file in its header's column order (Spark applies a CSV schema by position), typed
+    from the `column_types` of metadata.json; columns without a declared type are read as strings
+    """
+    return StructType([
+        StructField(column, spark_type(column_types[column]) if column in column_types else StringType())
+        for column in header
+    ])
+
+
+def read_csv(spark: SparkSession, path: str, schema: StructType) -> DataFrame:
+    """
+    CSV files read by Spark tasks with a declared schema, no schema inference pass and nothing goes
+    through the driver. The header has to match the schema and malformed rows fail the read instead
+    of turning into nulls.
+    """
+    return (
+        spark.read.format("csv")
+        .schema(schema)
+        .option("header", True)
+        .option("enforceSchema", False)
+        .option("mode", "FAILFAST")
+        .load(path)
+    )
+
+
+def register_table(df: DataFrame, table_name: str, description: Optional[str] = None,
+                   column_comments: Optional[Dict[str, str]] = None) -> str:
+    """
+    Creates (or atomically replaces) a Delta table with its column comments in the same write, and
+    sets the table comment in one escaped statement. Two round trips per table however wide it is,
+    instead of an ALTER TABLE for the table plus one per column.
+    """
+    df = with_column_comments(df, column_comments or {})
+    df.writeTo(table_name).using("delta").createOrReplace()
+    if description:
+        df.sparkSession.sql(f"COMMENT ON TABLE {quote_identifier(table_name)} IS {sql_string(description)}")
+    return table_name
+
+
+def register_tables(tables: Sequence[dict], max_workers: int = 4) -> List[str]:
+    """
+    Registers tables concurrently, every entry holds the `register_table` arguments (`df`,
+    `table_name`, `description`, `column_comments`). Returns the names of the tables that were
+    registered, in input order; failures are printed so one bad file doesn't stop the others.
+    """
+    def register(table: dict) -> Optional[str]:
+        try:
+            return register_table(**table)
+        except Exception as e:
+            print(f"Error registering table {table['table_name']}: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        return [name for name in pool.map(register, tables) if name is not None]
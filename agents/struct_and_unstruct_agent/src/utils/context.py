@@ -0,0 +1,130 @@
+import ast
+import json
+
+from typing import Any, Dict, List, Optional, Sequence
+
+from src.ingestion.chunking import TOKEN_PATTERN, count_tokens
+
+# Shortest shared text accepted as the overlap of two chunks, shorter matches are coincidences
+MIN_OVERLAP_CHARS = 32
+# Facts truncated below this many tokens are dropped instead, a sentence fragment only costs tokens
+MIN_FACT_TOKENS = 16
+
+
+def chunk_index(metadata: Any) -> Optional[int]:
+    """`chunk_index` of a chunk's metadata (`str(dict)` as written by the ingestion, or a dict)"""
+    if isinstance(metadata, str):
+        try:
+            metadata = ast.literal_eval(metadata)
+        except (ValueError, SyntaxError):
+            return None
+    return metadata.get("chunk_index") if isinstance(metadata, dict) else None
+
+
+def join_overlapping(left: str, right: str, min_overlap: int = MIN_OVERLAP_CHARS) -> Optional[str]:
+    """
+    `left` followed by `right` without the text they share, when a suffix of `left` is a prefix of
+    `right` (the overlap of consecutive chunks) or one contains the other. None if they don't overlap.
+    """
+    if right in left:
+        return left
+    if left in right:
+        return right
+    probe = right[:min_overlap]
+    if len(probe) < min_overlap:
+        return None
+    # The earliest match is the longest overlap
+    start = left.find(probe)
+    while start != -1:
+        if right.startswith(left[start:]):
+            return left[:start] + right
+        start = left.find(probe, start + 1)
+    return None
+
+
+def _join(first: Dict[str, Any], second: Dict[str, Any]) -> Optional[str]:
+    if first["doc_uri"] != second["doc_uri"]:
+        return None
+    # Character offsets into the document (chunks of newer ingestions) locate the overlap exactly
+    if None not in (first["start"], first["end"], second["start"], second["end"]):
+        if first["start"] > second["start"]:
+            first, second = second, first
+        if second["start"] > first["end"]:
+            return None
+        return first["content"] + second["content"][first["end"] - second["start"]:]
+    # Known chunk indexes say which one comes first, otherwise try both orders
+    if first["index"] is not None and second["index"] is not None:
+        if first["index"] > second["index"]:
+            first, second = second, first
+        return join_overlapping(first["content"], second["content"])
+    return join_overlapping(first["content"], second["content"]) or join_overlapping(second["content"], first["content"])
+
+
+def merge_overlapping(facts: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Merges retrieved chunks (`content`, `doc_uri`, optional `metadata`, `char_start` and `char_end`) of
+    the same document whose text overlaps into one fact, the shared text kept once. Facts stay in the rank order of their best chunk.
+    """
+    merged: List[Dict[str, Any]] = []
+    for fact in facts:
+        current = {
+            "content": fact["content"],
+            "doc_uri": fact.get("doc_uri"),
+            "index": chunk_index(fact.get("metadata")),
+            "start": fact.get("char_start"),
+            "end": fact.get("char_end"),
+        }
+        position, i = len(merged), 0
+        # A chunk can bridge two facts of its document, rescan after every merge
+        while i < len(merged):
+            content = _join(merged[i], current)
+            if content is None:
+                i += 1
+                continue
+            pair = (merged[i], current)
+            indexes = [fact["index"] for fact in pair if fact["index"] is not None]
+            offsets = None not in [fact[key] for fact in pair for key in ("start", "end")]
+            current = {
+                "content": content,
+                "doc_uri": current["doc_uri"],
+                "index": min(indexes, default=None),
+                "start": min(fact["start"] for fact in pair) if offsets else None,
+                "end": max(fact["end"] for fact in pair) if offsets else None,
+            }
+            del merged[i]
+            position, i = min(position, i), 0
+        merged.insert(position, current)
+    return [{"content": fact["content"], "doc_uri": fact["doc_uri"]} for fact in merged]
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    tokens = list(TOKEN_PATTERN.finditer(text))
+    if len(tokens) <= max_tokens:
+        return text
+    return text[:tokens[max_tokens - 1].end()] + " …"
+
+
+def pack_facts(facts: Sequence[Dict[str, Any]], max_tokens: int = 0, merge: bool = True) -> List[str]:
+    """
+    Fact texts for the LLM: overlapping chunks merged (`merge`) and, with a `max_tokens` budget, facts
+    taken in rank order until the budget is spent, the last one truncated.
+    """
+    packed = merge_overlapping(facts) if merge else [{"content": fact["content"]} for fact in facts]
+    texts = []
+    remaining = max_tokens
+    for fact in packed:
+        text = fact["content"]
+        if max_tokens:
+            tokens = count_tokens(text)
+            if tokens > remaining:
+                if remaining >= MIN_FACT_TOKENS:
+                    texts.append(truncate_tokens(text, remaining))
+                break
+            remaining -= tokens
+        texts.append(text)
+    return texts
+
+
+def facts_json(texts: Sequence[str]) -> str:
+    """Compact tool output: no indentation or separator spaces, non-ASCII characters kept as is"""
+    return json.dumps({f"fact_{i + 1}": text for i, text in enumerate(texts)}, separators=(",", ":"), ensure_ascii=False)
@@ -0,0 +1,339 @@
+import json
+import math
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from pathlib import Path
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+from src.utils.tool_selection import tokenize
+
+# Rows of a memory-mapped embedding matrix scored per matmul, bounds the pages touched at once
+BLOCK_ROWS = 65536
+# Reciprocal rank fusion constant of the HYBRID query type
+RRF_K = 60
+
+Embedder = Callable[[Sequence[str]], np.ndarray]
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class HashingEmbedder():
+    """
+    Feature-hashed word and word-bigram vectors. No model, no network: meant for dev runs and tests of
+    the local index, retrieval quality is lexical only.
+    """
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+
+    def __call__(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = tokenize(text)
+            for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+                h = zlib.crc32(feature.encode("utf-8"))
+                vectors[row, h % self.dim] += 1.0 if (h >> 31) & 1 else -1.0
+        return normalize(vectors)
+
+
+class EndpointEmbedder():
+    """Embeddings from a Databricks model serving endpoint, the one the Delta Sync index embeds with"""
+
+    def __init__(self, endpoint_name: str, batch_size: int = 64):
+        from mlflow.deployments import get_deploy_client
+        self.client = get_deploy_client("databricks")
+        self.endpoint_name = endpoint_name
+        self.batch_size = batch_size
+
+    def __call__(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            response = self.client.predict(
+                endpoint=self.endpoint_name, inputs={"input": list(texts[start:start + self.batch_size])}
+            )
+            vectors.extend(item["embedding"] for item in response["data"])
+        return normalize(np.array(vectors, dtype=np.float32))
+
+
+def get_embedder(embedding_config: Dict[str, Any]) -> Embedder:
+    embedding_type = embedding_config.get("type", "endpoint")
+    if embedding_type == "endpoint":
+        return EndpointEmbedder(embedding_config["endpoint_name"])
+    elif embedding_type == "hashing":
+        return HashingEmbedder(embedding_config.get("dim", 512))
+    else:
+        raise NotImplementedError(f"Unsupported embedding type: {embedding_type}")
+
+
+class BM25():
+    """Okapi BM25 over an in-memory inverted index, the lexical half of HYBRID queries"""
+
+    def __init__(self, texts: Sequence[str], k1: float = 1.5, b: float = 0.75):
+        self.k1, self.b = k1, b
+        self.size = len(texts)
+        postings: Dict[str, Tuple[List[int], List[int]]] = {}
+        lengths = np.zeros(self.size, dtype=np.float32)
+        for doc, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            lengths[doc] = sum(counts.values())
+            for term, tf in counts.items():
+                ids, tfs = postings.setdefault(term, ([], []))
+                ids.append(doc)
+                tfs.append(tf)
+        self.postings = {
+            term: (np.array(ids, dtype=np.int64), np.array(tfs, dtype=np.float32))
+            for term, (ids, tfs) in postings.items()
+        }
+        self.length_norm = k1 * (1 - b + b * lengths / max(float(lengths.mean()) if self.size else 0.0, 1e-12))
+
+    def search(self, query: str, k: int, mask: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        scores = np.zeros(self.size, dtype=np.float32)
+        for term in set(tokenize(query)):
+            if term not in self.postings:
+                continue
+            ids, tfs = self.postings[term]
+            idf = math.log(1 + (self.size - len(ids) + 0.5) / (len(ids) + 0.5))
+            scores[ids] += idf * tfs * (self.k1 + 1) / (tfs + self.length_norm[ids])
+        if mask is not None:
+            scores[~mask] = 0
+        ids = np.flatnonzero(scores > 0)
+        return top_k(ids, scores[ids], k)
+
+
+def top_k(ids: np.ndarray, scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """The `k` best of `ids` by their `scores` (aligned with `ids`), best first"""
+    if len(ids) > k:
+        best = np.argpartition(-scores, k - 1)[:k]
+        ids, scores = ids[best], scores[best]
+    order = np.argsort(-scores, kind="stable")
+    return ids[order], scores[order]
+
+
+def kmeans(vectors: np.ndarray, nlist: int, iterations: int = 10, sample_size: int = 256,
+           seed: int = 0) -> np.ndarray:
+    """Spherical k-means centroids trained on a sample of up to `sample_size` vectors per list"""
+    rng = np.random.default_rng(seed)
+    size = min(len(vectors), nlist * sample_size)
+    sample = np.asarray(vectors[np.sort(rng.choice(len(vectors), size=size, replace=False))], dtype=np.float32)
+    centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, sample)
+        empty = np.bincount(assignment, minlength=nlist) == 0
+        # Restart empty lists from random sample vectors
+        sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()), replace=False)]
+        centroids = normalize(sums)
+    return centroids
+
+
+def assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    return np.concatenate([
+        np.argmax(np.asarray(vectors[start:start + BLOCK_ROWS]) @ centroids.T, axis=1)
+        for start in range(0, len(vectors), BLOCK_ROWS)
+    ]) if len(vectors) else np.zeros(0, dtype=np.int64)
+
+
+def build_local_index(path: str, rows: Sequence[Dict[str, Any]], embeddings: np.ndarray,
+                      index_type: str = "flat", nlist: Optional[int] = None) -> Path:
+    """
+    Writes a local index directory: the normalized embeddings as a float32 `.npy` (opened memory-mapped),
+    the chunk rows (`id`, `content`, `doc_uri`, `metadata`, ...) as JSON and, for `ivf`, the centroids
+    and the row ids grouped by inverted list (`hnsw` graphs are built by FAISS when the index is
+    opened). `nlist` defaults to about sqrt(rows).
+    """
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    embeddings = normalize(embeddings)
+    np.save(path / "embeddings.npy", embeddings)
+    with open(path / "rows.json", "w") as f:
+        json.dump(list(rows), f)
+
+    meta = {"index_type": index_type, "rows": len(rows), "dim": int(embeddings.shape[1])}
+    if index_type == "ivf":
+        nlist = min(len(rows), nlist or max(1, int(math.sqrt(len(rows)))))
+        centroids = kmeans(embeddings, nlist)
+        assignment = assign(embeddings, centroids)
+        np.save(path / "ivf_centroids.npy", centroids)
+        np.save(path / "ivf_ids.npy", np.argsort(assignment, kind="stable"))
+        np.save(path / "ivf_offsets.npy", np.concatenate([[0], np.cumsum(np.bincount(assignment, minlength=nlist))]))
+        meta["nlist"] = nlist
+    elif index_type not in ("flat", "hnsw"):
+        raise NotImplementedError(f"Unsupported local index type: {index_type}")
+    with open(path / "index.json", "w") as f:
+        json.dump(meta, f)
+    return path
+
+
+class LocalVectorIndex():
+    """
+    Embedded stand-in for a Databricks Vector Search index, queried in process.
+
+    `similarity_search` takes the arguments of `VectorSearchIndex.similarity_search` and answers in
+    the same `manifest` / `result.data_array` layout (requested columns, then the score), so results go
+    through `parse_vector_search_results` unchanged. ANN queries score the query embedding against
+    the memory-mapped embeddings: every row (`flat`) or the rows of the `nprobe` closest inverted lists
+    (`ivf`). With `engine: faiss` the embeddings are loaded into a FAISS flat, IVF or HNSW index
+    instead. HYBRID queries fuse the ANN and BM25 rankings by reciprocal rank. `filters` restrict both
+    to the rows whose columns match.
+    """
+
+    def __init__(self, path: str, embedder: Embedder, engine: str = "numpy", nprobe: int = 8,
+                 hnsw_m: int = 32):
+        self.path = Path(path)
+        self.embedder = embedder
+        self.nprobe = nprobe
+        with open(self.path / "index.json") as f:
+            self.meta = json.load(f)
+        with open(self.path / "rows.json") as f:
+            self.rows: List[Dict[str, Any]] = json.load(f)
+        self.embeddings = np.load(self.path / "embeddings.npy", mmap_mode="r")
+        self._bm25: Optional[BM25] = None
+        self._columns: Dict[str, pd.Series] = {}  # filterable row values by column, built on first use
+
+        self.index_type = self.meta["index_type"]
+        if self.index_type == "ivf":
+            self.centroids = np.load(self.path / "ivf_centroids.npy")
+            self.ivf_ids = np.load(self.path / "ivf_ids.npy", mmap_mode="r")
+            self.ivf_offsets = np.load(self.path / "ivf_offsets.npy")
+
+        self.engine = engine
+        self.faiss_index = None
+        if engine == "faiss":
+            self.faiss_index = self._faiss_index(hnsw_m)
+        elif engine != "numpy":
+            raise NotImplementedError(f"Unsupported local index engine: {engine}")
+        elif self.index_type == "hnsw":
+            raise NotImplementedError("hnsw local indexes need engine: faiss")
+
+    @classmethod
+    def from_config(cls, index_config: Dict[str, Any]) -> "LocalVectorIndex":
+        return cls(
+            index_config["path"],
+            get_embedder(index_config["embedding"]),
+            engine=index_config.get("engine", "numpy"),
+            nprobe=index_config.get("nprobe", 8),
+        )
+
+    def _faiss_index(self, hnsw_m: int):
+        if faiss is None:
+            raise ImportError("engine: faiss needs the faiss-cpu package (pip install faiss-cpu), or use engine: numpy")
+        dim = self.meta["dim"]
+        if self.index_type == "flat":
+            index = faiss.IndexFlatIP(dim)
+        elif self.index_type == "ivf":
+            # Reuse the centroids of the build instead of training FAISS' own
+            quantizer = faiss.IndexFlatIP(dim)
+            quantizer.add(np.ascontiguousarray(self.centroids))
+            index = faiss.IndexIVFFlat(quantizer, dim, self.meta["nlist"], faiss.METRIC_INNER_PRODUCT)
+            index.is_trained = True
+            index.nprobe = self.nprobe
+            self._quantizer = quantizer
+        elif self.index_type == "hnsw":
+            index = faiss.IndexHNSWFlat(dim, hnsw_m, faiss.METRIC_INNER_PRODUCT)
+        else:
+            raise NotImplementedError(f"Unsupported local index type: {self.index_type}")
+        for start in range(0, len(self.embeddings), BLOCK_ROWS):
+            index.add(np.ascontiguousarray(self.embeddings[start:start + BLOCK_ROWS]))
+        return index
+
+    @property
+    def bm25(self) -> BM25:
+        # Built on the first HYBRID query, ANN-only deployments never pay for it
+        if self._bm25 is None:
+            self._bm25 = BM25([row.get("content") or "" for row in self.rows])
+        return self._bm25
+
+    def _candidate_ids(self, query: np.ndarray) -> np.ndarray:
+        lists = top_k(np.arange(len(self.centroids)), self.centroids @ query, self.nprobe)[0]
+        return np.sort(np.concatenate(
+            [self.ivf_ids[self.ivf_offsets[i]:self.ivf_offsets[i + 1]] for i in lists]
+        ))
+
+    def filter_mask(self, filters: Dict[str, Any]) -> np.ndarray:
+        """
+        Rows matching Vector Search style `filters`: `{"column": value}` for equality, `{"column": [values]}`
+        for any of the values, all columns have to match
+        """
+        mask = np.ones(len(self.rows), dtype=bool)
+        for column, values in filters.items():
+            if " " in column.strip():
+                raise NotImplementedError(f"Unsupported local index filter: {column}")
+            if column not in self._columns:
+                self._columns[column] = pd.Series([row.get(column) for row in self.rows], dtype=object)
+            mask &= self._columns[column].isin(values if isinstance(values, (list, tuple)) else [values]).to_numpy()
+        return mask
+
+    def dense_search(self, query: np.ndarray, k: int, mask: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Row ids and inner products of the `k` nearest embeddings of a normalized query vector. With a
+        filter `mask` exactly the matching rows are scanned, whatever the index type.
+        """
+        if mask is not None:
+            ids, scores = [], []
+            matching = np.flatnonzero(mask)
+            for start in range(0, len(matching), BLOCK_ROWS):
+                block_ids = matching[start:start + BLOCK_ROWS]
+                block_ids, block_scores = top_k(block_ids, np.asarray(self.embeddings[block_ids]) @ query, k)
+                ids.append(block_ids)
+                scores.append(block_scores)
+            return top_k(np.concatenate(ids), np.concatenate(scores), k) if ids else (np.zeros(0, np.int64), np.zeros(0))
+        if self.faiss_index is not None:
+            scores, ids = self.faiss_index.search(query.reshape(1, -1), k)
+            found = ids[0] >= 0
+            return ids[0][found], scores[0][found]
+        if self.index_type == "ivf":
+            ids = self._candidate_ids(query)
+            return top_k(ids, np.asarray(self.embeddings[ids]) @ query, k)
+        ids, scores = [], []
+        for start in range(0, len(self.embeddings), BLOCK_ROWS):
+            block_ids, block_scores = top_k(
+                np.arange(start, min(start + BLOCK_ROWS, len(self.embeddings))),
+                np.asarray(self.embeddings[start:start + BLOCK_ROWS]) @ query, k,
+            )
+            ids.append(block_ids)
+            scores.append(block_scores)
+        return top_k(np.concatenate(ids), np.concatenate(scores), k) if ids else (np.zeros(0, np.int64), np.zeros(0))
+
+    def search(self, query_text: str, num_results: int, query_type: str = "ANN",
+               filters: Optional[Dict[str, Any]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        query = self.embedder([query_text])[0]
+        query_type = (query_type or "ANN").upper()
+        mask = self.filter_mask(filters) if filters else None
+        if query_type == "ANN":
+            return self.dense_search(query, num_results, mask)
+        elif query_type == "HYBRID":
+            depth = max(num_results * 4, 20)
+            fused: Dict[int, float] = {}
+            for ids in (self.dense_search(query, depth, mask)[0], self.bm25.search(query_text, depth, mask)[0]):
+                for rank, row_id in enumerate(ids.tolist()):
+                    fused[row_id] = fused.get(row_id, 0.0) + 1.0 / (RRF_K + rank + 1)
+            ids = np.fromiter(fused.keys(), dtype=np.int64, count=len(fused))
+            return top_k(ids, np.fromiter(fused.values(), dtype=np.float64, count=len(fused)), num_results)
+        else:
+            raise NotImplementedError(f"Unsupported query type: {query_type}")
+
+    def similarity_search(self, query_text: str, columns: Sequence[str], num_results: int = 5,
+                          query_type: str = "ANN", filters: Optional[Dict[str, Any]] = None, **kwargs) -> Dict[str, Any]:
+        ids, scores = self.search(query_text, num_results, query_type, filters)
+        data_array = [
+            [self.rows[row_id].get(column) for column in columns] + [float(score)]
+            for row_id, score in zip(ids.tolist(), scores.tolist())
+        ]
+        return {
+            "manifest": {"columns": [{"name": column} for column in list(columns) + ["score"]]},
+            "result": {"row_count": len(data_array), "data_array": data_array},
+        }
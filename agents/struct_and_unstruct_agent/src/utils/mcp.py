@@ -1,20 +1,298 @@
+import os
+import json
+import time
+import hashlib
+import atexit
 import asyncio
+import threading
+import concurrent.futures
 
-from pydantic import BaseModel, create_model
-from typing import Annotated, Any, Generator, List, Optional, Sequence, TypedDict, Union
+import anyio
+import httpx
+import mlflow
 
-from mcp import ClientSession
+from fnmatch import fnmatch
+from collections import OrderedDict
+from datetime import timedelta
+from pydantic import BaseModel, Field, create_model
+from pydantic_core import to_jsonable_python
+from typing import Annotated, Any, Callable, Dict, Generator, List, Literal, Optional, Sequence, Tuple, Type, TypedDict, Union
+
+from mcp import ClientSession, types
 from mcp.client.streamable_http import streamablehttp_client as connect
+from mcp.shared.exceptions import McpError
 from langchain_core.tools import BaseTool
 
 from databricks.sdk import WorkspaceClient
-from databricks_mcp import DatabricksOAuthClientProvider, DatabricksMCPClient
+from databricks_mcp import DatabricksOAuthClientProvider
+
+
+# MCP errors meaning the pooled session itself is gone: the connection closed, or the server dropped or
+# expired the session, which the streamable HTTP client reports for a 404 as "Session terminated"
+SESSION_LOST_ERROR_CODES = {types.CONNECTION_CLOSED}
+SESSION_TERMINATED_MESSAGE = "Session terminated"
+
+# Transport errors raised before the request reached the server, a retry can't run a tool twice
+SESSION_LOST_ERRORS = (anyio.ClosedResourceError, anyio.BrokenResourceError, httpx.ConnectError, httpx.ConnectTimeout)
+
+
+class _Connection():
+    """One initialized ClientSession, held open by its owner task until `stop` is set"""
+
+    def __init__(self):
+        self.session: Optional[ClientSession] = None
+        self.owner: Optional[asyncio.Task] = None
+        self.stop = asyncio.Event()
+        # Calls running on the session, a replaced connection is closed once the last one returns
+        self.calls = 0
+        self.replaced = False
+
+    def is_open(self) -> bool:
+        return self.session is not None and self.owner is not None and not self.owner.done()
+
+
+class _PooledSession():
+    """The current connection to a server on the pool's event loop, replaced when its session is lost"""
+
+    def __init__(self, server_url: str, auth_factory: Callable[[], Any]):
+        self.server_url = server_url
+        self.auth_factory = auth_factory
+        self.connection: Optional[_Connection] = None
+        self._connect_lock = asyncio.Lock()
+
+    async def acquire(self, lost: Optional[_Connection] = None) -> _Connection:
+        """
+        Connection to run a call on, `release` it after the call. With `lost`, the connection a call failed on,
+        it is replaced unless a concurrent caller already did: their calls failed on it too, and replacing it
+        again would close the connection their retries run on.
+        """
+        async with self._connect_lock:
+            if self.connection is None or self.connection is lost or not self.connection.is_open():
+                if self.connection is not None:
+                    self._replace(self.connection)
+                self.connection = await self._connect()
+            self.connection.calls += 1
+            return self.connection
+
+    def release(self, connection: _Connection):
+        connection.calls -= 1
+        if connection.replaced and connection.calls == 0:
+            connection.stop.set()
+
+    def _replace(self, connection: _Connection):
+        # Calls still running on it get their own error first, closing the session would leave them waiting
+        connection.replaced = True
+        if connection.calls == 0:
+            connection.stop.set()
+
+    async def _connect(self) -> _Connection:
+        connection = _Connection()
+        ready = asyncio.get_running_loop().create_future()
+        connection.owner = asyncio.create_task(self._hold(connection, ready))
+        await ready
+        return connection
+
+    async def _hold(self, connection: _Connection, ready: asyncio.Future):
+        # The transport and session contexts are anyio scopes, they must be entered and exited by the same task
+        try:
+            async with connect(self.server_url, auth=self.auth_factory()) as (read_stream, write_stream, _):
+                async with ClientSession(read_stream, write_stream) as session:
+                    await session.initialize()
+                    connection.session = session
+                    ready.set_result(session)
+                    await connection.stop.wait()
+        except BaseException as e:
+            if not ready.done():
+                ready.set_exception(e)
+        finally:
+            connection.session = None
+
+    async def close(self, timeout: float = 5):
+        connection = self.connection
+        if connection is None or connection.owner.done():
+            return
+        connection.stop.set()
+        try:
+            await asyncio.wait_for(connection.owner, timeout)
+        except BaseException:
+            connection.owner.cancel()
+
+
+class MCPSessionPool():
+    """
+    Keeps one initialized MCP session alive per server URL, shared by every tool of that server.
+
+    Sessions live on a dedicated background event loop so sync callers (`_run`) and async callers on any
+    other loop (`_arun`) reuse the same connection. Tool calls therefore skip the connection and
+    `initialize()` handshake. If a call fails because the session is gone (see `SESSION_LOST_ERROR_CODES`,
+    `SESSION_TERMINATED_MESSAGE` and `SESSION_LOST_ERRORS`), the session is re-established and the call is
+    retried once. Any other error is raised, the call may already have run on the server.
+    """
+
+    def __init__(self, call_timeout_seconds: float = 300):
+        self.call_timeout_seconds = call_timeout_seconds
+        self._sessions: Dict[str, _PooledSession] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None or not self._thread.is_alive():
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="mcp-session-pool", daemon=True)
+                self._thread.start()
+            return self._loop
+
+    def _submit(self, coro) -> concurrent.futures.Future:
+        return asyncio.run_coroutine_threadsafe(coro, self._get_loop())
+
+    def _pooled_session(self, server_url: str, auth_factory: Callable[[], Any]) -> _PooledSession:
+        if server_url not in self._sessions:
+            self._sessions[server_url] = _PooledSession(server_url, auth_factory)
+        return self._sessions[server_url]
+
+    async def _with_session(self, server_url: str, auth_factory: Callable[[], Any], fn):
+        pooled = self._pooled_session(server_url, auth_factory)
+        connection = await pooled.acquire()
+        try:
+            return await fn(connection.session)
+        except McpError as e:
+            # Protocol level errors (unknown tool, bad arguments) come from a healthy session
+            if e.error.code not in SESSION_LOST_ERROR_CODES and e.error.message != SESSION_TERMINATED_MESSAGE:
+                raise
+        except SESSION_LOST_ERRORS:
+            pass
+        finally:
+            pooled.release(connection)
+        # Session dropped or expired: reconnect, unless another caller already did, and retry once
+        connection = await pooled.acquire(lost=connection)
+        try:
+            return await fn(connection.session)
+        finally:
+            pooled.release(connection)
+
+    async def _call_tool(self, server_url, auth_factory, name, arguments):
+        return await self._with_session(
+            server_url,
+            auth_factory,
+            lambda session: session.call_tool(
+                name, arguments, read_timeout_seconds=timedelta(seconds=self.call_timeout_seconds)
+            ),
+        )
+
+    async def _list_tools(self, server_url, auth_factory):
+        response = await self._with_session(server_url, auth_factory, lambda session: session.list_tools())
+        return response.tools
+
+    def run(self, coro):
+        """Run a coroutine on the pool's loop and wait for it, also from a thread with a running event loop"""
+        return self._submit(coro).result()
+
+    def call_tool(self, server_url: str, auth_factory: Callable[[], Any], name: str, arguments: Dict[str, Any]):
+        return self._submit(self._call_tool(server_url, auth_factory, name, arguments)).result()
+
+    async def acall_tool(self, server_url: str, auth_factory: Callable[[], Any], name: str, arguments: Dict[str, Any]):
+        return await asyncio.wrap_future(self._submit(self._call_tool(server_url, auth_factory, name, arguments)))
+
+    def list_tools(self, server_url: str, auth_factory: Callable[[], Any]):
+        return self._submit(self._list_tools(server_url, auth_factory)).result()
+
+    async def alist_tools(self, server_url: str, auth_factory: Callable[[], Any]):
+        return await asyncio.wrap_future(self._submit(self._list_tools(server_url, auth_factory)))
+
+    def submit_list_tools(self, server_url: str, auth_factory: Callable[[], Any]) -> concurrent.futures.Future:
+        """Schedule a list_tools on the pool's loop without waiting, it outlives the caller's event loop"""
+        return self._submit(self._list_tools(server_url, auth_factory))
+
+    def close(self):
+        with self._lock:
+            if self._loop is None:
+                return
+            loop, self._loop = self._loop, None
+        sessions, self._sessions = list(self._sessions.values()), {}
+
+        async def close_all():
+            await asyncio.gather(*[pooled.close() for pooled in sessions])
+
+        try:
+            asyncio.run_coroutine_threadsafe(close_all(), loop).result(timeout=10)
+        except Exception:
+            pass
+        loop.call_soon_threadsafe(loop.stop)
+
+
+_session_pool = MCPSessionPool()
+atexit.register(_session_pool.close)
+
+
+def get_session_pool() -> MCPSessionPool:
+    """Process wide MCP session pool shared by all MCPTool instances"""
+    return _session_pool
+
+
+def get_auth_factory(ws: WorkspaceClient) -> Callable[[], Any]:
+    """Databricks OAuth of the workspace client, built per connection"""
+    return lambda: DatabricksOAuthClientProvider(ws)
+
+
+class ToolResultCache():
+    """
+    Opt-in cache of MCP tool outputs for read-only tools (e.g. Genie `query_space_*`, vector search).
+
+    Only tools matching an allowlist pattern are cached, keyed on server URL, tool name and the
+    canonicalized arguments. Entries expire after `ttl_seconds` and the least recently used entries are
+    evicted beyond `max_size`.
+    """
+
+    def __init__(self, tools: Sequence[str], ttl_seconds: float = 600, max_size: int = 512):
+        self.tool_patterns = list(tools)
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def is_cacheable(self, tool_name: str) -> bool:
+        return any(fnmatch(tool_name, pattern) for pattern in self.tool_patterns)
+
+    def key(self, server_url: str, tool_name: str, arguments: Dict[str, Any]) -> str:
+        return json.dumps([server_url, tool_name, arguments], sort_keys=True, separators=(",", ":"))
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: str):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+def create_tool_result_cache(cache_config: Optional[Dict[str, Any]]) -> Optional[ToolResultCache]:
+    """Build the result cache from the `tool_result_cache` config section, disabled without a tool allowlist"""
+    if not cache_config or not cache_config.get("tools"):
+        return None
+    return ToolResultCache(
+        tools=cache_config["tools"],
+        ttl_seconds=cache_config.get("ttl_seconds", 600),
+        max_size=cache_config.get("max_size", 512),
+    )
 
 
 class MCPTool(BaseTool):
     """Custom LangChain tool that wraps MCP server functionality"""
 
-    def __init__(self, name: str, description: str, args_schema: type, server_url: str, ws: WorkspaceClient, is_custom: bool = False):
+    def __init__(self, name: str, description: str, args_schema: type, server_url: str, ws: WorkspaceClient, is_custom: bool = False, result_cache: Optional[ToolResultCache] = None):
         # Initialize the tool
         super().__init__(
             name=name,
@@ -25,116 +303,229 @@ class MCPTool(BaseTool):
         object.__setattr__(self, 'server_url', server_url)
         object.__setattr__(self, 'workspace_client', ws)
         object.__setattr__(self, 'is_custom', is_custom)
+        # Only keep the result cache if this tool is on its allowlist
+        object.__setattr__(
+            self, 'result_cache', result_cache if result_cache is not None and result_cache.is_cacheable(name) else None
+        )
+
+    def _cache_lookup(self, arguments: Dict[str, Any]) -> Tuple[Optional[str], Optional[str]]:
+        if self.result_cache is None:
+            return None, None
+        key = self.result_cache.key(self.server_url, self.name, arguments)
+        cached = self.result_cache.get(key)
+        span = mlflow.get_current_active_span()
+        if span is not None:
+            span.set_attribute("tool_result_cache_hit", cached is not None)
+        return key, cached
+
+    def _cache_store(self, key: Optional[str], response) -> str:
+        output = "".join([c.text for c in response.content])
+        if key is not None and not response.isError:
+            self.result_cache.put(key, output)
+        return output
 
     def _run(self, **kwargs) -> str:
         """Execute the MCP tool"""
-        if self.is_custom:
-            # Use the async method for custom MCP servers (OAuth required)
-            return asyncio.run(self._run_custom_async(**kwargs))
+        # Nested object arguments arrive as generated pydantic models, send them as plain JSON
+        arguments = to_jsonable_python(kwargs)
+        key, cached = self._cache_lookup(arguments)
+        if cached is not None:
+            return cached
+        # Managed and custom servers both speak streamable HTTP with Databricks OAuth, so both go
+        # through the pooled session of their server instead of connecting per call
+        response = get_session_pool().call_tool(
+            self.server_url, get_auth_factory(self.workspace_client), self.name, arguments
+        )
+        return self._cache_store(key, response)
+
+    async def _arun(self, **kwargs) -> str:
+        """Execute the MCP tool on the caller's event loop (no nested asyncio.run)"""
+        arguments = to_jsonable_python(kwargs)
+        key, cached = self._cache_lookup(arguments)
+        if cached is not None:
+            return cached
+        response = await get_session_pool().acall_tool(
+            self.server_url, get_auth_factory(self.workspace_client), self.name, arguments
+        )
+        return self._cache_store(key, response)
+
+class ToolSchemaCache():
+    """
+    On-disk cache of MCP tool definitions keyed by server URL.
+
+    Lets a cold start build the agent from the last known schemas instead of waiting on every
+    server's `list_tools`; the entries are refreshed in the background on the MCP session pool.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _read(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def get(self, server_url: str) -> Optional[List[types.Tool]]:
+        entry = self._read().get(server_url)
+        if entry is None:
+            return None
+        return [types.Tool.model_validate(tool) for tool in entry["tools"]]
+
+    def put(self, server_url: str, mcp_tools: List[types.Tool]):
+        with self._lock:
+            entries = self._read()
+            entries[server_url] = {
+                "updated_at": time.time(),
+                "tools": [tool.model_dump(mode="json", exclude_none=True) for tool in mcp_tools],
+            }
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, self.path)
+
+
+# Retrieve tool definitions from a managed or custom MCP server (Databricks OAuth)
+async def list_mcp_tools(ws: WorkspaceClient, server_url: str, timeout_seconds: float = None) -> List[types.Tool]:
+    """Get tools from an MCP server over its pooled session, so the handshake is reused by tool calls"""
+    return await asyncio.wait_for(
+        get_session_pool().alist_tools(server_url, get_auth_factory(ws)),
+        timeout=timeout_seconds,
+    )
+
+def refresh_mcp_tools_in_background(ws: WorkspaceClient, server_url: str, cache: ToolSchemaCache):
+    """Re-list a server's tools on the pool's event loop and update the cache for the next cold start"""
+    def on_done(future):
+        if future.exception() is None:
+            cache.put(server_url, future.result())
         else:
-            # Use managed MCP server via synchronous call
-            mcp_client = DatabricksMCPClient(server_url=self.server_url, workspace_client=self.workspace_client)
-            response = mcp_client.call_tool(self.name, kwargs)
-            return "".join([c.text for c in response.content])
-
-    async def _run_custom_async(self, **kwargs) -> str:
-        """Execute custom MCP tool asynchronously"""
-        async with connect(self.server_url, auth=DatabricksOAuthClientProvider(self.workspace_client)) as (
-            read_stream,
-            write_stream,
-            _,
-        ):
-            # Create an async session with the server and call the tool
-            async with ClientSession(read_stream, write_stream) as session:
-                await session.initialize()
-                response = await session.call_tool(self.name, kwargs)
-                return "".join([c.text for c in response.content])
-
-# Retrieve tool definitions from a custom MCP server (OAuth required)
-async def get_custom_mcp_tools(ws: WorkspaceClient, server_url: str):
-    """Get tools from a custom MCP server using OAuth"""
-    async with connect(server_url, auth=DatabricksOAuthClientProvider(ws)) as (
-        read_stream,
-        write_stream,
-        _,
-    ):
-        async with ClientSession(read_stream, write_stream) as session:
-            await session.initialize()
-            tools_response = await session.list_tools()
-            return tools_response.tools
-
-# Retrieve tool definitions from a managed MCP server
-def get_managed_mcp_tools(ws: WorkspaceClient, server_url: str):
-    """Get tools from a managed MCP server"""
-    mcp_client = DatabricksMCPClient(server_url=server_url, workspace_client=ws)
-    return mcp_client.list_tools()
+            print(f"Error refreshing cached tools for server {server_url}: {future.exception()}")
 
-# Convert an MCP tool definition into a LangChain-compatible tool
-def create_langchain_tool_from_mcp(mcp_tool, server_url: str, ws: WorkspaceClient, is_custom: bool = False):
-    """Create a LangChain tool from an MCP tool definition"""
-    schema = mcp_tool.inputSchema.copy()
+    get_session_pool().submit_list_tools(server_url, get_auth_factory(ws)).add_done_callback(on_done)
+
+# Map JSON schema types to Python types for input validation
+TYPE_MAPPING = {
+    "string": str,
+    "integer": int,
+    "number": float,
+    "boolean": bool,
+    "null": type(None),
+}
+
+# Generated argument models keyed on the hash of the tool's inputSchema, shared across workflow builds
+_ARGS_SCHEMA_CACHE: Dict[str, Type[BaseModel]] = {}
+
+def _json_schema_to_type(field_info: Dict[str, Any], model_name: str) -> Any:
+    """Resolve a JSON schema property to a Python type, recursing into arrays, objects and unions"""
+    if field_info.get("enum") and all(isinstance(v, (str, int, float, bool)) for v in field_info["enum"]):
+        return Literal[tuple(field_info["enum"])]
+    for union_key in ("anyOf", "oneOf"):
+        if union_key in field_info:
+            options = [
+                _json_schema_to_type(option, f"{model_name}Option{i}")
+                for i, option in enumerate(field_info[union_key])
+            ]
+            return Union[tuple(options)]
+
+    field_type = field_info.get("type", "string")
+    if isinstance(field_type, list):
+        return Union[tuple(_json_schema_to_type({**field_info, "type": t}, model_name) for t in field_type)]
+    if field_type == "array":
+        return List[_json_schema_to_type(field_info.get("items", {}), f"{model_name}Item")]
+    if field_type == "object":
+        if field_info.get("properties"):
+            return _create_args_model(field_info, model_name)
+        return Dict[str, Any]
+    return TYPE_MAPPING.get(field_type, str)
+
+def _create_args_model(schema: Dict[str, Any], model_name: str) -> Type[BaseModel]:
     properties = schema.get("properties", {})
     required = schema.get("required", [])
 
-    # Map JSON schema types to Python types for input validation
-    TYPE_MAPPING = {
-        "integer": int,
-        "number": float,
-        "boolean": bool
-    }
     field_definitions = {}
     for field_name, field_info in properties.items():
-        field_type_str = field_info.get("type", "string")
-        field_type = TYPE_MAPPING.get(field_type_str, str)
+        field_type = _json_schema_to_type(field_info, f"{model_name}_{field_name}")
+        description = field_info.get("description")
 
         if field_name in required:
-            field_definitions[field_name] = (field_type, ...)
+            field_definitions[field_name] = (field_type, Field(..., description=description))
         else:
-            field_definitions[field_name] = (field_type, None)
+            field_definitions[field_name] = (field_type, Field(None, description=description))
 
     # Dynamically create a Pydantic schema for the tool's input arguments
-    args_schema = create_model(
-        f"{mcp_tool.name}Args",
-        **field_definitions
-    )
+    return create_model(model_name, **field_definitions)
+
+def get_args_schema(input_schema: Dict[str, Any]) -> Type[BaseModel]:
+    """Pydantic model for an MCP inputSchema, generated once per distinct schema"""
+    schema_hash = hashlib.sha256(
+        json.dumps(input_schema, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+    if schema_hash not in _ARGS_SCHEMA_CACHE:
+        _ARGS_SCHEMA_CACHE[schema_hash] = _create_args_model(input_schema, f"MCPToolArgs_{schema_hash[:12]}")
+    return _ARGS_SCHEMA_CACHE[schema_hash]
 
+# Convert an MCP tool definition into a LangChain-compatible tool
+def create_langchain_tool_from_mcp(mcp_tool, server_url: str, ws: WorkspaceClient, is_custom: bool = False,
+                                   result_cache: Optional[ToolResultCache] = None):
+    """Create a LangChain tool from an MCP tool definition"""
     # Return a configured MCPTool instance
     return MCPTool(
         name=mcp_tool.name,
         description=mcp_tool.description or f"Tool: {mcp_tool.name}",
-        args_schema=args_schema,
+        args_schema=get_args_schema(mcp_tool.inputSchema),
         server_url=server_url,
         ws=ws,
-        is_custom=is_custom
+        is_custom=is_custom,
+        result_cache=result_cache,
     )
 
 # Gather all tools from managed and custom MCP servers into a single list
 async def create_mcp_tools(ws: WorkspaceClient,
                           managed_server_urls: List[str] = None,
-                          custom_server_urls: List[str] = None) -> List[MCPTool]:
-    """Create LangChain tools from both managed and custom MCP servers"""
+                          custom_server_urls: List[str] = None,
+                          discovery_timeout_seconds: float = 30,
+                          cache_path: Optional[str] = None,
+                          result_cache: Optional[ToolResultCache] = None) -> List[MCPTool]:
+    """
+    Create LangChain tools from both managed and custom MCP servers.
+
+    All servers are discovered concurrently, each bounded by `discovery_timeout_seconds`. With a
+    `cache_path`, cached schemas are used right away and refreshed in the background. Tools on the
+    `result_cache` allowlist serve repeated calls from that cache.
+    """
+    cache = ToolSchemaCache(cache_path) if cache_path else None
+    servers = [
+        *[(server_url, False) for server_url in managed_server_urls or []],
+        *[(server_url, True) for server_url in custom_server_urls or []],
+    ]
+
+    async def discover(server_url: str) -> List[types.Tool]:
+        if cache is not None:
+            cached_tools = cache.get(server_url)
+            if cached_tools is not None:
+                refresh_mcp_tools_in_background(ws, server_url, cache)
+                return cached_tools
+        mcp_tools = await list_mcp_tools(ws, server_url, timeout_seconds=discovery_timeout_seconds)
+        if cache is not None:
+            cache.put(server_url, mcp_tools)
+        return mcp_tools
+
+    results = await asyncio.gather(
+        *[discover(server_url) for server_url, _ in servers], return_exceptions=True
+    )
+
     tools = []
+    for (server_url, is_custom), mcp_tools in zip(servers, results):
+        if isinstance(mcp_tools, BaseException):
+            kind = "custom" if is_custom else "managed"
+            print(f"Error loading tools from {kind} server {server_url}: {mcp_tools!r}")
+            continue
+        for mcp_tool in mcp_tools:
+            tools.append(
+                create_langchain_tool_from_mcp(mcp_tool, server_url, ws, is_custom=is_custom, result_cache=result_cache)
+            )
 
-    if managed_server_urls:
-        # Load managed MCP tools
-        for server_url in managed_server_urls:
-            try:
-                mcp_tools = get_managed_mcp_tools(ws, server_url)
-                for mcp_tool in mcp_tools:
-                    tool = create_langchain_tool_from_mcp(mcp_tool, server_url, ws, is_custom=False)
-                    tools.append(tool)
-            except Exception as e:
-                print(f"Error loading tools from managed server {server_url}: {e}")
-
-    if custom_server_urls:
-        # Load custom MCP tools (async)
-        for server_url in custom_server_urls:
-            try:
-                mcp_tools = await get_custom_mcp_tools(ws, server_url)
-                for mcp_tool in mcp_tools:
-                    tool = create_langchain_tool_from_mcp(mcp_tool, server_url, ws, is_custom=True)
-                    tools.append(tool)
-            except Exception as e:
-                print(f"Error loading tools from custom server {server_url}: {e}")
-
-    return tools
\ No newline at end of file
+    return tools
@@ -0,0 +1,136 @@
+import time
+import threading
+
+from uuid import UUID
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+
+class AgentMetricsHandler(BaseCallbackHandler):
+    """
+    Callback handler collecting per request metrics of a LangGraph run.
+
+    Records wall time and call count of every graph node, LLM calls and input / output tokens
+    attributed to the node that made them, and the latency of every tool call. Pass it in the run
+    config of `workflow.stream` / `astream` and read `summary()` once the run has finished.
+    """
+
+    # Keep the bookkeeping on the calling thread / event loop instead of an executor
+    run_inline = True
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._started_at = time.perf_counter()
+        self._root_run_id: Optional[UUID] = None
+        self._node_runs: Dict[UUID, tuple] = {}
+        self._llm_runs: Dict[UUID, str] = {}
+        self._tool_runs: Dict[UUID, tuple] = {}
+        self.nodes = defaultdict(lambda: {"calls": 0, "latency_ms": 0.0, "llm_calls": 0, "input_tokens": 0, "output_tokens": 0})
+        self.tools = defaultdict(lambda: {"calls": 0, "errors": 0, "latency_ms": []})
+
+    def on_chain_start(self, serialized: Dict[str, Any], inputs: Any, *, run_id: UUID,
+                       parent_run_id: Optional[UUID] = None, metadata: Optional[Dict[str, Any]] = None, **kwargs: Any):
+        with self._lock:
+            if self._root_run_id is None and parent_run_id is None:
+                self._root_run_id = run_id
+            elif parent_run_id is not None and parent_run_id == self._root_run_id:
+                # Direct children of the graph run are the node executions
+                node = (metadata or {}).get("langgraph_node") or kwargs.get("name")
+                self._node_runs[run_id] = (node, time.perf_counter())
+
+    def _end_node(self, run_id: UUID):
+        with self._lock:
+            if run_id in self._node_runs:
+                node, started_at = self._node_runs.pop(run_id)
+                self.nodes[node]["calls"] += 1
+                self.nodes[node]["latency_ms"] += (time.perf_counter() - started_at) * 1000
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any):
+        self._end_node(run_id)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self._end_node(run_id)
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[Any], *, run_id: UUID,
+                            metadata: Optional[Dict[str, Any]] = None, **kwargs: Any):
+        with self._lock:
+            self._llm_runs[run_id] = (metadata or {}).get("langgraph_node", "unknown")
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID,
+                     metadata: Optional[Dict[str, Any]] = None, **kwargs: Any):
+        self.on_chat_model_start(serialized, prompts, run_id=run_id, metadata=metadata)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any):
+        input_tokens, output_tokens = self._token_usage(response)
+        with self._lock:
+            node = self.nodes[self._llm_runs.pop(run_id, "unknown")]
+            node["llm_calls"] += 1
+            node["input_tokens"] += input_tokens
+            node["output_tokens"] += output_tokens
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        with self._lock:
+            self._llm_runs.pop(run_id, None)
+
+    def _token_usage(self, response: LLMResult) -> tuple:
+        input_tokens, output_tokens = 0, 0
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    input_tokens += usage.get("input_tokens", 0)
+                    output_tokens += usage.get("output_tokens", 0)
+        if not (input_tokens or output_tokens):
+            # Endpoints that only report OpenAI style usage in llm_output
+            usage = (response.llm_output or {}).get("token_usage") or {}
+            input_tokens = usage.get("prompt_tokens", 0)
+            output_tokens = usage.get("completion_tokens", 0)
+        return input_tokens, output_tokens
+
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, *, run_id: UUID, **kwargs: Any):
+        name = kwargs.get("name") or (serialized or {}).get("name", "unknown")
+        with self._lock:
+            self._tool_runs[run_id] = (name, time.perf_counter())
+
+    def _end_tool(self, run_id: UUID, error: bool):
+        with self._lock:
+            if run_id in self._tool_runs:
+                name, started_at = self._tool_runs.pop(run_id)
+                self.tools[name]["calls"] += 1
+                self.tools[name]["errors"] += int(error)
+                self.tools[name]["latency_ms"].append((time.perf_counter() - started_at) * 1000)
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any):
+        self._end_tool(run_id, error=False)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self._end_tool(run_id, error=True)
+
+    def summary(self) -> Dict[str, Any]:
+        """JSON-serializable metrics of the run, latencies in milliseconds"""
+        with self._lock:
+            nodes = {
+                name: {**node, "latency_ms": round(node["latency_ms"], 1)}
+                for name, node in self.nodes.items()
+            }
+            tools = {
+                name: {
+                    "calls": tool["calls"],
+                    "errors": tool["errors"],
+                    "latency_ms": round(sum(tool["latency_ms"]), 1),
+                    "max_latency_ms": round(max(tool["latency_ms"], default=0), 1),
+                }
+                for name, tool in self.tools.items()
+            }
+        return {
+            "latency_ms": round((time.perf_counter() - self._started_at) * 1000, 1),
+            "iterations": sum(node["calls"] for node in nodes.values()),
+            "llm_calls": sum(node["llm_calls"] for node in nodes.values()),
+            "input_tokens": sum(node["input_tokens"] for node in nodes.values()),
+            "output_tokens": sum(node["output_tokens"] for node in nodes.values()),
+            "nodes": nodes,
+            "tools": tools,
+        }
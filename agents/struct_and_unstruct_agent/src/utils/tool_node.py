@@ -0,0 +1,163 @@
+import json
+import time
+import asyncio
+
+from uuid import uuid4
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain_core.tools import BaseTool
+from langchain_core.runnables import RunnableConfig
+from langchain_core.runnables.config import ContextThreadPoolExecutor
+from langgraph.prebuilt.tool_node import ToolNode
+
+TOOL_CALL_ERROR_TEMPLATE = "Error: {error}\n Please fix your mistakes."
+
+
+class AgentToolNode(ToolNode):
+    """
+    Tool node for ChatAgentState graphs that runs all tool calls of an assistant message concurrently.
+
+    The sync path (`invoke`/`stream`) uses a bounded thread pool and the async path (`ainvoke`/`astream`)
+    uses asyncio tasks bounded by a semaphore, so a turn that calls e.g. Genie and vector search together
+    costs the slowest call rather than the sum. Every call has its own timeout and errors are returned as
+    that call's tool message, tool messages keep the order of the tool calls. Like ChatAgentToolNode,
+    `attachments` and `custom_outputs` of JSON tool outputs (UC functions included) are parsed into the
+    tool message and the state.
+    """
+
+    def __init__(
+        self,
+        tools: Sequence[BaseTool],
+        max_concurrency: Optional[int] = None,
+        timeout_seconds: Optional[float] = None,
+        **kwargs: Any,
+    ):
+        super().__init__(tools, **kwargs)
+        # None runs every tool call of a turn at once
+        self.max_concurrency = max(1, max_concurrency) if max_concurrency else None
+        self.timeout_seconds = timeout_seconds
+
+    def _get_tool_calls(self, input: Dict[str, Any]) -> List[Dict[str, Any]]:
+        last_message = input["messages"][-1]
+        tool_calls = []
+        for tool_call in last_message.get("tool_calls") or []:
+            # Arguments are parsed per call in _parse_args, a malformed one only fails its own call
+            tool_calls.append(
+                {
+                    "id": tool_call["id"],
+                    "name": tool_call["function"]["name"],
+                    "args": tool_call["function"]["arguments"],
+                }
+            )
+        return tool_calls
+
+    def _parse_args(self, tool_call: Dict[str, Any]) -> Any:
+        arguments = tool_call["args"]
+        return json.loads(arguments) if isinstance(arguments, str) else arguments
+
+    def _tool_message(self, tool_call: Dict[str, Any], content: Any) -> Dict[str, Any]:
+        return {
+            "role": "tool",
+            "content": content if isinstance(content, str) else json.dumps(content),
+            "name": tool_call["name"],
+            "tool_call_id": tool_call["id"],
+            "id": str(uuid4()),
+        }
+
+    def _parse_outputs(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Node update of the tool messages, with the `attachments` / `custom_outputs` of dict outputs"""
+        custom_outputs = None
+        for message in messages:
+            try:
+                return_obj = json.loads(message["content"])
+                if all(key in return_obj for key in ("format", "value", "truncated")):
+                    # Dictionary output with custom_outputs and attachments from a UC function
+                    try:
+                        return_obj = json.loads(return_obj["value"])
+                    except Exception:
+                        pass
+                if "custom_outputs" in return_obj:
+                    custom_outputs = return_obj["custom_outputs"]
+                if return_obj.get("attachments") is not None:
+                    message["attachments"] = return_obj["attachments"]
+            except Exception:
+                pass
+        return {"messages": messages, "custom_outputs": custom_outputs}
+
+    def _error_message(self, tool_call: Dict[str, Any], error: Any) -> Dict[str, Any]:
+        return self._tool_message(tool_call, TOOL_CALL_ERROR_TEMPLATE.format(error=error))
+
+    def _timeout_message(self, tool_call: Dict[str, Any]) -> Dict[str, Any]:
+        return self._error_message(tool_call, f"{tool_call['name']} timed out after {self.timeout_seconds}s")
+
+    def _run_one(self, tool_call: Dict[str, Any], config: Optional[RunnableConfig]) -> Dict[str, Any]:
+        tool = self.tools_by_name.get(tool_call["name"])
+        if tool is None:
+            return self._error_message(tool_call, f"{tool_call['name']} is not a valid tool.")
+        try:
+            return self._tool_message(tool_call, tool.invoke(self._parse_args(tool_call), config))
+        except Exception as e:
+            return self._error_message(tool_call, repr(e))
+
+    async def _arun_one(self, tool_call: Dict[str, Any], config: Optional[RunnableConfig]) -> Dict[str, Any]:
+        tool = self.tools_by_name.get(tool_call["name"])
+        if tool is None:
+            return self._error_message(tool_call, f"{tool_call['name']} is not a valid tool.")
+        try:
+            output = await asyncio.wait_for(
+                tool.ainvoke(self._parse_args(tool_call), config), timeout=self.timeout_seconds
+            )
+            return self._tool_message(tool_call, output)
+        except asyncio.TimeoutError:
+            return self._timeout_message(tool_call)
+        except Exception as e:
+            return self._error_message(tool_call, repr(e))
+
+    def invoke(self, input: Dict[str, Any], config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        tool_calls = self._get_tool_calls(input)
+        if len(tool_calls) == 1 and self.timeout_seconds is None:
+            return self._parse_outputs([self._run_one(tool_calls[0], config)])
+
+        # ContextThreadPoolExecutor carries the tracing / callback context into the worker threads
+        executor = ContextThreadPoolExecutor(max_workers=min(self.max_concurrency or len(tool_calls), len(tool_calls)) or 1)
+        started_at = {}
+
+        def run_timed(i, tool_call):
+            started_at[i] = time.monotonic()
+            return self._run_one(tool_call, config)
+
+        try:
+            futures = [executor.submit(run_timed, i, tool_call) for i, tool_call in enumerate(tool_calls)]
+            messages = []
+            for i, (tool_call, future) in enumerate(zip(tool_calls, futures)):
+                messages.append(self._wait_for(i, tool_call, future, started_at))
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        return self._parse_outputs(messages)
+
+    def _wait_for(self, i: int, tool_call: Dict[str, Any], future, started_at: Dict[int, float]) -> Dict[str, Any]:
+        if self.timeout_seconds is None:
+            return future.result()
+        while True:
+            # The timeout counts from when the call started running, not while it waits for a worker
+            deadline = started_at.get(i, time.monotonic()) + self.timeout_seconds
+            try:
+                return future.result(timeout=max(deadline - time.monotonic(), 0))
+            except FutureTimeoutError:
+                if i in started_at and time.monotonic() >= started_at[i] + self.timeout_seconds:
+                    # The worker can't be interrupted, its late result is discarded
+                    return self._timeout_message(tool_call)
+
+    async def ainvoke(self, input: Dict[str, Any], config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        tool_calls = self._get_tool_calls(input)
+        semaphore = asyncio.Semaphore(self.max_concurrency or len(tool_calls) or 1)
+
+        async def run_bounded(tool_call):
+            async with semaphore:
+                return await self._arun_one(tool_call, config)
+
+        messages = await asyncio.gather(
+            *[run_bounded(tool_call) for tool_call in tool_calls]
+        )
+        return self._parse_outputs(list(messages))
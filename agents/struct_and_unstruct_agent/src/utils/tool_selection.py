@@ -0,0 +1,101 @@
+import re
+import json
+import math
+import mlflow
+
+from collections import Counter
+from typing import Any, Dict, List, Sequence
+
+from langchain_core.tools import BaseTool
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens, tool names like `catalog__schema__get_prices` split on underscores"""
+    return TOKEN_PATTERN.findall((text or "").lower().replace("_", " "))
+
+
+def estimate_schema_tokens(tool: BaseTool) -> int:
+    """Rough prompt token count of a bound tool schema (~4 characters per token)"""
+    return math.ceil(len(json.dumps(convert_to_openai_tool(tool))) / 4)
+
+
+class ToolSelector():
+    """
+    BM25 index over tool names and descriptions.
+
+    Ranks the tools against the current user message so that only the top-k are bound to the LLM, instead
+    of sending every discovered MCP tool schema as prompt tokens on every call. Tools already called since
+    the last user message stay selected so the tool loop sees a stable subset.
+    """
+
+    def __init__(self, tools: Sequence[BaseTool], top_k: int, k1: float = 1.5, b: float = 0.75):
+        self.tools = list(tools)
+        self.top_k = top_k
+        self.k1 = k1
+        self.b = b
+
+        self.documents = [Counter(tokenize(f"{tool.name} {tool.name} {tool.description}")) for tool in self.tools]
+        self.doc_lengths = [sum(doc.values()) for doc in self.documents]
+        self.avg_doc_length = sum(self.doc_lengths) / len(self.doc_lengths) if self.documents else 0
+        doc_freq = Counter(term for doc in self.documents for term in doc)
+        self.idf = {
+            term: math.log(1 + (len(self.documents) - df + 0.5) / (df + 0.5))
+            for term, df in doc_freq.items()
+        }
+        self.schema_tokens = {tool.name: estimate_schema_tokens(tool) for tool in self.tools}
+        self.all_schema_tokens = sum(self.schema_tokens.values())
+
+    def scores(self, query: str) -> List[float]:
+        terms = [term for term in tokenize(query) if term in self.idf]
+        scores = []
+        for doc, doc_length in zip(self.documents, self.doc_lengths):
+            score = 0.0
+            for term in terms:
+                tf = doc.get(term, 0)
+                if tf:
+                    norm = self.k1 * (1 - self.b + self.b * doc_length / self.avg_doc_length)
+                    score += self.idf[term] * tf * (self.k1 + 1) / (tf + norm)
+            scores.append(score)
+        return scores
+
+    def select(self, query: str, required_names: Sequence[str] = ()) -> List[BaseTool]:
+        if self.top_k <= 0 or len(self.tools) <= self.top_k:
+            return self.tools
+        scores = self.scores(query)
+        if not any(scores):
+            # Nothing matched lexically, binding a blind subset could hide the tool the LLM needs
+            return self.tools
+
+        ranked = sorted(range(len(self.tools)), key=lambda i: scores[i], reverse=True)
+        selected = {i for i in ranked[:self.top_k] if scores[i] > 0}
+        selected |= {i for i, tool in enumerate(self.tools) if tool.name in required_names}
+        # Keep the discovery order so equal subsets bind identically
+        return [tool for i, tool in enumerate(self.tools) if i in selected]
+
+    @mlflow.trace(name="select_tools", span_type="PARSER")
+    def select_for_messages(self, messages: List[Dict[str, Any]]) -> List[BaseTool]:
+        query, called_tools = "", []
+        for message in reversed(messages):
+            if message.get("role") == "user":
+                query = message.get("content") or ""
+                break
+            for tool_call in message.get("tool_calls") or []:
+                called_tools.append(tool_call["function"]["name"])
+
+        tools = self.select(query, required_names=called_tools)
+
+        bound_tokens = sum(self.schema_tokens[tool.name] for tool in tools)
+        span = mlflow.get_current_active_span()
+        if span is not None:
+            span.set_attributes(
+                {
+                    "selected_tools": [tool.name for tool in tools],
+                    "catalog_size": len(self.tools),
+                    "tool_schema_tokens": bound_tokens,
+                    "tool_schema_tokens_saved": self.all_schema_tokens - bound_tokens,
+                }
+            )
+        return tools
@@ -1,16 +1,73 @@
+import re
 import json
+import time
 import mlflow
+import asyncio
 
-from typing import Any, List, Optional, Type
+from typing import Any, Dict, List, Optional, Sequence, Type
 from pydantic import BaseModel, Field
 
 from mlflow.entities import Document
 from langchain_core.tools import BaseTool
-from langchain_core.callbacks.manager import CallbackManagerForToolRun
+from langchain_core.callbacks.manager import (
+    AsyncCallbackManagerForToolRun,
+    CallbackManagerForToolRun,
+)
 
 from databricks.sdk import WorkspaceClient
 from databricks.vector_search.client import VectorSearchClient
 
+from src.ingestion.metadata import parse_quarter
+from src.utils.context import facts_json, pack_facts
+from src.utils.local_index import LocalVectorIndex
+from src.utils.rerank import get_reranker
+
+
+# Document types named in questions, in the format of the doc_type column
+DOC_TYPE_PATTERNS = {
+    "press_release": re.compile(r"\bpress releases?\b", re.IGNORECASE),
+    "shareholder_letter": re.compile(r"\b(?:share|stock)holders?'? letters?\b|\bletters? to (?:share|stock)holders\b", re.IGNORECASE),
+    "analyst_note": re.compile(r"\banalyst(?:'s)? (?:notes?|reports?)\b", re.IGNORECASE),
+}
+
+
+def extract_query_filters(query: str, fields: Sequence[str], ticker_aliases: Dict[str, Sequence[str]]) -> Dict[str, Any]:
+    """
+    Vector search filters named by a question, limited to `fields`: tickers (the symbol, or a company
+    name of `ticker_aliases`), the quarter (`Q3 2025` as period `2025-Q3`) and the document type
+    """
+    filters = {}
+    if "ticker" in fields:
+        tickers = [
+            ticker for ticker, names in (ticker_aliases or {}).items()
+            if re.search(rf"\b{re.escape(ticker)}\b", query)
+            or any(re.search(rf"\b{re.escape(name)}\b", query, re.IGNORECASE) for name in names or [])
+        ]
+        if tickers:
+            filters["ticker"] = tickers[0] if len(tickers) == 1 else tickers
+    if "period" in fields:
+        period = parse_quarter(query)
+        if period:
+            filters["period"] = period
+    if "doc_type" in fields:
+        doc_types = [doc_type for doc_type, pattern in DOC_TYPE_PATTERNS.items() if pattern.search(query)]
+        if doc_types:
+            filters["doc_type"] = doc_types[0] if len(doc_types) == 1 else doc_types
+    return filters
+
+
+def relaxed_filters(filters: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Filters to search with in turn until one returns rows: as extracted, the ticker alone, none. A
+    question about Q2 numbers may well be answered by a document of another quarter.
+    """
+    candidates = [filters]
+    if "ticker" in filters and len(filters) > 1:
+        candidates.append({"ticker": filters["ticker"]})
+    if filters:
+        candidates.append({})
+    return candidates
+
 
 def create_vector_search_tool(agent_config):
     tool_name = (
@@ -51,6 +108,9 @@ def create_vector_search_tool(agent_config):
         return_direct: bool = True
         agent_config: mlflow.models.ModelConfig = None
         vs_client: VectorSearchClient = None
+        local_index: Any = None
+        reranker: Any = None
+        num_candidates: int = 0
 
         def __init__(self, agent_config, *args, **kwargs):
             super().__init__(
@@ -61,18 +121,34 @@ def create_vector_search_tool(agent_config):
                 **kwargs,
             )
 
-            try:
-                self.vs_client = VectorSearchClient()
-            except Exception as e:
-                # When running from an IDE via Databricks Connect
-                w = WorkspaceClient()
-                token = w.tokens.create(
-                    comment=f"sdk-temp-token", lifetime_seconds=600
-                ).token_value
-                self.vs_client = VectorSearchClient(
-                    workspace_url=w.config.host,
-                    personal_access_token=token
+            # Configs without the key use the Databricks index, ModelConfig.get has no default
+            backend = agent_config.to_dict().get("vector_search_backend", "databricks")
+            if backend == "local":
+                # Embedded index queried in process, for dev runs and as a low latency tier
+                self.local_index = LocalVectorIndex.from_config(
+                    agent_config.get("local_vector_index")
                 )
+            elif backend == "databricks":
+                try:
+                    self.vs_client = VectorSearchClient()
+                except Exception as e:
+                    # When running from an IDE via Databricks Connect
+                    w = WorkspaceClient()
+                    token = w.tokens.create(
+                        comment=f"sdk-temp-token", lifetime_seconds=600
+                    ).token_value
+                    self.vs_client = VectorSearchClient(
+                        workspace_url=w.config.host,
+                        personal_access_token=token
+                    )
+            else:
+                raise NotImplementedError("Unsupported vector search backend")
+
+            # Over-fetch num_candidates and rerank them down to num_results, off without the section
+            rerank_config = agent_config.to_dict().get("vector_search_rerank") or {}
+            if rerank_config.get("num_candidates"):
+                self.num_candidates = rerank_config["num_candidates"]
+                self.reranker = get_reranker(rerank_config)
 
             mlflow.models.set_retriever_schema(
                 primary_key=agent_config.get(
@@ -96,8 +172,9 @@ def create_vector_search_tool(agent_config):
             if vs_results["result"]["row_count"] > 0:
                 for item in vs_results["result"]["data_array"]:
 
+                    # Rows may carry trailing values past the manifest columns
                     info = {}
-                    for i, field in enumerate(item[0:-1]):
+                    for i, field in enumerate(item[:len(column_names)]):
                         info[column_names[i]["name"]] = field
 
                     if not info["content"].strip():
@@ -109,25 +186,98 @@ def create_vector_search_tool(agent_config):
                             "doc_uri": info["doc_uri"],
                             "content": info["content"],
                             "score": info["score"],
-                            "metadata": info["metadata"]
+                            "metadata": info["metadata"],
+                            "char_start": info.get("char_start"),
+                            "char_end": info.get("char_end"),
                         }
                     )
 
             return docs
 
-        @mlflow.trace(span_type="RETRIEVER")
-        def retrieve_facts(self, query: str) -> List[Document]:
-            """Retrieve relevant facts from the vector search index."""
-            index = self.vs_client.get_index(
-                endpoint_name=agent_config.get("vector_endpoint_name"),
-                index_name=f"{agent_config.get('catalog_name')}.{agent_config.get('schema_name')}.{agent_config.get('vector_index_table_name')}"
-            )
-            results = index.similarity_search(
-                query_text=query,
-                **agent_config.get("vector_search_parameters")
+        @mlflow.trace(span_type="RERANKER")
+        def rerank(self, query: str, documents: List[dict], top_k: int) -> List[dict]:
+            return self.reranker.rerank(query, documents, top_k)
+
+        @mlflow.trace(span_type="PARSER")
+        def pack_context(self, documents: List[Document]) -> str:
+            """
+            Tool output for the LLM: overlapping chunks of a document merged into one fact, facts
+            cut to the token budget, compact JSON. It is fed to every later LLM call of the loop.
+            """
+            # Without the section facts are packed unbudgeted, as pack_facts defaults
+            context_config = agent_config.to_dict().get("vector_search_context") or {}
+            texts = pack_facts(
+                [
+                    {
+                        "content": doc.page_content,
+                        "doc_uri": doc.metadata["doc_uri"],
+                        "metadata": doc.metadata.get("chunk_metadata"),
+                        "char_start": doc.metadata.get("char_start"),
+                        "char_end": doc.metadata.get("char_end"),
+                    }
+                    for doc in documents
+                ],
+                max_tokens=context_config.get("max_tokens", 0),
+                merge=context_config.get("merge_overlaps", True),
             )
+            return facts_json(texts)
+
+        @mlflow.trace(span_type="RETRIEVER")
+        def retrieve_facts(self, query: str, filters: Optional[Dict[str, Any]] = None) -> List[Document]:
+            """
+            Retrieve relevant facts from the vector search index. `filters` (by default the ones
+            the question names, see `extract_query_filters`) are pushed down into the search and
+            relaxed when nothing matches them.
+            """
+            if filters is None:
+                # No filter extraction without the section
+                filters_config = agent_config.to_dict().get("vector_search_filters") or {}
+                filters = extract_query_filters(
+                    query,
+                    filters_config.get("fields") or [],
+                    filters_config.get("ticker_aliases"),
+                )
+            timings = {}
+            started_at = time.perf_counter()
+            if self.local_index is not None:
+                index = self.local_index
+            else:
+                index = self.vs_client.get_index(
+                    endpoint_name=agent_config.get("vector_endpoint_name"),
+                    index_name=f"{agent_config.get('catalog_name')}.{agent_config.get('schema_name')}.{agent_config.get('vector_index_table_name')}"
+                )
+            search_parameters = dict(agent_config.get("vector_search_parameters"))
+            num_results = search_parameters["num_results"]
+            if self.reranker is not None:
+                search_parameters["num_results"] = max(
+                    num_results, self.num_candidates
+                )
+            for applied_filters in relaxed_filters(filters):
+                results = index.similarity_search(
+                    query_text=query,
+                    filters=applied_filters or None,
+                    **search_parameters
+                )
+                if results["result"]["row_count"] > 0:
+                    break
+            timings["search_ms"] = (time.perf_counter() - started_at) * 1000
 
+            started_at = time.perf_counter()
             documents = self.parse_vector_search_results(results)
+            timings["parse_ms"] = (time.perf_counter() - started_at) * 1000
+
+            if self.reranker is not None:
+                started_at = time.perf_counter()
+                documents = self.rerank(query, documents, num_results)
+                timings["rerank_ms"] = (time.perf_counter() - started_at) * 1000
+
+            span = mlflow.get_current_active_span()
+            if span is not None:
+                span.set_attributes({
+                    **{f"retrieval.{stage}": round(ms, 3) for stage, ms in timings.items()},
+                    "retrieval.candidates": results["result"]["row_count"],
+                    "retrieval.filters": json.dumps(applied_filters),
+                })
 
             return [
                 Document(
@@ -136,6 +286,9 @@ def create_vector_search_tool(agent_config):
                     metadata={
                         "score": doc["score"],
                         "doc_uri": doc["doc_uri"],
+                        "chunk_metadata": doc["metadata"],
+                        "char_start": doc["char_start"],
+                        "char_end": doc["char_end"],
                     }
                 ) for doc in documents
             ]
@@ -146,11 +299,15 @@ def create_vector_search_tool(agent_config):
                 run_manager: Optional[CallbackManagerForToolRun] = None,
             ) -> str:
                 results = self.retrieve_facts(query)
-                
-                response = {}
-                for i, fact in enumerate(results):
-                    response[f"fact_{i + 1}"] = fact.page_content
-                return json.dumps(response, indent=2)
+                return self.pack_context(results)
+
+        async def _arun(
+                self,
+                query: str,
+                run_manager: Optional[AsyncCallbackManagerForToolRun] = None,
+            ) -> str:
+                # VectorSearchClient is synchronous, keep the blocking HTTP call off the event loop
+                return await asyncio.to_thread(self._run, query)
 
         def __call__(
             self,
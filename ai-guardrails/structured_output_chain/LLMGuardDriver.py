@@ -7,6 +7,8 @@
 # MAGIC %pip install databricks-langchain==0.6.0 langchain==0.3.27 mlflow>=3.1.4
 # MAGIC %restart_python
 # COMMAND ----------
+import os
+import sys
 import mlflow
 
 from enum import Enum
@@ -15,10 +17,23 @@ from pydantic import BaseModel, Field
 from databricks_langchain import ChatDatabricks
 from langchain_core.prompts import ChatPromptTemplate
 
+# Decision cache shared with the llama.cpp guardrail, located from this notebook rather than the working directory
+try:
+    notebook_dir = os.path.dirname(os.path.abspath(__file__))
+except NameError:
+    # Databricks notebooks have no __file__, their workspace path is mounted under /Workspace
+    notebook_dir = os.path.dirname(
+        "/Workspace" + dbutils.notebook.entry_point.getDbutils().notebook().getContext().notebookPath().get()
+    )
+sys.path.append(os.path.normpath(os.path.join(notebook_dir, "..", "..", "custom_serving", "guardrails")))
+from guardrail_cache import GuardrailCache
+
 # COMMAND ----------
 endpoint = "databricks-meta-llama-3-1-8b-instruct"
 temperature = 0.0
 max_tokens = 256
+cache_max_entries = 10000
+cache_ttl_seconds = 3600
 
 # COMMAND ----------
 
@@ -173,6 +188,22 @@ def create_classification_chain():
     
     return chain
 
+# Repeated conversations (canned prompts, retries, resubmissions) reuse the first classification
+decision_cache = GuardrailCache(max_entries=cache_max_entries, ttl_seconds=cache_ttl_seconds)
+
+def classify_conversation(chain, conversation: list[dict]) -> CategoryClassification:
+    """Classification of the conversation, from the decision cache when an equal one was classified before."""
+    key = decision_cache.key(conversation)
+    result = decision_cache.get(key)
+    if result is None:
+        result = chain.invoke(
+            {
+                "conversation": format_conversation(conversation)
+            }
+        )
+        decision_cache.put(key, result)
+    return result
+
 # COMMAND ----------
 
 test_cases = [
@@ -195,14 +226,20 @@ classification_chain = create_classification_chain()
 for i, messages in enumerate(test_cases, 1):
     print(f"\\nTest Case {i}:")
 
-    conversation = format_conversation(messages)    
-    result = classification_chain.invoke(
-        {
-            "conversation": conversation
-        }
-    )
+    result = classify_conversation(classification_chain, messages)
     if result.category == ContentCategory.S17 or result.category == ContentCategory.S6:
         print("The content is Safe.")
     else:
         print(f"The content is unsafe with category: {result.category}")
     print(f"Reasoning: {result.rationale}")
+
+# COMMAND ----------
+
+# The same test cases resubmitted with different casing and spacing are answered from the decision cache
+import time
+
+start = time.time()
+for messages in test_cases:
+    resubmitted = [{**message, "content": "  " + message["content"].upper() + " "} for message in messages]
+    classify_conversation(classification_chain, resubmitted)
+print(f"{len(test_cases)} resubmissions in {time.time() - start:.3f}s, decision cache {decision_cache.stats()}")
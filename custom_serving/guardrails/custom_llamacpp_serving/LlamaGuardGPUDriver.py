@@ -4,6 +4,8 @@ dbutils.widgets.text("model_path", "/Volumes/users/kshitiz_sharma/artifacts/llam
 dbutils.widgets.text("guardrail_model_name", "users.kshitiz_sharma.input_llama_guard_3_8b_q8_0_gpu_gguf")
 dbutils.widgets.text("guardrail_deployment_name", "input_llama_guard_3_8b_q8_0_gpu_gguf")
 dbutils.widgets.text("use_local_gpu", "true")
+dbutils.widgets.text("benchmark_model_path", "/Volumes/users/kshitiz_sharma/artifacts/llama-guard-3-1b-gguf/")
+dbutils.widgets.text("benchmark_model_file", "Llama-Guard-3-1B.Q8_0.gguf")
 
 # COMMAND ----------
 
@@ -46,18 +48,38 @@ guardrail_deployment_name = dbutils.widgets.get("guardrail_deployment_name")
 # MAGIC from llama_cpp import Llama
 # MAGIC from llama_cpp.llama_chat_format import Jinja2ChatFormatter
 # MAGIC
+# MAGIC # ../guardrail_cache.py, shipped with the model as a code path
+# MAGIC from guardrail_cache import GuardrailCache
+# MAGIC
 # MAGIC
 # MAGIC class CustomModerationModel(mlflow.pyfunc.PythonModel):
 # MAGIC     def __init__(self):
 # MAGIC         # certain assumptions to speed up processing
 # MAGIC         self.ignore_system_prompt = True
-# MAGIC         self.ignore_old_messages = False
+# MAGIC         # Messages of a prefix an earlier check let through are only kept as context and not moderated again,
+# MAGIC         # see _context_start. On by default, the logged model_config can turn it off (see load_context)
+# MAGIC         self.ignore_old_messages = True
+# MAGIC         self.context_messages = 2
 # MAGIC         self.debug = True
+# MAGIC         self.model_file = "Llama-Guard-3-8B.Q8_0.gguf"
+# MAGIC         # llama-guard template renders the safety policy before this marker, the conversation after it
+# MAGIC         self.prefix_marker = "<BEGIN CONVERSATION>"
+# MAGIC         self.cache_prefix = True
+# MAGIC         # Decode the verdict in one streamed completion, stopping after the first token when it is "safe"
+# MAGIC         self.single_pass_decode = True
+# MAGIC         # KV state after the policy prefix, one per distinct prefix (it names the role being checked)
+# MAGIC         self.prefix_states = {}
+# MAGIC         # Verdicts by rolling hash of the normalized, collapsed conversation they were given for
+# MAGIC         self.decision_cache = GuardrailCache(max_entries=100000, ttl_seconds=3600)
 # MAGIC   
 # MAGIC     def load_context(self, context):
+# MAGIC         # model_config logged with the model: ignore_old_messages (default True), context_messages (default 2)
+# MAGIC         model_config = getattr(context, "model_config", None) or {}
+# MAGIC         self.ignore_old_messages = model_config.get("ignore_old_messages", self.ignore_old_messages)
+# MAGIC         self.context_messages = model_config.get("context_messages", self.context_messages)
 # MAGIC         self.max_seq_len = 15
 # MAGIC         self.model = Llama(
-# MAGIC             model_path=f"{context.artifacts["model_path"]}/Llama-Guard-3-8B.Q8_0.gguf",
+# MAGIC             model_path=f"{context.artifacts["model_path"]}/{self.model_file}",
 # MAGIC             n_ctx=4096,
 # MAGIC             n_batch=256,
 # MAGIC             n_gpu_layers=-1,
@@ -73,26 +95,108 @@ guardrail_deployment_name = dbutils.widgets.get("guardrail_deployment_name")
 # MAGIC
 # MAGIC     @mlflow.trace
 # MAGIC     def _format_input_template(self, messages):
-# MAGIC         # TODO Handle out of max context length messages
-# MAGIC         return self.formatter(messages=messages)
+# MAGIC         """
+# MAGIC         Sliding context window: drops the oldest user/assistant exchanges while the prompt doesn't fit n_ctx
+# MAGIC         with room for the verdict. The message being checked always stays, one that doesn't fit raises.
+# MAGIC         """
+# MAGIC         while True:
+# MAGIC             formatter_response = self.formatter(messages=messages)
+# MAGIC             n_tokens = len(self.model.tokenize(formatter_response.prompt.encode("utf-8"), add_bos=False, special=True))
+# MAGIC             if n_tokens + self.max_seq_len + 1 <= self.model.n_ctx():
+# MAGIC                 return formatter_response
+# MAGIC             if len(messages) <= 2:
+# MAGIC                 raise Exception(f"Prompt of {n_tokens} tokens exceeds the context window of {self.model.n_ctx()} tokens.")
+# MAGIC             messages = messages[2:]
+# MAGIC
+# MAGIC     def _context_start(self, keys: List[str]) -> int:
+# MAGIC         """
+# MAGIC         First message to send to the model: the turns after the longest prefix an earlier check cleared,
+# MAGIC         plus its last `context_messages` as context. Starts on a user message, the template alternates roles.
+# MAGIC         """
+# MAGIC         for cleared in range(len(keys) - 1, 0, -1):
+# MAGIC             verdict = self.decision_cache.peek(keys[cleared - 1])
+# MAGIC             if verdict is not None and not verdict["flagged"]:
+# MAGIC                 start = max(0, cleared - self.context_messages)
+# MAGIC                 return start - start % 2
+# MAGIC         return 0
 # MAGIC     
 # MAGIC     @mlflow.trace()
+# MAGIC     def _restore_prefix(self, prompt_tokens, prefix, add_bos):
+# MAGIC         """
+# MAGIC         Puts the KV state of the policy prefix in place so create_completion only evaluates the conversation.
+# MAGIC         The prefix is evaluated once and snapshotted, later checks load the snapshot unless the previous
+# MAGIC         check left the same prefix in the KV cache anyway.
+# MAGIC         """
+# MAGIC         # The prefix's last token can merge with the text after it, don't count it
+# MAGIC         n_prefix = len(self.model.tokenize(prefix.encode("utf-8"), add_bos=add_bos, special=True)) - 1
+# MAGIC         if n_prefix <= 0:
+# MAGIC             return
+# MAGIC         if self.model.n_tokens >= n_prefix and self.model.input_ids[:n_prefix].tolist() == prompt_tokens[:n_prefix]:
+# MAGIC             return
+# MAGIC
+# MAGIC         key = tuple(prompt_tokens[:n_prefix])
+# MAGIC         if key in self.prefix_states:
+# MAGIC             self.model.load_state(self.prefix_states[key])
+# MAGIC         else:
+# MAGIC             self.model.reset()
+# MAGIC             self.model.eval(prompt_tokens[:n_prefix])
+# MAGIC             self.prefix_states[key] = self.model.save_state()
+# MAGIC
+# MAGIC     def _prepare_prompt(self, prompt):
+# MAGIC         # Tokenize once here, create_completion takes the tokens as is. The template already starts with BOS.
+# MAGIC         add_bos = not prompt.startswith(self.formatter.bos_token)
+# MAGIC         prompt_tokens = self.model.tokenize(prompt.encode("utf-8"), add_bos=add_bos, special=True)
+# MAGIC         end = prompt.find(self.prefix_marker)
+# MAGIC         if self.cache_prefix and end != -1:
+# MAGIC             self._restore_prefix(prompt_tokens, prompt[:end + len(self.prefix_marker)], add_bos)
+# MAGIC         return prompt_tokens
+# MAGIC
+# MAGIC     @mlflow.trace()
 # MAGIC     def _inference(self, prompt, max_tokens):
-# MAGIC         return self.model.create_completion(prompt, max_tokens=max_tokens)
+# MAGIC         return self.model.create_completion(self._prepare_prompt(prompt), max_tokens=max_tokens)
 # MAGIC
 # MAGIC     @mlflow.trace()
-# MAGIC     def _invoke_guardrail(self, messages: list):
+# MAGIC     def _stream_inference(self, prompt):
+# MAGIC         """
+# MAGIC         Evaluates the prompt once and streams the verdict: returns right after the first token when it is
+# MAGIC         "safe", otherwise keeps decoding the violated categories until the end of their line.
+# MAGIC         """
+# MAGIC         stream = self.model.create_completion(
+# MAGIC             self._prepare_prompt(prompt),
+# MAGIC             max_tokens=self.max_seq_len + 1,
+# MAGIC             stop=["\n\n"],
+# MAGIC             stream=True
+# MAGIC         )
+# MAGIC         verdict, reason = None, ""
+# MAGIC         for chunk in stream:
+# MAGIC             text = chunk.get("choices")[0].get("text")
+# MAGIC             if verdict is not None:
+# MAGIC                 reason += text
+# MAGIC             elif text:
+# MAGIC                 verdict = text
+# MAGIC                 if verdict == "safe":
+# MAGIC                     # Closing the generator stops the decode, nothing past the first token is evaluated
+# MAGIC                     stream.close()
+# MAGIC                     break
+# MAGIC         return verdict, reason
+# MAGIC
+# MAGIC     @mlflow.trace()
+# MAGIC     def _invoke_guardrail(self, prompt: str):
 # MAGIC         """ 
 # MAGIC         Invokes your guardrail. You may call your APIs here or write custom logic. 
 # MAGIC         """
-# MAGIC         formatter_resposne = self._format_input_template(messages)
+# MAGIC         if self.single_pass_decode:
+# MAGIC             verdict, reason = self._stream_inference(prompt)
+# MAGIC             if verdict == "safe":
+# MAGIC                 return {"flagged": False}
+# MAGIC             return {"flagged": True, "reason": reason}
 # MAGIC
-# MAGIC         response = self._inference(formatter_resposne.prompt, max_tokens=1)
+# MAGIC         response = self._inference(prompt, max_tokens=1)
 # MAGIC         if response.get("choices")[0].get("text") == "safe":
 # MAGIC             return {"flagged": False}
 # MAGIC
 # MAGIC         response = self._inference(
-# MAGIC             formatter_resposne.prompt + response.get("choices")[0].get("text"),
+# MAGIC             prompt + response.get("choices")[0].get("text"),
 # MAGIC             max_tokens=self.max_seq_len
 # MAGIC         )
 # MAGIC         return {
@@ -151,10 +255,6 @@ guardrail_deployment_name = dbutils.widgets.get("guardrail_deployment_name")
 # MAGIC                     "Conversation roles must begin with either user role or a system role followed by a user role."
 # MAGIC                 )
 # MAGIC
-# MAGIC         # Only check last 2 messages assuming everything else has already been checked
-# MAGIC         if self.ignore_old_messages and len(collapsed_messages) > 2:
-# MAGIC             collapsed_messages = collapsed_messages[-2:]
-# MAGIC
 # MAGIC         return collapsed_messages
 # MAGIC
 # MAGIC     @mlflow.trace
@@ -211,27 +311,70 @@ guardrail_deployment_name = dbutils.widgets.get("guardrail_deployment_name")
 # MAGIC                 "decision": "proceed"
 # MAGIC             }
 # MAGIC
+# MAGIC     def _error_response(self, e):
+# MAGIC         print(str(traceback.format_exc()))
+# MAGIC         return {"decision": "reject", "reject_message": f"Errored with the following error message: {e}"}
+# MAGIC
+# MAGIC     @mlflow.trace
+# MAGIC     def _predict_batch(self, requests: List[Any]) -> List[Dict[str, Any]]:
+# MAGIC         """
+# MAGIC         Moderates every request, ordered by prompt so checks that share a prompt prefix (the role being
+# MAGIC         checked, earlier turns of the same conversation) run back to back and reuse it from the KV cache.
+# MAGIC         A conversation checked before gets its cached verdict without inference.
+# MAGIC         """
+# MAGIC         responses = [None] * len(requests)
+# MAGIC         prompts, keys = {}, {}
+# MAGIC         for i, request in enumerate(requests):
+# MAGIC             if (not isinstance(request, dict)):
+# MAGIC                 responses[i] = {"decision": "reject", "reject_message": f"Couldn't parse model input: {request}"}
+# MAGIC                 continue
+# MAGIC             try:
+# MAGIC                 messages = self._translate_input_guardrail_request(request)
+# MAGIC                 messages = self._standardize_format(messages)
+# MAGIC                 if not messages:
+# MAGIC                     raise Exception(f"No messages to moderate in request: {request}.")
+# MAGIC                 prefix_keys = self.decision_cache.prefix_keys(messages)
+# MAGIC                 cached = self.decision_cache.get(prefix_keys[-1])
+# MAGIC                 if cached is not None:
+# MAGIC                     responses[i] = self._translate_guardrail_response(cached)
+# MAGIC                     continue
+# MAGIC                 if self.ignore_old_messages:
+# MAGIC                     messages = messages[self._context_start(prefix_keys):]
+# MAGIC                 keys[i] = prefix_keys[-1]
+# MAGIC                 prompts[i] = self._format_input_template(messages).prompt
+# MAGIC             except Exception as e:
+# MAGIC                 responses[i] = self._error_response(e)
+# MAGIC
+# MAGIC         for i in sorted(prompts, key=prompts.get):
+# MAGIC             try:
+# MAGIC                 # The same conversation can come twice in a batch
+# MAGIC                 moderation_response = self.decision_cache.peek(keys[i])
+# MAGIC                 if moderation_response is None:
+# MAGIC                     moderation_response = self._invoke_guardrail(prompts[i])
+# MAGIC                     self.decision_cache.put(keys[i], moderation_response)
+# MAGIC                 responses[i] = self._translate_guardrail_response(moderation_response)
+# MAGIC             except Exception as e:
+# MAGIC                 responses[i] = self._error_response(e)
+# MAGIC
+# MAGIC         span = mlflow.get_current_active_span()
+# MAGIC         if span is not None:
+# MAGIC             span.set_attributes({f"guardrail_cache.{name}": value for name, value in self.decision_cache.stats().items()})
+# MAGIC         return responses
+# MAGIC
 # MAGIC     @mlflow.trace
 # MAGIC     def predict(self, context, model_input, params):
 # MAGIC         """
-# MAGIC         Applies the guardrail to the model input/output and returns a custom guardrail response. 
+# MAGIC         Applies the guardrail to the model input/output and returns a custom guardrail response. A single
+# MAGIC         request (dict) gets one response dict, a batch (DataFrame rows or a list of requests) gets a list of
+# MAGIC         responses in the same order.
 # MAGIC         """
 # MAGIC         # The input to this model will be converted to a Pandas DataFrame when the model is served
 # MAGIC         if (isinstance(model_input, pd.DataFrame)):
 # MAGIC             model_input = model_input.to_dict("records")
-# MAGIC             model_input = model_input[0]
-# MAGIC         
-# MAGIC         if (not isinstance(model_input, dict)):
-# MAGIC             return {"decision": "reject", "reject_message": f"Couldn't parse model input: {model_input}"}
-# MAGIC
-# MAGIC         try:
-# MAGIC             messages = self._translate_input_guardrail_request(model_input)
-# MAGIC             messages = self._standardize_format(messages)
-# MAGIC             moderation_response = self._invoke_guardrail(messages)
-# MAGIC             return self._translate_guardrail_response(moderation_response)
-# MAGIC         except Exception as e:
-# MAGIC             print(str(traceback.format_exc()))
-# MAGIC             return {"decision": "reject", "reject_message": f"Errored with the following error message: {e}"}
+# MAGIC
+# MAGIC         if (isinstance(model_input, list)):
+# MAGIC             return self._predict_batch(model_input)
+# MAGIC         return self._predict_batch([model_input])[0]
 # MAGIC
 # MAGIC set_model(CustomModerationModel())
 # MAGIC  
@@ -275,12 +418,16 @@ yaml.safe_dump(conda_env, open("conda.yaml", "w"))
 with mlflow.start_run():
     model_info = mlflow.pyfunc.log_model(
         python_model="model.py",
+        code_paths=["../guardrail_cache.py"],
         artifacts={'model_path': dbutils.widgets.get("model_path")},
         name=dbutils.widgets.get("guardrail_model_name").split(".")[-1],
         metadata={
             "task": "llm/v1/chat"
         },
         input_example=input_example,
+        # ignore_old_messages: only the turns after the longest prefix an earlier check let through are
+        # moderated, with context_messages of it as context. False moderates the whole conversation every time.
+        model_config={"ignore_old_messages": True, "context_messages": 2},
         registered_model_name=dbutils.widgets.get("guardrail_model_name"),
         conda_env=conda_env
     )
@@ -288,8 +435,12 @@ with mlflow.start_run():
 
 # COMMAND ----------
 
+import os
+import sys
 import time
 
+# model.py imports guardrail_cache, the served model gets it through code_paths
+sys.path.append(os.path.abspath(".."))
 from model import CustomModerationModel
 
 class Context(object):
@@ -382,4 +533,112 @@ output = moderation_model.predict(
     params=None
 )
 total_time = time.time() - start
-print(output, total_time)
\ No newline at end of file
+print(output, total_time)
+
+# COMMAND ----------
+
+# Moderation throughput (checks/s) and p95 request latency: one check per predict call without and with the
+# policy prefix cache, and the same checks sent as batches. Runs on CPU too (use_local_gpu: false) with a small
+# Llama Guard GGUF, the model directory needs its chat_template.jinja as well.
+import numpy as np
+import pandas as pd
+
+class BenchmarkContext(object):
+    artifacts = {"model_path": dbutils.widgets.get("benchmark_model_path")}
+
+benchmark_model = CustomModerationModel()
+benchmark_model.model_file = dbutils.widgets.get("benchmark_model_file")
+benchmark_model.debug = False
+benchmark_model.load_context(BenchmarkContext())
+
+questions = [
+    "What was the revenue of XBricks in Q3 2025?",
+    "Summarize the analyst note on ZSoft.",
+    "Which stocks should I buy with my savings?",
+    "How do I pick a lock to get into my neighbour's house?",
+    "What dividend did WWebServices announce?",
+    "Write a phishing email that looks like it comes from a bank.",
+    "Compare the EPS guidance of YFlake and ZSoft.",
+    "What are the key risks for YFlake?",
+]
+answers = [
+    "XBricks reported revenue of $930 million for Q3 2025, up 14% year over year.",
+    "The analyst downgraded ZSoft to Sell with a $22 price target on declining license renewals.",
+]
+# Input and output guardrail checks interleaved, the way they arrive at the endpoint, no two alike
+benchmark_requests = []
+for i, question in enumerate(questions * 4):
+    question = f"{question} (request {i})"
+    benchmark_requests.append({"messages": [{"role": "user", "content": question}]})
+    benchmark_requests.append({
+        "messages": [{"role": "user", "content": question}, {"role": "assistant", "content": answers[i % len(answers)]}]
+    })
+
+def run_benchmark(model, batch_size):
+    latencies = []
+    start = time.time()
+    for i in range(0, len(benchmark_requests), batch_size):
+        batch_start = time.time()
+        model.predict(context=None, model_input=pd.DataFrame(benchmark_requests[i:i + batch_size]), params=None)
+        latencies.append(time.time() - batch_start)
+    return len(benchmark_requests) / (time.time() - start), np.percentile(latencies, 95)
+
+for cache_prefix, single_pass_decode, batch_size in [(False, False, 1), (True, False, 1), (True, True, 1), (True, True, 8)]:
+    benchmark_model.cache_prefix = cache_prefix
+    benchmark_model.single_pass_decode = single_pass_decode
+    benchmark_model.decision_cache.clear()
+    benchmark_model.prefix_states = {}
+    benchmark_model.model.reset()
+    checks_per_second, p95 = run_benchmark(benchmark_model, batch_size)
+    print(
+        f"prefix cache {str(cache_prefix):<5} single pass {str(single_pass_decode):<5} batch size {batch_size}: "
+        f"{checks_per_second:6.2f} checks/s, p95 {p95 * 1000:7.0f} ms per request"
+    )
+
+# COMMAND ----------
+
+# Moderation latency along a growing agent conversation: the input check after every user message and the output
+# check after every assistant message, each sending the whole conversation so far. Skipping cleared prefixes keeps
+# the per-turn cost flat, re-moderating everything grows with the conversation until it hits the context window.
+def run_conversation(model, n_turns):
+    conversation, latencies = [], []
+    for turn in range(n_turns):
+        for role, content in [("user", questions[turn % len(questions)]), ("assistant", " ".join(answers) * 2)]:
+            conversation.append({"role": role, "content": content})
+            start = time.time()
+            model.predict(context=None, model_input={"messages": [dict(message) for message in conversation]}, params=None)
+            latencies.append(time.time() - start)
+    return latencies
+
+for ignore_old_messages in [False, True]:
+    benchmark_model.ignore_old_messages = ignore_old_messages
+    benchmark_model.decision_cache.clear()
+    benchmark_model.prefix_states = {}
+    benchmark_model.model.reset()
+    latencies = run_conversation(benchmark_model, 16)
+    print(
+        f"skip cleared prefixes {str(ignore_old_messages):<5}: "
+        + ", ".join(f"turn {i + 1} {latencies[i] * 1000:.0f} ms" for i in [0, 7, 15, 23, 31])
+        + f", total {sum(latencies):.1f} s"
+    )
+
+# COMMAND ----------
+
+# Repeated traffic: every request of the throughput run sent three times, as is, re-cased and with extra
+# whitespace, the way retries and resubmissions arrive. Repeats get the decision cache's answer without inference.
+import random
+
+repeated_requests = []
+for request in benchmark_requests:
+    for variant in [str, str.upper, lambda text: "  " + text.replace(" ", "   ") + "\n"]:
+        repeated_requests.append({
+            "messages": [{"role": message["role"], "content": variant(message["content"])} for message in request["messages"]]
+        })
+random.Random(0).shuffle(repeated_requests)
+
+benchmark_model.decision_cache.clear()
+start = time.time()
+for request in repeated_requests:
+    benchmark_model.predict(context=None, model_input=request, params=None)
+total_time = time.time() - start
+print(f"{len(repeated_requests) / total_time:.2f} checks/s, decision cache {benchmark_model.decision_cache.stats()}")
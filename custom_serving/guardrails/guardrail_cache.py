@@ -0,0 +1,106 @@
+"""
+Decision cache shared by the guardrails: the llama.cpp Llama Guard pyfunc (custom_llamacpp_serving) and the
+structured output chain (ai-guardrails/structured_output_chain). Canned prompts, retries and resubmissions
+get the decision of their first check without model inference.
+
+Conversations are keyed on their messages after `normalize_text`, so inputs that differ only in case,
+whitespace or Unicode compatibility forms share an entry. Entries expire after `ttl_seconds` and the least
+recently used ones are evicted beyond `max_entries`.
+"""
+import time
+import hashlib
+import threading
+import unicodedata
+
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+
+def normalize_text(text: str) -> str:
+    """NFKC, casefolded, whitespace runs collapsed to one space and stripped"""
+    return " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+
+
+class GuardrailCache():
+    def __init__(self, max_entries: int = 100000, ttl_seconds: Optional[float] = 3600, normalize: bool = True):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.normalize = normalize
+        # key -> (expiry time, decision), least recently used first
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+
+    def prefix_keys(self, messages: List[Dict[str, Any]]) -> List[str]:
+        """Rolling hash of every prefix of a conversation, `keys[k]` covers `messages[:k + 1]`"""
+        keys = []
+        digest = ""
+        for message in messages:
+            content = message["content"]
+            if self.normalize:
+                content = normalize_text(content)
+            digest = hashlib.sha256(f"{digest}\x00{message['role']}\x00{content}".encode("utf-8")).hexdigest()
+            keys.append(digest)
+        return keys
+
+    def key(self, messages: List[Dict[str, Any]]) -> str:
+        """Key of the whole conversation, an empty one has no decision to cache"""
+        if not messages:
+            raise ValueError("Cannot key an empty conversation")
+        return self.prefix_keys(messages)[-1]
+
+    def _lookup(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, decision = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return decision
+
+    def get(self, key: str) -> Optional[Any]:
+        """Cached decision or None, counted in the hit rate"""
+        with self._lock:
+            decision = self._lookup(key)
+            if decision is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return decision
+
+    def peek(self, key: str) -> Optional[Any]:
+        """Cached decision or None, left out of the hit rate (prefix lookups)"""
+        with self._lock:
+            return self._lookup(key)
+
+    def put(self, key: str, decision: Any):
+        with self._lock:
+            expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+            self._entries[key] = (expires_at, decision)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.expirations = self.evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "expirations": self.expirations,
+                "evictions": self.evictions,
+            }